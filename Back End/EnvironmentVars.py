@@ -1 +1,164 @@
-MOCK_UPLOAD_FLOW = False
\ No newline at end of file
+import os
+
+MOCK_UPLOAD_FLOW = False
+
+# Storage backend used by model/Database.py: "sqlite" or "json"
+DATABASE_ENGINE = "sqlite"
+DATABASE_FILE = "teachalex.db"
+
+# Number of appended turns the JSON engine keeps in a conversation's history
+# segment before compacting them into the snapshot file
+HISTORY_COMPACTION_THRESHOLD = 50
+
+# Snapshot format of the JSON engine: "json", or "binary" for smaller, faster MessagePack files
+SNAPSHOT_FORMAT = "json"
+
+# In-process cache of hydrated conversations (0 entries disables it)
+CONVERSATION_CACHE_ENTRIES = 256
+CONVERSATION_CACHE_BYTES = 64 * 1024 * 1024
+
+# Seconds between background flushes of cached conversations; 0 writes through on every save
+WRITE_BEHIND_INTERVAL = 2.0
+
+# Uploaded documents whose extracted text exceeds this many characters are rejected.
+# Map-reduce concept extraction and chunk retrieval keep prompts small, so this can
+# be well above what fits in a single prompt.
+MAX_DOCUMENT_CHARS = 400000
+
+# Process pool used by DocumentProcessor to extract PDF pages in parallel
+PDF_EXTRACTION_WORKERS = 4
+PDF_PAGES_PER_TASK = 4
+
+# Content-addressed cache of extracted document text and concept maps
+CONTENT_CACHE_FILE = "content_cache.db"
+CONTENT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+# Content-addressed store of document texts and chunks, shared by all conversations on the same
+# document: "zlib", "zstd" (needs the zstandard package) or "none". The most recently used
+# DOCUMENT_STORE_CACHE_ENTRIES documents are kept decoded in memory.
+DOCUMENT_STORE_COMPRESSION = "zlib"
+DOCUMENT_STORE_CACHE_ENTRIES = 32
+
+# Metadata and full-text index of the stored conversations, used for listing, search and retention
+CONVERSATION_INDEX_FILE = "conversation_index.db"
+
+# Retention: conversations not updated for RETENTION_MAX_AGE_DAYS, and the least recently updated
+# ones beyond RETENTION_MAX_CONVERSATIONS, are moved out of the storage engine into compressed
+# files under database/archive/ every RETENTION_SWEEP_INTERVAL seconds (0 disables a rule).
+# An archived conversation is restored as soon as it is opened again.
+RETENTION_MAX_AGE_DAYS = 90
+RETENTION_MAX_CONVERSATIONS = 0
+RETENTION_SWEEP_INTERVAL = 60 * 60
+RETENTION_BATCH_SIZE = 100
+
+# LLM backend used by the agents: "openai", or "fake" for a local canned-response provider
+LLM_PROVIDER = os.environ.get("LLM_PROVIDER", "openai")
+
+# Seconds the fake provider waits before its first token: always FAKE_LLM_LATENCY ("fixed"),
+# or drawn with that mean from a "uniform" (+/- FAKE_LLM_LATENCY_SPREAD of the mean) or
+# "lognormal" (sigma FAKE_LLM_LATENCY_SPREAD) distribution, seeded for reproducible runs
+FAKE_LLM_LATENCY = float(os.environ.get("FAKE_LLM_LATENCY", 0.0))
+FAKE_LLM_LATENCY_DISTRIBUTION = os.environ.get("FAKE_LLM_LATENCY_DISTRIBUTION", "fixed")
+FAKE_LLM_LATENCY_SPREAD = float(os.environ.get("FAKE_LLM_LATENCY_SPREAD", 0.5))
+FAKE_LLM_TOKEN_DELAY = float(os.environ.get("FAKE_LLM_TOKEN_DELAY", 0.0))
+FAKE_LLM_SEED = int(os.environ.get("FAKE_LLM_SEED", 0))
+
+# OpenAI client settings; OPENAI_BASE_URL can point the provider at a local mock server
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "INSERT_YOUR_API_KEY_HERE")
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL")
+
+# Per-model request limits and retry policy for LLM calls
+LLM_REQUEST_TIMEOUT = 120.0
+LLM_MAX_CONCURRENCY = 8
+LLM_REQUESTS_PER_MINUTE = 300
+LLM_MAX_RETRIES = 4
+LLM_RETRY_BASE_DELAY = 0.5
+LLM_RETRY_MAX_DELAY = 30.0
+
+# Overrides of the limits above for individual models, e.g. {"o3-mini": {"max_concurrency": 2, "requests_per_minute": 60}}
+LLM_MODEL_LIMITS = {}
+
+# Documents are split into chunks of at most CHUNK_CHARS at upload; agent prompts
+# include up to CONTEXT_TOP_K of the most relevant chunks within CONTEXT_TOKEN_BUDGET
+CHUNK_CHARS = 1500
+CONTEXT_TOKEN_BUDGET = 3000
+CONTEXT_TOP_K = 6
+
+# "map_reduce" extracts concepts from question-aligned parts of long exams concurrently
+# and merges them; "single" always sends the whole exam in one prompt
+CONCEPT_EXTRACTION_MODE = "map_reduce"
+EXTRACTION_CHUNK_CHARS = 20000
+EXTRACTION_CONCURRENCY = 4
+# Extra attempts for a part whose reply is not a valid JSON concept map
+EXTRACTION_JSON_RETRIES = 2
+
+# Background job queue (concept extraction); jobs live in SQLite and survive restarts
+JOBS_FILE = "jobs.db"
+JOB_WORKERS = 2
+JOB_POLL_INTERVAL = 1.0
+# A running job whose worker has not reported for this long is picked up by another worker
+JOB_LEASE_SECONDS = 600
+JOB_MAX_ATTEMPTS = 3
+# Finished (succeeded or failed) jobs are deleted this long after they ended, checked every JOB_PRUNE_INTERVAL seconds
+JOB_RETENTION_SECONDS = 24 * 60 * 60
+JOB_PRUNE_INTERVAL = 10 * 60
+
+# Batch upload (POST /extract/batch, scripts/batch_upload.py): worker threads per
+# pipeline stage and the size of the queue in front of each. Every text worker
+# fans pages out to the PDF_EXTRACTION_WORKERS processes; concept workers share
+# the LLM_MAX_CONCURRENCY limit with the rest of the app.
+BATCH_TEXT_WORKERS = 2
+BATCH_CHUNK_WORKERS = 1
+BATCH_CONCEPT_WORKERS = 4
+BATCH_QUEUE_SIZE = 4
+# Batches run on job workers of their own, so at most this many run at once and they
+# never delay the shared JOB_WORKERS (concept extraction)
+BATCH_JOB_WORKERS = 1
+BATCH_MAX_DOCUMENTS = 500
+# Limit on the decompressed size of each PDF in a batch archive
+BATCH_MAX_FILE_BYTES = 50 * 1024 * 1024
+# Largest request body accepted (Flask's MAX_CONTENT_LENGTH), single PDFs and batches alike;
+# larger uploads are refused with 413 before anything is written to disk
+MAX_UPLOAD_BYTES = 512 * 1024 * 1024
+# Uploaded batches wait here (under the database directory) until their job is done
+BATCH_UPLOAD_DIR = "batches"
+
+# Exact-match cache of LLM responses for calls that opt in (e.g. the opening question for a concept)
+RESPONSE_CACHE_ENTRIES = 1024
+RESPONSE_CACHE_TTL = 24 * 60 * 60
+
+# Production server started with `python serve.py` (gunicorn, pre-forked worker processes)
+SERVER_BIND = os.environ.get("SERVER_BIND", "0.0.0.0:5000")
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", 4))
+SERVER_THREADS = int(os.environ.get("SERVER_THREADS", 4))
+# Streaming responses and synchronous concept extraction can hold a request for minutes
+SERVER_TIMEOUT = 300
+
+# Conversation memory: the last MEMORY_RECENT_TURNS turns go into prompts verbatim and older
+# turns are folded into a rolling summary, MEMORY_SUMMARY_BATCH_TURNS at a time. The transcript
+# part of a prompt (summary plus recent turns) is kept within MEMORY_TOKEN_BUDGET.
+MEMORY_RECENT_TURNS = 6
+MEMORY_SUMMARY_BATCH_TURNS = 4
+MEMORY_TOKEN_BUDGET = 1500
+MEMORY_SUMMARY_TOKENS = 300
+
+# Concept progress scoring, run on one of PROGRESS_WORKERS threads after each turn. A local scorer matches the
+# user's message against each concept's name and exam questions: a match strength below
+# PROGRESS_UNCERTAIN_LOW counts as no progress, above PROGRESS_UNCERTAIN_HIGH as a full step,
+# and concepts in between are scored together in one LLM call when PROGRESS_LLM_ESCALATION is on.
+PROGRESS_MAX_STEP = 10
+PROGRESS_MIN_WORDS = 4
+PROGRESS_FULL_MATCH_TERMS = 6
+PROGRESS_UNCERTAIN_LOW = 0.2
+PROGRESS_UNCERTAIN_HIGH = 0.8
+# Messages this long that match no concept may be paraphrasing one, so they are escalated too
+PROGRESS_PARAPHRASE_WORDS = 25
+PROGRESS_LLM_ESCALATION = True
+PROGRESS_WORKERS = 2
+
+# Spans around database, PDF, prompt, LLM and serialization work, exported at /metrics
+# and summed per request in the Server-Timing response header
+TRACING_ENABLED = True
+
+# Structured (JSON lines) logs on stderr: DEBUG, INFO, WARNING, ERROR or OFF
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
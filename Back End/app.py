@@ -1,15 +1,40 @@
+import os
 from flask import Flask
 from flasgger import Swagger
 from flask_cors import CORS
 from controller.extraction_controller import extract_bp
 from controller.conversation_controller import conversation_bp
+from controller.metrics_controller import metrics_bp, TracedJSONProvider
+from model.JobQueue import JobQueue
+from model.RetentionSweeper import RetentionSweeper
+from EnvironmentVars import MAX_UPLOAD_BYTES
 
 app = Flask(__name__)
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
+app.json = TracedJSONProvider(app)
 CORS(app, resources={r"/*": {"origins": ["http://localhost:5173", "http://127.0.0.1:5173"]}})
 swagger = Swagger(app)
 
 app.register_blueprint(extract_bp)
 app.register_blueprint(conversation_bp)
+app.register_blueprint(metrics_bp)
+
+def start_background_workers():
+    # Called by the process that serves requests (see serve.py and below), never on import:
+    # scripts, benchmarks and tests import this module without wanting workers. A queue
+    # still starts its workers when a job is submitted to it.
+
+    # Resume queued or interrupted background jobs
+    JobQueue.shared().start()
+    JobQueue.batches().start()
+
+    # Archive stale conversations in the background
+    RetentionSweeper.start()
 
 if __name__ == '__main__':
-    app.run(debug=True) 
\ No newline at end of file
+    # The debug server's reloader runs this module in a parent process that only watches
+    # for changes; workers belong in the child that serves requests (and owns the cache)
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_workers()
+
+    app.run(debug=True)
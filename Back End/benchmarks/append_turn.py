@@ -0,0 +1,57 @@
+# Measures per-turn persistence latency as a conversation grows, comparing the
+# append path (Database.append_turn) with a full save_conversation rewrite.
+# Usage (from the Back End directory): python -m benchmarks.append_turn [--turns 10000]
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from model.data_models.Concept import Concept
+from model.data_models.Conversation import Conversation
+from model.storage.JsonStorage import JsonStorage
+from model.storage.SqliteStorage import SqliteStorage
+
+CHECKPOINTS = [10, 100, 1000, 10000]
+SAMPLES = 20
+
+def measure(action, samples):
+    timings = []
+
+    for _ in range(samples):
+        start = time.perf_counter()
+        action()
+        timings.append(time.perf_counter() - start)
+
+    return statistics.median(timings) * 1000
+
+def run(engine_name, engine, max_turns):
+    conversation = Conversation(documentText="x" * 100000, concepts=[Concept(name=f"Concept {i}") for i in range(5)])
+    engine.save_conversation(conversation)
+
+    def append():
+        position = conversation.append_turn(["User: how does this work?", "Alex: let me explain step by step."])
+        engine.append_turn(conversation, position, ["User: how does this work?", "Alex: let me explain step by step."])
+
+    turns = 0
+
+    for checkpoint in [checkpoint for checkpoint in CHECKPOINTS if checkpoint <= max_turns]:
+        while turns < checkpoint:
+            append()
+            turns += 1
+
+        append_ms = measure(append, SAMPLES)
+        save_ms = measure(lambda: engine.save_conversation(conversation), 3)
+        turns += SAMPLES
+
+        print(f"{engine_name:<8}{checkpoint:>8}{append_ms:>16.3f}{save_ms:>16.3f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark per-turn persistence latency")
+    parser.add_argument("--turns", type=int, default=CHECKPOINTS[-1], help="Largest history size to measure")
+    args = parser.parse_args()
+
+    print(f"{'engine':<8}{'turns':>8}{'append_turn ms':>16}{'full save ms':>16}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        run("sqlite", SqliteStorage(os.path.join(directory, "benchmark.db")), args.turns)
+        run("json", JsonStorage(directory), args.turns)
@@ -0,0 +1,125 @@
+# Sends concurrent turns for a few conversations from several worker processes,
+# as the production server does, then checks that no turn was lost or duplicated.
+# Usage (from the Back End directory): python -m benchmarks.concurrent_turns [--processes 4 --threads 8 --turns 100]
+import argparse
+import multiprocessing
+import os
+import queue
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+def worker(directory, conversation_ids, threads, turns, results):
+    # Every process builds its own app with the conversation cache disabled, like a
+    # pre-forked server worker, and posts turns through the real endpoint
+    os.chdir(directory)
+
+    from model.Database import Database
+    Database.disable_cache()
+
+    from app import app
+    client = app.test_client()
+
+    def send(index):
+        conversation_id = conversation_ids[index % len(conversation_ids)]
+        response = client.post("/conversation/input", json={
+            "conversation_id": conversation_id,
+            "message": f"{os.getpid()}-{index}"
+        })
+        return conversation_id, response.status_code
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results.put(list(executor.map(send, range(turns))))
+
+def collect(processes, results, timeout):
+    # One list of responses per worker; a worker that crashed or stalled is reported instead of waited on forever
+    deadline = time.monotonic() + timeout
+    responses = []
+    received = 0
+
+    while received < len(processes):
+        try:
+            responses.extend(results.get(timeout=1))
+            received += 1
+            continue
+        except queue.Empty:
+            pass
+
+        crashed = [process for process in processes if process.exitcode not in (None, 0)]
+
+        if crashed:
+            raise RuntimeError(", ".join(f"Worker {process.pid} exited with code {process.exitcode}" for process in crashed))
+
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Only {received} of {len(processes)} workers finished within {timeout}s")
+
+    return responses
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Check that concurrent turns from several processes are all stored")
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8, help="Concurrent requests per process")
+    parser.add_argument("--turns", type=int, default=100, help="Turns sent by each process")
+    parser.add_argument("--conversations", type=int, default=4)
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds to wait for all workers")
+    args = parser.parse_args()
+
+    from model.data_models.Concept import Concept
+    from model.data_models.Conversation import Conversation
+    from model.storage.SqliteStorage import SqliteStorage
+    from EnvironmentVars import DATABASE_FILE
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.makedirs(os.path.join(directory, "database"))
+        storage = SqliteStorage(os.path.join(directory, "database", DATABASE_FILE))
+        conversation_ids = []
+
+        for _ in range(args.conversations):
+            conversation = Conversation(documentText="Q1. What is a derivative?", concepts=[Concept(name="Derivatives")])
+            storage.save_conversation(conversation)
+            conversation_ids.append(str(conversation.Id))
+
+        # Spawned rather than forked so no process inherits another's database connections
+        context = multiprocessing.get_context("spawn")
+        results = context.Queue()
+        processes = [
+            context.Process(target=worker, args=(directory, conversation_ids, args.threads, args.turns, results))
+            for _ in range(args.processes)
+        ]
+
+        start = time.perf_counter()
+
+        for process in processes:
+            process.start()
+
+        try:
+            responses = collect(processes, results, args.timeout)
+        except (RuntimeError, TimeoutError) as e:
+            for process in processes:
+                process.terminate()
+
+            print(f"Benchmark failed: {e}")
+            sys.exit(1)
+
+        elapsed = time.perf_counter() - start
+
+        for process in processes:
+            process.join()
+
+        accepted = Counter(conversation_id for conversation_id, status in responses if status == 200)
+        statuses = Counter(status for _, status in responses)
+        lost = 0
+
+        print(f"{len(responses)} turns in {elapsed:.2f}s ({len(responses) / elapsed:.0f} turns/s), status codes: {dict(statuses)}")
+        print(f"{'conversation':<38}{'accepted':>10}{'stored':>10}{'unique':>10}{'version':>10}")
+
+        for conversation_id in conversation_ids:
+            conversation = storage.get_conversation(conversation_id)
+            user_entries = [entry for entry in conversation.conversation_history if entry.startswith("User: ")]
+            lost += accepted[conversation_id] - len(set(user_entries))
+
+            print(f"{conversation_id:<38}{accepted[conversation_id]:>10}{len(user_entries):>10}{len(set(user_entries)):>10}{conversation.version:>10}")
+
+        print("No lost updates" if lost == 0 else f"{lost} accepted turns were lost")
@@ -0,0 +1,114 @@
+# Minimal local stand-in for the OpenAI chat completions API, with configurable
+# latency and injected 429/500 failures, for exercising the provider layer.
+# Usage (from the Back End directory): python -m benchmarks.mock_openai_server --port 8089
+# then run the app with OPENAI_BASE_URL=http://127.0.0.1:8089/v1
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency: float = 0.05, failure_rate: float = 0.0, reply: str = "This is a mocked reply from the local server."):
+        super().__init__(address, MockOpenAIHandler)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.reply = reply
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        self.failures = 0
+
+    @property
+    def base_url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/v1"
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+
+        try:
+            time.sleep(server.latency)
+
+            if random.random() < server.failure_rate:
+                with server.lock:
+                    server.failures += 1
+
+                status = random.choice([429, 500])
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(json.dumps({"error": {"message": "Injected failure", "type": "mock_error"}}).encode())
+                return
+
+            if body.get("stream"):
+                self.send_stream(body.get("model", "mock"))
+            else:
+                self.send_completion(body.get("model", "mock"))
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def send_completion(self, model):
+        payload = json.dumps({
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": self.server.reply}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_stream(self, model):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.end_headers()
+
+        for index, word in enumerate(self.server.reply.split(" ")):
+            chunk = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if index == 0 else " " + word}, "finish_reason": None}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+
+        self.wfile.write(b"data: [DONE]\n\n")
+
+def start(port: int = 0, **options) -> MockOpenAIServer:
+    server = MockOpenAIServer(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, name="mock-openai-server", daemon=True).start()
+    return server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run a local mock of the OpenAI chat completions API")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before each response")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of requests answered with 429/500")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(("127.0.0.1", args.port), latency=args.latency, failure_rate=args.failure_rate)
+    print(f"Mock OpenAI API listening on {server.base_url}")
+    server.serve_forever()
@@ -0,0 +1,57 @@
+# Fires a burst of concurrent queries at the OpenAI provider backed by the local
+# mock server, checking that retries absorb injected failures and that the
+# per-model concurrency limit holds.
+# Usage (from the Back End directory): python -m benchmarks.provider_load [--requests 200 --failure-rate 0.2]
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks import mock_openai_server
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test the OpenAI provider against a local mock server")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=64, help="Concurrent callers")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    parser.add_argument("--stream", action="store_true", help="Use the streaming path")
+    args = parser.parse_args()
+
+    server = mock_openai_server.start(latency=args.latency, failure_rate=args.failure_rate)
+
+    # Must be set before EnvironmentVars is imported by the provider modules
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["OPENAI_API_KEY"] = "mock-key"
+
+    from model.providers.OpenAI import OpenAI, Model
+    from EnvironmentVars import LLM_MAX_CONCURRENCY
+
+    provider = OpenAI(Model.GPT_4O_MINI)
+
+    def call(_):
+        try:
+            if args.stream:
+                return "".join(provider.stream("Hello"))
+            return provider.query("Hello")
+        except Exception as e:
+            return e
+
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        results = list(executor.map(call, range(args.requests)))
+
+    elapsed = time.perf_counter() - start
+    errors = [result for result in results if isinstance(result, Exception)]
+
+    print(f"requests:            {args.requests} in {elapsed:.2f}s ({args.requests / elapsed:.1f}/s)")
+    print(f"succeeded:           {args.requests - len(errors)}")
+    print(f"failed:              {len(errors)}")
+    print(f"server requests:     {server.requests} ({server.failures} injected failures)")
+    print(f"provider stats:      {provider.stats}")
+    print(f"max server in-flight {server.max_in_flight} (limit {LLM_MAX_CONCURRENCY})")
+
+    for error in errors[:5]:
+        print(f"error: {error!r}")
+
+    server.shutdown()
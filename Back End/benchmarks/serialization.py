@@ -0,0 +1,77 @@
+# Measures serialize/hydrate throughput and size of a conversation in each format,
+# and how long loading a conversation from SQLite takes with and without reading
+# its document text.
+# Usage (from the Back End directory): python -m benchmarks.serialization [--history 200]
+import argparse
+import json
+import os
+import tempfile
+import time
+from model.data_models.Codec import Codec
+from model.data_models.Concept import Concept
+from model.data_models.Conversation import Conversation
+from model.data_models.SubConcept import SubConcept
+from model.storage.SqliteStorage import SqliteStorage
+
+def throughput(action, seconds=1.0):
+    # Operations per second over roughly the given duration
+    count = 0
+    start = time.perf_counter()
+
+    while time.perf_counter() - start < seconds:
+        action()
+        count += 1
+
+    return count / (time.perf_counter() - start)
+
+def sample_conversation(history: int):
+    concepts = [
+        Concept(
+            name=f"Concept {i}",
+            progress=i * 7,
+            subConcepts=[SubConcept(f"Sub concept {i}.{j}", [f"Sub concept {i}.{j + 1}"]) for j in range(5)],
+            questions=[f"Q{i * 3 + j + 1}" for j in range(3)]
+        )
+        for i in range(10)
+    ]
+    document = "".join(f"Q{i + 1}. Explain why the derivative of x^{i} is {i}x^{i - 1}. " * 8 for i in range(200))
+
+    return Conversation(
+        documentText=document,
+        concepts=concepts,
+        conversation_history=[f"User: question {i}" if i % 2 == 0 else f"Alex: answer {i}" for i in range(history)],
+        pageOffsets=list(range(0, len(document), 3000)),
+        chunks=[document[i:i + 1500] for i in range(0, len(document), 1500)]
+    )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark data model serialization")
+    parser.add_argument("--history", type=int, default=200, help="History entries in the sample conversation")
+    args = parser.parse_args()
+
+    conversation = sample_conversation(args.history)
+
+    print(f"{'format':<16}{'bytes':>12}{'serialize/s':>14}{'hydrate/s':>14}")
+
+    # What JsonStorage wrote before the codec: an indented dump of to_dict()
+    indented = json.dumps(conversation.to_dict(), indent=4)
+    print(f"{'json (indent=4)':<16}{len(indented):>12}"
+          f"{throughput(lambda: json.dumps(conversation.to_dict(), indent=4)):>14.0f}"
+          f"{throughput(lambda: Conversation.from_dict(json.loads(indented))):>14.0f}")
+
+    for format in ["json", "binary"]:
+        data = Codec.dumps(conversation, format)
+        print(f"{format:<16}{len(data):>12}"
+              f"{throughput(lambda: Codec.dumps(conversation, format)):>14.0f}"
+              f"{throughput(lambda: Codec.loads(Conversation, data, format)):>14.0f}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        storage = SqliteStorage(os.path.join(directory, "benchmark.db"))
+        storage.save_conversation(conversation)
+        conversation_id = str(conversation.Id)
+
+        deferred = throughput(lambda: storage.get_conversation(conversation_id))
+        loaded = throughput(lambda: storage.get_conversation(conversation_id).documentText)
+
+        print()
+        print(f"SQLite get_conversation: {deferred:.0f}/s with the document deferred, {loaded:.0f}/s when the document is read")
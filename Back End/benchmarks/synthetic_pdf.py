@@ -0,0 +1,57 @@
+# Generates exam-like PDFs without any PDF library: every page holds a few numbered
+# questions ("Q1. ...") made of seeded random words, so documents are reproducible,
+# distinct per seed and parseable by PyPDF2.
+import random
+
+WORDS = (
+    "derivative integral limit function matrix vector eigenvalue probability variance theorem "
+    "proof series convergence gradient optimization equation polynomial graph tree algorithm "
+    "complexity recursion entropy energy momentum force velocity acceleration reaction molecule "
+    "enzyme protein market demand supply elasticity inflation interest contract liability"
+).split()
+
+LINES_PER_PAGE = 40
+QUESTIONS_PER_PAGE = 4
+
+def escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+def page_lines(rng: random.Random, first_question: int):
+    lines = []
+
+    for question in range(first_question, first_question + QUESTIONS_PER_PAGE):
+        words = [rng.choice(WORDS) for _ in range(12 * (LINES_PER_PAGE // QUESTIONS_PER_PAGE - 1))]
+        lines.append(f"Q{question}. Explain the {words[0]} and the {words[1]} in your own words.")
+        lines += [" ".join(words[i:i + 12]) for i in range(0, len(words), 12)]
+
+    return lines
+
+def build_pdf(pages: int, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    # Objects 1-3 are the catalog, the page tree and the font; each page adds a page and a content object
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+
+    for page in range(pages):
+        text = "\n".join(f"({escape(line)}) '" for line in page_lines(rng, page * QUESTIONS_PER_PAGE + 1))
+        stream = f"BT /F1 9 Tf 11 TL 50 760 Td\n{text}\nET".encode("latin-1")
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode("latin-1") + stream + b"\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {len(objects)} 0 R /Resources << /Font << /F1 3 0 R >> >> >>".encode("latin-1"))
+        page_ids.append(len(objects))
+
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(f'{id} 0 R' for id in page_ids)}] /Count {pages} >>".encode("latin-1")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode("latin-1") + body + b"\nendobj\n"
+
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    output += b"".join(f"{offset:010d} 00000 n \n".encode("latin-1") for offset in offsets)
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+
+    return bytes(output)
@@ -0,0 +1,222 @@
+# Drives the upload -> extract -> converse flow through the Flask test client with
+# concurrent callers, against the fake LLM provider and synthetic PDFs, and reports
+# latency percentiles, requests/s and memory per stage. Runs are reproducible for a
+# given --seed, so results can be saved with --output and compared with --baseline.
+# Usage (from the Back End directory):
+#   python -m benchmarks.upload_flow [--documents 24 --pages 1,5,20 --turns 10 --concurrency 8]
+#   python -m benchmarks.upload_flow --llm-latency 0.5 --llm-distribution lognormal --output baseline.json
+#   python -m benchmarks.upload_flow --baseline baseline.json --tolerance 0.2
+import argparse
+import io
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.synthetic_pdf import build_pdf, QUESTIONS_PER_PAGE
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not values:
+        return 0.0
+
+    return values[min(len(values) - 1, max(0, round(fraction * len(values) + 0.5) - 1))]
+
+def rss_bytes():
+    # Current resident set size; falls back to the peak where /proc is unavailable
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def concept_map(questions: int, concepts: int):
+    # Canned concept map spreading the document's question labels over the concepts
+    return {f"Concept {index + 1}": [f"Q{number}" for number in range(index + 1, questions + 1, concepts)] for index in range(concepts)}
+
+def run_stage(name, calls, concurrency, trace_memory):
+    # calls: zero-argument functions returning (status, value); runs them all and measures each
+    def timed(call):
+        start = time.perf_counter()
+        status, value = call()
+        return time.perf_counter() - start, status, value
+
+    rss_before = rss_bytes()
+
+    if trace_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(timed, calls))
+
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+
+    if trace_memory:
+        tracemalloc.stop()
+
+    latencies = sorted(latency for latency, _, _ in results)
+
+    stage = {
+        "stage": name,
+        "requests": len(results),
+        "errors": sum(1 for _, status, _ in results if status >= 400),
+        "requests_per_second": len(results) / elapsed if elapsed else 0.0,
+        "p50": percentile(latencies, 0.50),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "rss_mb": rss_bytes() / 2 ** 20,
+        "rss_delta_mb": (rss_bytes() - rss_before) / 2 ** 20,
+        "traced_peak_mb": peak / 2 ** 20 if peak is not None else None
+    }
+
+    return stage, [value for _, _, value in results]
+
+def print_stages(stages):
+    print(f"{'stage':<26}{'requests':>9}{'errors':>7}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'rss MB':>9}{'+rss MB':>9}{'peak MB':>9}")
+
+    for stage in stages:
+        peak = f"{stage['traced_peak_mb']:>9.1f}" if stage["traced_peak_mb"] is not None else f"{'-':>9}"
+        print(f"{stage['stage']:<26}{stage['requests']:>9}{stage['errors']:>7}{stage['requests_per_second']:>9.1f}"
+              f"{stage['p50'] * 1000:>9.1f}{stage['p95'] * 1000:>9.1f}{stage['p99'] * 1000:>9.1f}"
+              f"{stage['rss_mb']:>9.1f}{stage['rss_delta_mb']:>9.1f}{peak}")
+
+def compare(stages, baseline_stages, tolerance):
+    # Returns the regressions: stages whose p95 or throughput got worse by more than tolerance
+    baseline = {stage["stage"]: stage for stage in baseline_stages}
+    regressions = []
+
+    for stage in stages:
+        previous = baseline.get(stage["stage"])
+
+        if previous is None:
+            continue
+
+        if stage["p95"] > previous["p95"] * (1 + tolerance):
+            regressions.append(f"{stage['stage']}: p95 {previous['p95'] * 1000:.1f} ms -> {stage['p95'] * 1000:.1f} ms")
+
+        if stage["requests_per_second"] < previous["requests_per_second"] * (1 - tolerance):
+            regressions.append(f"{stage['stage']}: {previous['requests_per_second']:.1f} -> {stage['requests_per_second']:.1f} req/s")
+
+        if stage["errors"] > previous["errors"]:
+            regressions.append(f"{stage['stage']}: {previous['errors']} -> {stage['errors']} errors")
+
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the upload, extraction and conversation endpoints with a fake LLM")
+    parser.add_argument("--documents", type=int, default=24, help="PDFs uploaded, spread over the page counts")
+    parser.add_argument("--pages", default="1,5,20", help="Comma-separated page counts of the synthetic PDFs")
+    parser.add_argument("--concepts", type=int, default=4, help="Concepts in the fake concept map")
+    parser.add_argument("--turns", type=int, default=10, help="Conversation turns sent per document")
+    parser.add_argument("--concurrency", type=int, default=8, help="Concurrent callers")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Mean seconds of a fake LLM call")
+    parser.add_argument("--llm-distribution", default="lognormal", choices=["fixed", "uniform", "lognormal"])
+    parser.add_argument("--llm-spread", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace-memory", action="store_true", help="Also report the peak of Python allocations per stage (slows every stage down)")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown before a stage counts as regressed")
+    args = parser.parse_args()
+
+    page_counts = [int(pages) for pages in args.pages.split(",")]
+
+    # Must be set before EnvironmentVars is imported by the app
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY"] = str(args.llm_latency)
+    os.environ["FAKE_LLM_LATENCY_DISTRIBUTION"] = args.llm_distribution
+    os.environ["FAKE_LLM_LATENCY_SPREAD"] = str(args.llm_spread)
+    os.environ["FAKE_LLM_SEED"] = str(args.seed)
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+    root = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # A fresh database and content cache, so no stage is served from an earlier run
+        sys.path.insert(0, root)
+        os.chdir(directory)
+        os.makedirs("database")
+
+        from model.providers.FakeProvider import FakeProvider
+        from model.providers.OpenAI import Model
+        from model.Database import Database
+        from app import app
+
+        FakeProvider.responses[Model.O3_MINI] = json.dumps(concept_map(max(page_counts) * QUESTIONS_PER_PAGE, args.concepts))
+        client = app.test_client()
+        documents = [(index, page_counts[index % len(page_counts)]) for index in range(args.documents)]
+        # Generated up front so PDF construction is not part of the upload timings
+        pdfs = {index: build_pdf(pages, seed=args.seed * 100003 + index) for index, pages in documents}
+        stages = []
+
+        def upload(index):
+            response = client.post("/extract/text", data={"file": (io.BytesIO(pdfs[index]), f"exam-{index}.pdf")}, content_type="multipart/form-data")
+            return response.status_code, response.get_json(silent=True)
+
+        conversation_ids = {}
+
+        for pages in page_counts:
+            indexes = [index for index, document_pages in documents if document_pages == pages]
+            stage, results = run_stage(f"extract_text ({pages} pages)", [lambda index=index: upload(index) for index in indexes], args.concurrency, args.trace_memory)
+            stages.append(stage)
+            conversation_ids.update({index: result["Id"] for index, result in zip(indexes, results) if result})
+
+        def extract_concepts(conversation_id):
+            response = client.post("/extract/concepts", data={"id": conversation_id})
+            return response.status_code, None
+
+        stage, _ = run_stage("extract_concepts", [lambda id=id: extract_concepts(id) for id in conversation_ids.values()], args.concurrency, args.trace_memory)
+        stages.append(stage)
+
+        def send_turn(conversation_id, turn):
+            # The streaming endpoint is the one the front end uses and the one that runs the
+            # conversation agent (memory, prompt and LLM call); the whole stream is read
+            response = client.post("/conversation/input/stream", json={
+                "conversation_id": conversation_id,
+                "message": f"Turn {turn}: the derivative measures how fast a function changes, and the integral accumulates it over an interval"
+            })
+            body = response.get_data(as_text=True)
+
+            # A failed turn still answers 200, with an error event instead of the done event
+            return (response.status_code if "event: done" in body else 500), None
+
+        # Interleaved so concurrent callers mostly work on different conversations
+        turns = [lambda id=id, turn=turn: send_turn(id, turn) for turn in range(args.turns) for id in conversation_ids.values()]
+        stage, _ = run_stage("conversation_turn", turns, args.concurrency, args.trace_memory)
+        stages.append(stage)
+
+        Database.flush()
+        os.chdir(root)
+
+    print(f"{args.documents} documents ({args.pages} pages), {args.turns} turns each, {args.concurrency} concurrent callers, "
+          f"fake LLM {args.llm_distribution} {args.llm_latency * 1000:.0f} ms")
+    print_stages(stages)
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"arguments": vars(args), "stages": stages}, output, indent=4)
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            baseline = json.load(baseline)
+
+        # Only runs with the same workload are comparable
+        ignored = {"output", "baseline", "tolerance"}
+        differing = [name for name, value in vars(args).items() if name not in ignored and baseline["arguments"].get(name) != value]
+
+        if differing:
+            print(f"warning: the baseline was run with different {', '.join(differing)}")
+
+        regressions = compare(stages, baseline["stages"], args.tolerance)
+
+        for regression in regressions:
+            print(f"regression: {regression}")
+
+        print(f"{len(regressions)} regressions against {args.baseline}")
+        sys.exit(1 if regressions else 0)
@@ -1,9 +1,17 @@
-import random
+from concurrent.futures import ThreadPoolExecutor
 from flask import request, Blueprint, jsonify
-from model.providers.OpenAI import OpenAI, Model
 from model.Database import Database
+from model.Logger import Logger
+from model.ProgressScorer import ProgressScorer
+from model.storage.StorageEngine import ConversationConflictError
+from model.data_models.Concept import Concept
+from model.agents.ConversationAgent import ConversationAgent
+from controller.streaming import sse_event, sse_response
+from EnvironmentVars import PROGRESS_WORKERS
 conversation_bp = Blueprint('conversation', __name__)
 
+logger = Logger("conversation")
+
 @conversation_bp.route('/conversation/input', methods=['POST'])
 def input():
     """
@@ -31,6 +39,8 @@ def input():
         description: Successfully processed the conversation
       404:
         description: Conversation not found
+      409:
+        description: The conversation was changed concurrently; the turn was not saved
     """
     
     # Get the data from the request body
@@ -44,24 +54,25 @@ def input():
         return jsonify({"error": "Conversation ID is required"}), 400
     
     try:
-        # Get the conversation from the database
-        conversation = Database.get_conversation(conversation_id)
-        
-        # Add the user's message to the conversation history
-        conversation.conversation_history.append("User: " + message)
+        # Unknown ids are rejected before a lock file is created for them
+        Database.get_conversation(conversation_id)
+    except Exception as e:
+        return jsonify({"error": f"Conversation not found: {str(e)}"}), 404
 
-        # Call the ConversationAgent to get the response
-        alex_response = "RESPONSE PLACEHOLDER"
+    try:
+        # Turns on the same conversation run one at a time, across all worker processes
+        with Database.lock(conversation_id):
+            # Get the conversation from the database
+            conversation = Database.get_conversation(conversation_id)
+            
+            # Call the ConversationAgent to get the response
+            alex_response = "RESPONSE PLACEHOLDER"
 
-        # Add the agent's response to the conversation history
-        conversation.conversation_history.append("Alex: " + alex_response)
+            # Append the user's message and the agent's response to the stored history
+            Database.append_turn(conversation, ["User: " + message, "Alex: " + alex_response])
 
-        # Update the conversation's concepts progress
-        for concept in conversation.concepts:
-            concept.progress = min(100, concept.progress + random.randint(1, 10))
-            
-        # Save the conversation to the database
-        Database.save_conversation(conversation)
+            # Concept progress is scored in the background; the updated values arrive with a later turn
+            score_progress(conversation, message)
         
         # Serialize concepts to a list of dictionaries
         concepts_dict = [concept.to_dict() for concept in conversation.concepts]
@@ -71,5 +82,215 @@ def input():
             "response": alex_response,
             "concepts": concepts_dict
         })
+    except ConversationConflictError as e:
+        return jsonify({"error": str(e)}), 409
+    except Exception as e:
+        return jsonify({"error": f"Conversation not found: {str(e)}"}), 404 
+
+@conversation_bp.route('/conversation/input/stream', methods=['POST'])
+def input_stream():
+    """
+    Streaming variant of the conversation endpoint (server-sent events)
+    ---
+    parameters:
+      - name: body
+        in: body
+        schema:
+          type: object
+          properties:
+            message:
+              type: string
+            drawing:
+              type: string
+              description: Base64 encoded drawing data (optional)
+            conversation_id:
+              type: string
+              description: ID of the conversation to retrieve
+        required: true
+        description: The message, optional drawing, and conversation ID to process
+    
+    responses:
+      200:
+        description: "Event stream: token events carrying partial text, then a done event with the response and updated concepts"
+      400:
+        description: No conversation ID provided
+      404:
+        description: Conversation not found
+    """
+
+    data = request.get_json()
+
+    message = data.get('message', '')
+    conversation_id = data.get('conversation_id')
+
+    if not conversation_id:
+        return jsonify({"error": "Conversation ID is required"}), 400
+
+    try:
+        Database.get_conversation(conversation_id)
+    except Exception as e:
+        return jsonify({"error": f"Conversation not found: {str(e)}"}), 404
+
+    def events():
+        alex_response = ""
+
+        try:
+            # The lock is held to prepare the turn and to save it, never while a token waits on
+            # the client: a slow reader must not hold up other turns on the conversation
+            with Database.lock(conversation_id):
+                conversation = Database.get_conversation(conversation_id)
+                concept = current_concept(conversation) or Concept(name="the exam material")
+
+                # Folds older turns into the summary and builds the prompt; the reply streams below
+                tokens = ConversationAgent().stream_input(conversation, concept, message)
+                summary, summarized_entries = conversation.summary, conversation.summarized_entries
+
+            # Forward the agent's reply token by token as it arrives
+            for token in tokens:
+                alex_response += token
+                yield sse_event("token", {"text": token})
+
+            with Database.lock(conversation_id):
+                conversation = Database.get_conversation(conversation_id)
+
+                # A summary folded while preparing the prompt is saved with the turn
+                if summarized_entries > conversation.summarized_entries:
+                    conversation.summary, conversation.summarized_entries = summary, summarized_entries
+
+                Database.append_turn(conversation, ["User: " + message, "Alex: " + alex_response])
+                score_progress(conversation, message)
+                concepts = [concept.to_dict() for concept in conversation.concepts]
+
+            yield sse_event("done", {
+                "response": alex_response,
+                "concepts": concepts
+            })
+        except Exception as e:
+            yield sse_event("error", {"error": f"Sorry, something went wrong: {str(e)}"})
+
+    return sse_response(events())
+
+MAX_PAGE_SIZE = 100
+
+@conversation_bp.route('/conversations', methods=['GET'])
+def list_conversations():
+    """
+    List conversations, most recently updated first
+    ---
+    parameters:
+      - name: limit
+        in: query
+        type: integer
+        default: 20
+        description: Conversations per page (at most 100)
+      - name: cursor
+        in: query
+        type: string
+        description: next_cursor of the previous page
+      - name: archived
+        in: query
+        type: boolean
+        default: false
+        description: List archived conversations instead of active ones
+
+    responses:
+      200:
+        description: "A page of conversation metadata (Id, createdAt, updatedAt, documentHash, conceptNames, turnCount, archived) and the cursor of the next page, or null after the last page"
+      400:
+        description: Invalid limit or cursor
+    """
+
+    try:
+        limit = min(MAX_PAGE_SIZE, max(1, int(request.args.get('limit', 20))))
+        conversations, next_cursor = Database.get_index().list(
+            limit, request.args.get('cursor'), request.args.get('archived', 'false').lower() == 'true'
+        )
+    except ValueError:
+        return jsonify({"error": "Invalid limit or cursor"}), 400
+
+    return jsonify({"conversations": conversations, "next_cursor": next_cursor})
+
+@conversation_bp.route('/conversations/search', methods=['GET'])
+def search_conversations():
+    """
+    Full-text search over the concept names and history of conversations
+    ---
+    parameters:
+      - name: q
+        in: query
+        type: string
+        required: true
+        description: Words that must all appear in a conversation's concept names or history
+      - name: limit
+        in: query
+        type: integer
+        default: 20
+        description: Conversations per page (at most 100)
+      - name: offset
+        in: query
+        type: integer
+        default: 0
+      - name: archived
+        in: query
+        type: boolean
+        default: false
+        description: Search archived conversations instead of active ones
+
+    responses:
+      200:
+        description: Matching conversation metadata, best match first
+      400:
+        description: Missing query or invalid limit or offset
+    """
+
+    query = request.args.get('q', '')
+
+    if not query.strip():
+        return jsonify({"error": "Search query is required"}), 400
+
+    try:
+        limit = min(MAX_PAGE_SIZE, max(1, int(request.args.get('limit', 20))))
+        offset = max(0, int(request.args.get('offset', 0)))
+    except ValueError:
+        return jsonify({"error": "Invalid limit or offset"}), 400
+
+    conversations = Database.get_index().search(query, limit, offset, request.args.get('archived', 'false').lower() == 'true')
+
+    return jsonify({"conversations": conversations, "next_offset": offset + limit if len(conversations) == limit else None})
+
+def current_concept(conversation):
+    # The first concept that has not been fully covered yet
+    for concept in conversation.concepts:
+        if concept.progress < 100:
+            return concept
+
+    return conversation.concepts[0] if conversation.concepts else None
+
+# Progress scoring runs in this process, off the request thread. Unlike the durable job queue
+# nothing is written per turn; a scoring lost to a restart only delays progress until a later turn.
+progress_executor = ThreadPoolExecutor(max_workers=PROGRESS_WORKERS, thread_name_prefix="progress-scorer")
+
+def score_progress(conversation, message):
+    # Called under the conversation lock once the turn is saved; the entry before it is the question Alex asked
+    history = conversation.conversation_history
+    previous = history[-3] if len(history) >= 3 else ""
+    question = previous[len("Alex: "):] if previous.startswith("Alex: ") else ""
+
+    return progress_executor.submit(progress_task, str(conversation.Id), message, question)
+
+def progress_task(conversation_id, message, question):
+    try:
+        # Scored outside the lock so a slow LLM escalation never holds up the next turn;
+        # the steps are increments, so they apply cleanly to whatever is stored by then
+        steps = ProgressScorer.evaluate(Database.get_conversation(conversation_id), message, question)
+
+        if steps:
+            with Database.lock(conversation_id):
+                conversation = Database.get_conversation(conversation_id)
+                ProgressScorer.apply(conversation, steps)
+                Database.save_conversation(conversation)
     except Exception as e:
-        return jsonify({"error": f"Conversation not found: {str(e)}"}), 404 
\ No newline at end of file
+        logger.error("progress_scoring_failed", exc_info=True, conversation_id=conversation_id, error=str(e))
+        return {}
+
+    return steps
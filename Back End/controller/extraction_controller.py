@@ -1,13 +1,25 @@
+import io
+import os
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
 from flask import request, Blueprint, jsonify
+from werkzeug.utils import secure_filename
 from model.data_models.Concept import Concept
 from model.data_models.SubConcept import SubConcept
 from model.DocumentProcessor import DocumentProcessor
+from model.retrieval.Chunker import chunk_text, normalize_question_label
 from model.data_models.Conversation import Conversation
 from model.Database import Database
-from model.agents.ConceptExtractionAgent import ConceptExtractionAgent
+from model.storage.DocumentStore import document_hash
+from model.JobQueue import JobQueue
+from model.BatchPipeline import BatchPipeline
+from model.agents.ConceptExtractionAgent import ConceptExtractionAgent, parse_concepts
 from model.agents.ConversationAgent import ConversationAgent
 import json
-from EnvironmentVars import MOCK_UPLOAD_FLOW
+from controller.streaming import sse_event, sse_response
+from EnvironmentVars import MOCK_UPLOAD_FLOW, MAX_DOCUMENT_CHARS, BATCH_TEXT_WORKERS, BATCH_CHUNK_WORKERS, BATCH_CONCEPT_WORKERS, BATCH_QUEUE_SIZE, BATCH_MAX_DOCUMENTS, BATCH_MAX_FILE_BYTES, BATCH_UPLOAD_DIR
 
 extract_bp = Blueprint('extract', __name__)
 
@@ -35,14 +47,14 @@ def extract_text():
     if not file.filename.lower().endswith('.pdf'):
         return 'File must be a PDF', 400
 
-    # Extract text
-    text = DocumentProcessor.extractText(file)
+    # Extract text, stopping as soon as the document exceeds the character limit
+    extraction = DocumentProcessor.extract(file, max_chars=MAX_DOCUMENT_CHARS)
 
-    if len(text) > 100000:
+    if extraction.exceeded:
         return 'Document text exceeds maximum token limit. Please provide a shorter document.', 400
 
-    # Create conversation
-    conversation = Conversation(documentText=text)
+    # Create conversation, chunked once here for retrieval in later prompts
+    conversation = Conversation(documentText=extraction.text, pageOffsets=extraction.page_offsets, chunks=chunk_text(extraction.text), documentHash=document_hash(extraction.text))
 
     # Save conversation to database
     Database.save_conversation(conversation)
@@ -78,16 +90,12 @@ def extract_concepts():
             "initial_message": mock_initial_message()
         }), 200
     
-    concepts = []
-    initial_message = ""
-
     if 'id' not in request.form:
         return 'No ID provided', 400
 
     # Get exam text from database
     try:
         conversation = Database.get_conversation(request.form['id'])
-        exam_text = conversation.documentText
     
     except Exception as e:
         return "Conversation with id " + request.form['id'] + " not found", 404
@@ -95,42 +103,411 @@ def extract_concepts():
 
     # Extract concepts from document text
     try:
-        agent = ConceptExtractionAgent()
-        extracted_concepts = agent.extract(exam_text)
-        
-        # Clear existing concepts if any
-        conversation.concepts = []
-        
-        # Create Concept objects from extracted concept dictionary
-        # extracted_concepts is a dict where keys are concept names and values are question lists
-        for concept_name, questions in extracted_concepts.items():
-            concept_obj = Concept(name=concept_name, progress=0, subConcepts=[])
-            concepts.append(concept_obj.to_dict())
-            conversation.concepts.append(concept_obj)
-        
+        # Re-read under the conversation lock so the saved result cannot overwrite a concurrent change
+        with Database.lock(conversation.Id):
+            result = run_extraction(Database.get_conversation(conversation.Id))
+    
+    except Exception as e:
+        return "Sorry, something went wrong", 500
+
+    return jsonify(result), 200
+
+@extract_bp.route('/extract/jobs', methods=['POST'])
+def submit_extraction_job():
+    """
+    Queue concept extraction as a background job.
+    ---
+    parameters:
+      - name: id
+        in: formData
+        type: string
+        required: true
+        description: Conversation Id to extract concepts from
+    
+    responses:
+      202:
+        description: Job queued; poll /extract/jobs/{job_id} for its status
+      400:
+        description: No ID provided
+      404:
+        description: Conversation not found
+    """
+
+    if 'id' not in request.form:
+        return 'No ID provided', 400
+
+    try:
+        Database.get_conversation(request.form['id'])
+    except Exception as e:
+        return "Conversation with id " + request.form['id'] + " not found", 404
+
+    job_id = JobQueue.shared().submit("extract_concepts", {"conversation_id": request.form['id']})
+
+    return jsonify({"job_id": job_id, "status": "queued"}), 202
+
+@extract_bp.route('/extract/jobs/<job_id>', methods=['GET'])
+def get_extraction_job(job_id):
+    """
+    Get the status of a concept extraction job.
+    ---
+    parameters:
+      - name: job_id
+        in: path
+        type: string
+        required: true
+    
+    responses:
+      200:
+        description: "Job status (queued, running, succeeded or failed); result holds the concepts as soon as they are known and the initial message once generated"
+      404:
+        description: Job not found
+    """
+
+    job = JobQueue.shared().get(job_id)
+
+    if job is None:
+        return jsonify({"error": f"No job found with ID: {job_id}"}), 404
+
+    return jsonify(job), 200
+
+@extract_bp.route('/extract/batch', methods=['POST'])
+def submit_batch():
+    """
+    Queue a batch of PDFs for text and concept extraction.
+    ---
+    parameters:
+      - name: file
+        in: formData
+        type: file
+        required: false
+        description: Zip archive of PDFs
+      - name: files
+        in: formData
+        type: file
+        required: false
+        description: One or more PDFs (instead of a zip archive)
+    
+    responses:
+      202:
+        description: "Batch queued; poll /extract/jobs/{job_id} for per-document progress, per-stage throughput and finally the created conversations"
+      400:
+        description: No PDFs, too many PDFs or an invalid zip archive
+    """
+
+    archive = request.files.get('file')
+    files = [file for file in request.files.getlist('files') if file.filename]
+
+    if archive is None and not files:
+        return 'No file in formData', 400
+
+    if archive is not None and not archive.filename.lower().endswith('.zip'):
+        return 'File must be a zip archive', 400
+
+    if any(not file.filename.lower().endswith('.pdf') for file in files):
+        return 'Files must be PDFs', 400
+
+    batch_path = os.path.join(Database.get_database_path(), BATCH_UPLOAD_DIR, str(uuid4()))
+    os.makedirs(batch_path)
+
+    try:
+        if archive is not None:
+            source = os.path.join(batch_path, "upload.zip")
+            archive.save(source)
+        else:
+            source = os.path.join(batch_path, "files")
+            os.makedirs(source)
+
+            for index, file in enumerate(files):
+                # Prefixed so PDFs with the same name (or none after sanitizing) stay apart
+                file.save(os.path.join(source, f"{index:04d}_{secure_filename(file.filename) or 'document.pdf'}"))
+
+        document_count = len(list_batch_documents(source))
+    except zipfile.BadZipFile:
+        shutil.rmtree(batch_path, ignore_errors=True)
+        return 'File must be a zip archive', 400
+
+    if document_count == 0 or document_count > BATCH_MAX_DOCUMENTS:
+        shutil.rmtree(batch_path, ignore_errors=True)
+        return f'A batch must contain between 1 and {BATCH_MAX_DOCUMENTS} PDFs', 400
+
+    job_id = JobQueue.batches().submit("extract_batch", {"path": source, "batch_path": batch_path})
+
+    return jsonify({"job_id": job_id, "status": "queued", "documents": document_count}), 202
+
+@extract_bp.route('/extract/concepts/stream', methods=['POST'])
+def extract_concepts_stream():
+    """
+    Streaming variant of concept extraction (server-sent events)
+    ---
+    parameters:
+      - name: id
+        in: formData
+        type: string
+        required: true
+        description: Conversation Id to extract concepts from
+    
+    responses:
+      200:
+        description: "Event stream: token events for the concept map and the initial message, a concepts event once the map is parsed, then a done event"
+      400:
+        description: No ID provided
+      404:
+        description: Conversation not found
+    """
+
+    if 'id' not in request.form:
+        return 'No ID provided', 400
+
+    if MOCK_UPLOAD_FLOW:
+        return sse_response(iter([sse_event("done", {
+            "concepts": mock_concepts(),
+            "initial_message": mock_initial_message()
+        })]))
+
+    try:
+        conversation_id = request.form['id']
+        exam_text = Database.get_conversation(conversation_id).documentText
+    except Exception as e:
+        return "Conversation with id " + request.form['id'] + " not found", 404
+
+    def events():
+        try:
+            response = ""
+            agent = ConceptExtractionAgent()
+
+            for token in agent.stream(exam_text):
+                response += token
+                yield sse_event("token", {"stage": "concepts", "text": token})
+
+            # Same parsing as the non-streaming path: fenced replies are accepted, and an invalid
+            # one is asked for again (without streaming) before the stream reports an error
+            try:
+                extracted_concepts = parse_concepts(response)
+            except ValueError:
+                try:
+                    extracted_concepts = agent.extract(exam_text)
+                except ValueError:
+                    yield sse_event("error", {"error": "Sorry, the concepts could not be extracted from this exam. Please try again."})
+                    return
+
+            # The lock is held to save the concepts and the first message, never while a
+            # token waits on the client
+            with Database.lock(conversation_id):
+                conversation = Database.get_conversation(conversation_id)
+                concepts = apply_concepts(conversation, extracted_concepts)
+                Database.save_conversation(conversation)
+
+                # The prompt is built here; the message streams below
+                tokens = ConversationAgent().stream_start_conversation(conversation, conversation.concepts[0]) if concepts else iter(())
+
+            yield sse_event("concepts", {"concepts": concepts})
+
+            initial_message = ""
+
+            for token in tokens:
+                initial_message += token
+                yield sse_event("token", {"stage": "initial_message", "text": token})
+
+            if concepts:
+                with Database.lock(conversation_id):
+                    Database.append_turn(Database.get_conversation(conversation_id), ["Alex: " + initial_message])
+
+            yield sse_event("done", {
+                "concepts": concepts,
+                "initial_message": initial_message
+            })
+        except Exception as e:
+            yield sse_event("error", {"error": "Sorry, something went wrong"})
+
+    return sse_response(events())
+
+def run_extraction(conversation, report=None):
+    # Extracts the concept map and generates Alex's first message. The message is
+    # started as soon as the first concept name is known, in parallel with the
+    # rest of the extraction, and only regenerated if the final map disagrees.
+    conversation_agent = ConversationAgent()
+    early_message = {}
+    executor = ThreadPoolExecutor(max_workers=1)
+
+    def on_first_concept(name):
+        # A reply that is retried reports its first concept again; one early message is enough
+        if "name" in early_message:
+            return
+
+        early_message["name"] = name
+        early_message["future"] = executor.submit(conversation_agent.start_conversation, conversation, Concept(name=name))
+
+    try:
+        extracted_concepts = ConceptExtractionAgent().extract(conversation.documentText, on_first_concept=on_first_concept)
+        concepts = apply_concepts(conversation, extracted_concepts)
+        initial_message = ""
+
+        if report:
+            report({"concepts": concepts, "initial_message": None})
+
         # Generate initial message if concepts were extracted
         if concepts:
-            conversation_agent = ConversationAgent()
-            first_concept = conversation.concepts[0].name
-            initial_message = conversation_agent.start_conversation(exam_text, first_concept)
-            
-            # Initialize conversation_history if it doesn't exist
-            if not hasattr(conversation, 'conversation_history'):
-                conversation.conversation_history = []
-                
+            first_concept = conversation.concepts[0]
+
+            if early_message.get("name") == first_concept.name:
+                initial_message = early_message["future"].result()
+            else:
+                initial_message = conversation_agent.start_conversation(conversation, first_concept)
+
             # Add initial message to conversation history
             conversation.conversation_history.append("Alex: " + initial_message)
-    
-    except Exception as e:
-        return "Sorry, something went wrong", 500
+    finally:
+        executor.shutdown(wait=False)
 
     # Save conversation to database
     Database.save_conversation(conversation)
 
-    return jsonify({
+    return {
         "concepts": concepts,
         "initial_message": initial_message
-    }), 200
+    }
+
+def extraction_job(payload, report):
+    with Database.lock(payload["conversation_id"]):
+        conversation = Database.get_conversation(payload["conversation_id"])
+        return run_extraction(conversation, report)
+
+JobQueue.shared().register("extract_concepts", extraction_job)
+
+def list_batch_documents(path):
+    # Names of the PDFs in a directory (searched recursively) or zip archive, in name order
+    if os.path.isdir(path):
+        names = []
+
+        for directory, _, file_names in os.walk(path):
+            names += [os.path.relpath(os.path.join(directory, file_name), path) for file_name in file_names if file_name.lower().endswith('.pdf')]
+
+        return sorted(names)
+
+    with zipfile.ZipFile(path) as archive:
+        return sorted(info.filename for info in archive.infolist()
+                      if not info.is_dir() and info.filename.lower().endswith('.pdf') and not info.filename.startswith('__MACOSX/'))
+
+BATCH_READ_CHUNK_BYTES = 1024 * 1024
+
+def open_batch_document(path, name):
+    if os.path.isdir(path):
+        return open(os.path.join(path, name), "rb")
+
+    # Every call opens the archive itself, so pipeline workers can read members in parallel
+    with zipfile.ZipFile(path) as archive, archive.open(name) as member:
+        # The sizes in the archive are whatever its creator wrote, so the limit applies to the
+        # bytes actually decompressed, and decompression stops as soon as they exceed it
+        document = io.BytesIO()
+
+        while chunk := member.read(min(BATCH_READ_CHUNK_BYTES, BATCH_MAX_FILE_BYTES + 1 - document.tell())):
+            document.write(chunk)
+
+            if document.tell() > BATCH_MAX_FILE_BYTES:
+                raise Exception(f"File is larger than {BATCH_MAX_FILE_BYTES} bytes")
+
+        document.seek(0)
+        return document
+
+def run_batch(path, report=None, manifest_path=None, text_workers=BATCH_TEXT_WORKERS, chunk_workers=BATCH_CHUNK_WORKERS, concept_workers=BATCH_CONCEPT_WORKERS, queue_size=BATCH_QUEUE_SIZE):
+    # Extracts the text, chunks and concepts of every PDF in a directory or zip archive
+    # and saves each as a conversation ready to start (concepts and Alex's first message).
+    # Finished documents are appended to manifest_path, so a run that was interrupted
+    # continues where it stopped; documents that failed are tried again.
+    completed = {}
+
+    if manifest_path and os.path.exists(manifest_path):
+        with open(manifest_path) as manifest:
+            for line in manifest:
+                record = json.loads(line)
+
+                if record["error"] is None:
+                    completed[record["file"]] = record
+
+    names = list_batch_documents(path)
+    documents = [{"file": name} for name in names if name not in completed]
+    results = list(completed.values())
+
+    def extract_document_text(document):
+        with open_batch_document(path, document["file"]) as file:
+            extraction = DocumentProcessor.extract(file, max_chars=MAX_DOCUMENT_CHARS)
+
+        if extraction.exceeded:
+            raise Exception("Document text exceeds maximum token limit")
+
+        document["extraction"] = extraction
+        return document
+
+    def create_conversation(document):
+        extraction = document.pop("extraction")
+        conversation = Conversation(documentText=extraction.text, pageOffsets=extraction.page_offsets, chunks=chunk_text(extraction.text), documentHash=document_hash(extraction.text))
+
+        # Saved before concept extraction, so a document whose concepts fail can be retried through /extract/jobs
+        Database.save_conversation(conversation)
+
+        document["conversation"] = conversation
+        document["conversation_id"] = str(conversation.Id)
+        return document
+
+    def extract_document_concepts(document):
+        conversation = document.pop("conversation")
+
+        with Database.lock(conversation.Id):
+            document["concepts"] = [concept["name"] for concept in run_extraction(conversation)["concepts"]]
+
+        return document
+
+    pipeline = BatchPipeline([
+        ("extract_text", extract_document_text, text_workers),
+        ("chunk", create_conversation, chunk_workers),
+        ("extract_concepts", extract_document_concepts, concept_workers)
+    ], queue_size)
+
+    def progress():
+        return {
+            "total": len(names),
+            "done": len(results),
+            "failed": sum(1 for record in results if record["error"] is not None),
+            "stages": pipeline.report(),
+            "documents": sorted(results, key=lambda record: record["file"])
+        }
+
+    def on_result(document, error):
+        record = {"file": document["file"], "conversation_id": document.get("conversation_id"), "concepts": document.get("concepts", []), "error": error}
+        results.append(record)
+
+        if manifest_path:
+            with open(manifest_path, "a") as manifest:
+                manifest.write(json.dumps(record) + "\n")
+
+        if report:
+            report(progress())
+
+    pipeline.run(documents, on_result)
+
+    return progress()
+
+def batch_job(payload, report):
+    result = run_batch(payload["path"], report, manifest_path=os.path.join(payload["batch_path"], "manifest.jsonl"))
+    shutil.rmtree(payload["batch_path"], ignore_errors=True)
+
+    return result
+
+JobQueue.batches().register("extract_batch", batch_job)
+
+def apply_concepts(conversation, extracted_concepts):
+    # Clear existing concepts if any
+    conversation.concepts = []
+    concepts = []
+    
+    # Create Concept objects from extracted concept dictionary
+    # extracted_concepts is a dict where keys are concept names and values are question lists
+    for concept_name, questions in extracted_concepts.items():
+        concept_obj = Concept(name=concept_name, progress=0, subConcepts=[], questions=[normalize_question_label(question) for question in questions])
+        concepts.append(concept_obj.to_dict())
+        conversation.concepts.append(concept_obj)
+
+    return concepts
 
 def mock_initial_message():
     return "MOCKED INITIAL MESSAGE"
@@ -0,0 +1,90 @@
+import time
+from flask import Blueprint, Response, request
+from flask.json.provider import DefaultJSONProvider
+from model.Database import Database
+from model.ContentCache import ContentCache
+from model.ConversationMemory import ConversationMemory
+from model.Logger import Logger
+from model.ProgressScorer import ProgressScorer
+from model.RetentionSweeper import RetentionSweeper
+from model.Tracing import Tracing
+from model.providers.ProviderRegistry import ProviderRegistry
+from model.retrieval.ContextBuilder import ContextBuilder
+metrics_bp = Blueprint('metrics', __name__)
+
+logger = Logger("requests")
+
+class TracedJSONProvider(DefaultJSONProvider):
+    # Flask's JSON provider with the encoding of every JSON response timed as a span
+    def dumps(self, obj, **kwargs):
+        with Tracing.span("json_encode"):
+            return super().dumps(obj, **kwargs)
+
+def stat_gauges(prefix: str, stats: dict, **labels):
+    # Numeric entries of a component's stats dict as (name, labels, value) samples
+    return [(f"{prefix}_{key}", labels, value) for key, value in stats.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)]
+
+def collect_gauges():
+    gauges = []
+    gauges += stat_gauges("context", ContextBuilder.stats)
+    gauges += stat_gauges("memory", ConversationMemory.stats)
+    gauges += stat_gauges("progress", ProgressScorer.stats)
+    gauges += stat_gauges("retention", RetentionSweeper.stats)
+    gauges += stat_gauges("conversations", Database.get_index().counts())
+    gauges += stat_gauges("document_store", Database.get_document_store().stats)
+
+    for model, stats in ProviderRegistry.stats().items():
+        if model == "response_cache":
+            gauges += stat_gauges("response_cache", stats)
+        else:
+            gauges += stat_gauges("llm", stats, model=model)
+
+    cache = Database.get_cache()
+
+    if cache is not None:
+        gauges += stat_gauges("conversation_cache", cache.stats())
+
+    content_stats = ContentCache.shared().stats()
+    gauges += stat_gauges("content_cache", content_stats)
+
+    for namespace, namespace_stats in content_stats["namespaces"].items():
+        gauges += stat_gauges("content_cache_namespace", namespace_stats, namespace=namespace)
+
+    return gauges
+
+@metrics_bp.before_app_request
+def start_trace():
+    request.trace_started = time.perf_counter()
+    Tracing.start_request()
+
+@metrics_bp.after_app_request
+def finish_trace(response):
+    trace = Tracing.finish_request()
+    total = time.perf_counter() - request.trace_started
+
+    if trace is not None:
+        # Streamed responses only include the time spent before the first byte
+        timings = [f"{name};dur={seconds * 1000:.1f}" for name, (seconds, _) in sorted(trace.spans.items())]
+        timings.append(f"total;dur={total * 1000:.1f}")
+        response.headers["Server-Timing"] = ", ".join(timings)
+
+    logger.debug("request", method=request.method, path=request.path, status=response.status_code, duration_ms=round(total * 1000, 1))
+
+    return response
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Service Metrics Endpoint
+    ---
+    description: >
+      Span timings, token counters and cache statistics in the Prometheus text format.
+      Under the multi-process server each worker reports its own numbers.
+    produces:
+      - text/plain
+    responses:
+      200:
+        description: Metrics in the Prometheus text exposition format
+    """
+    return Response(Tracing.render(collect_gauges()), mimetype="text/plain; version=0.0.4")
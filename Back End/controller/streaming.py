@@ -0,0 +1,12 @@
+import json
+from flask import Response
+
+def sse_event(event: str, data) -> str:
+    # Formats one server-sent event with a JSON payload
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events) -> Response:
+    return Response(events, mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
@@ -0,0 +1,151 @@
+import queue
+import threading
+import time
+from model.Logger import Logger
+from model.Tracing import Tracing
+
+logger = Logger("batch")
+
+# Marks the end of a stage's input
+DONE = object()
+
+class PipelineStage:
+    def __init__(self, name: str, function, workers: int):
+        self.name = name
+        self.function = function
+        self.workers = workers
+        self.stats = {"items": 0, "failures": 0, "busy_seconds": 0.0, "blocked_seconds": 0.0}
+        self.started = None
+        self.finished = None
+        self.lock = threading.Lock()
+
+    def add(self, busy: float, blocked: float, failed: bool):
+        with self.lock:
+            self.stats["items"] += 1
+            self.stats["failures"] += int(failed)
+            self.stats["busy_seconds"] += busy
+            self.stats["blocked_seconds"] += blocked
+
+    def report(self) -> dict:
+        # elapsed runs from the stage's first item until its last worker stopped;
+        # blocked_seconds is time its workers waited on the next stage's full queue
+        with self.lock:
+            elapsed = self.finished - self.started if self.started is not None and self.finished is not None else 0.0
+            items = self.stats["items"]
+
+            return {
+                "stage": self.name,
+                "workers": self.workers,
+                "items": items,
+                "failures": self.stats["failures"],
+                "elapsed_seconds": round(elapsed, 3),
+                "per_second": round(items / elapsed, 3) if elapsed > 0 else 0.0,
+                "busy_seconds": round(self.stats["busy_seconds"], 3),
+                "blocked_seconds": round(self.stats["blocked_seconds"], 3)
+            }
+
+class BatchPipeline:
+    # Runs items through a chain of stages, each with its own worker threads and a
+    # bounded queue in front of it. A stage that falls behind fills its queue and
+    # holds back the stages before it, so CPU-bound parsing cannot run far ahead of
+    # IO-bound LLM calls. An item that fails in a stage skips the remaining stages
+    # and comes out with its error.
+
+    def __init__(self, stages, queue_size: int):
+        # stages: (name, function, workers); each function takes and returns the item
+        self.stages = [PipelineStage(name, function, workers) for name, function, workers in stages]
+        self.queue_size = queue_size
+
+    def report(self):
+        return [stage.report() for stage in self.stages]
+
+    def run(self, items, on_result=None):
+        # Returns (item, error) pairs in completion order; on_result(item, error) is
+        # called for each from the calling thread as soon as it is done
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages] + [queue.Queue()]
+        remaining = [stage.workers for stage in self.stages]
+        source_error = []
+        threads = []
+
+        def feed():
+            try:
+                for item in items:
+                    queues[0].put((item, None))
+            except Exception as e:
+                source_error.append(e)
+            finally:
+                for _ in range(self.stages[0].workers):
+                    queues[0].put(DONE)
+
+        def work(index: int):
+            stage = self.stages[index]
+            # The output queue takes a single DONE
+            next_workers = self.stages[index + 1].workers if index + 1 < len(self.stages) else 1
+
+            while True:
+                entry = queues[index].get()
+
+                if entry is DONE:
+                    with stage.lock:
+                        remaining[index] -= 1
+                        last = remaining[index] == 0
+
+                        if last:
+                            stage.finished = time.perf_counter()
+
+                    if last:
+                        for _ in range(next_workers):
+                            queues[index + 1].put(DONE)
+                    return
+
+                item, error = entry
+
+                if error is None:
+                    with stage.lock:
+                        if stage.started is None:
+                            stage.started = time.perf_counter()
+
+                    started = time.perf_counter()
+
+                    try:
+                        with Tracing.span("batch_stage", stage=stage.name):
+                            item = stage.function(item)
+                    except Exception as e:
+                        logger.warning("batch_item_failed", stage=stage.name, error=str(e))
+                        error = str(e)
+
+                    busy = time.perf_counter() - started
+                    queues[index + 1].put((item, error))
+                    stage.add(busy, time.perf_counter() - started - busy, error is not None)
+                else:
+                    queues[index + 1].put((item, error))
+
+        threads.append(threading.Thread(target=feed, name="batch-source", daemon=True))
+
+        for index, stage in enumerate(self.stages):
+            for worker in range(stage.workers):
+                threads.append(threading.Thread(target=work, args=(index,), name=f"batch-{stage.name}-{worker}", daemon=True))
+
+        for thread in threads:
+            thread.start()
+
+        results = []
+
+        while True:
+            entry = queues[-1].get()
+
+            if entry is DONE:
+                break
+
+            results.append(entry)
+
+            if on_result:
+                on_result(*entry)
+
+        for thread in threads:
+            thread.join()
+
+        if source_error:
+            raise source_error[0]
+
+        return results
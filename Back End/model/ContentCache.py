@@ -0,0 +1,130 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from model.Database import Database
+from EnvironmentVars import CONTENT_CACHE_FILE, CONTENT_CACHE_MAX_BYTES
+
+def content_hash(*parts: str) -> str:
+    digest = hashlib.sha256()
+
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\0")
+
+    return digest.hexdigest()
+
+def normalize_text(text: str) -> str:
+    # Whitespace differences between two extractions of the same exam should not miss the cache
+    return " ".join(text.split())
+
+class ContentCache:
+    # Content-addressed store for expensive, deterministic results (extracted
+    # document text, concept maps), persisted in SQLite and evicted by least
+    # recent access once the stored values exceed max_bytes
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, cache_file: str, max_bytes: int = CONTENT_CACHE_MAX_BYTES):
+        self.cache_file = cache_file
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.__local = threading.local()
+
+        self.connection().execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )
+        """)
+        self.connection().execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+
+    @staticmethod
+    def shared():
+        if ContentCache._shared is None:
+            with ContentCache._shared_lock:
+                if ContentCache._shared is None:
+                    ContentCache._shared = ContentCache(os.path.join(Database.get_database_path(), CONTENT_CACHE_FILE))
+
+        return ContentCache._shared
+
+    def connection(self):
+        connection = getattr(self.__local, "connection", None)
+
+        if connection is None:
+            connection = sqlite3.connect(self.cache_file, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.__local.connection = connection
+
+        return connection
+
+    def get(self, namespace: str, key: str):
+        connection = self.connection()
+        row = connection.execute("SELECT value FROM entries WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        connection.execute("UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?", (time.time(), namespace, key))
+        return json.loads(row[0])
+
+    def put(self, namespace: str, key: str, value):
+        serialized = json.dumps(value)
+        now = time.time()
+        connection = self.connection()
+
+        connection.execute("BEGIN IMMEDIATE")
+
+        try:
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (namespace, key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (namespace, key, serialized, len(serialized), now, now)
+            )
+            self.__evict(connection)
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        else:
+            connection.execute("COMMIT")
+
+    def __evict(self, connection):
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently accessed entries until the cache fits again
+        for namespace, key, size in connection.execute("SELECT namespace, key, size FROM entries ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+
+            connection.execute("DELETE FROM entries WHERE namespace = ? AND key = ?", (namespace, key))
+            total -= size
+
+    def invalidate(self, namespace: str = None):
+        # Returns the number of removed entries
+        if namespace is None:
+            return self.connection().execute("DELETE FROM entries").rowcount
+
+        return self.connection().execute("DELETE FROM entries WHERE namespace = ?", (namespace,)).rowcount
+
+    def stats(self):
+        rows = self.connection().execute("SELECT namespace, COUNT(*), SUM(size) FROM entries GROUP BY namespace").fetchall()
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "namespaces": {namespace: {"entries": count, "bytes": size} for namespace, count, size in rows}
+        }
@@ -0,0 +1,194 @@
+import atexit
+import threading
+from collections import OrderedDict
+from model.data_models.Conversation import Conversation
+from model.storage.StorageEngine import StorageEngine, ConversationConflictError
+from model.Logger import Logger
+from model.Tracing import Tracing
+
+logger = Logger("conversation_cache")
+
+def approximate_size(conversation: Conversation):
+    # Rough in-memory footprint in characters; good enough for a byte budget
+    size = len(conversation.documentText) if conversation.document_loaded else 0
+    size += sum(len(entry) for entry in conversation.conversation_history)
+    size += sum(len(concept.name) + 64 * (1 + len(concept.subConcepts)) for concept in conversation.concepts)
+    return size
+
+class CacheEntry:
+    def __init__(self, conversation: Conversation, dirty: bool):
+        self.conversation = conversation
+        self.size = approximate_size(conversation)
+        self.dirty = dirty
+
+class ConversationCache:
+    # Bounded LRU of hydrated Conversation objects. Dirty entries are written to
+    # the storage engine by a background flusher (write-behind), so a burst of
+    # turns on one conversation coalesces into a single save. An entry whose
+    # conversation was saved by someone else in the meantime (another process,
+    # a maintenance script) is dropped with its pending change, so the next read
+    # loads the stored version; the other entries are still written.
+
+    def __init__(self, engine: StorageEngine, max_entries: int, max_bytes: int, flush_interval: float = None):
+        self.engine = engine
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.flushes = 0
+        self.conflicts = 0
+        self.total_bytes = 0
+
+        self.__entries = OrderedDict()
+        self.__lock = threading.RLock()
+        self.__stop = threading.Event()
+        self.__flusher = None
+
+        if flush_interval:
+            self.__flusher = threading.Thread(target=self.__flush_loop, name="conversation-cache-flusher", daemon=True)
+            self.__flusher.start()
+            atexit.register(self.close)
+
+    def get(self, conversation_id: str):
+        with self.__lock:
+            entry = self.__entries.get(str(conversation_id))
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.__entries.move_to_end(str(conversation_id))
+            return entry.conversation
+
+    def put(self, conversation: Conversation, dirty: bool = False):
+        conversation_id = str(conversation.Id)
+
+        with self.__lock:
+            previous = self.__entries.pop(conversation_id, None)
+
+            if previous is not None:
+                self.total_bytes -= previous.size
+                dirty = dirty or previous.dirty
+
+            entry = CacheEntry(conversation, dirty)
+            self.__entries[conversation_id] = entry
+            self.total_bytes += entry.size
+            self.__evict()
+
+    def mark_dirty(self, conversation: Conversation, added_entries=()):
+        with self.__lock:
+            entry = self.__entries.get(str(conversation.Id))
+
+            if entry is None or entry.conversation is not conversation:
+                self.put(conversation, dirty=True)
+                return
+
+            added_size = sum(len(added_entry) for added_entry in added_entries)
+            entry.size += added_size
+            self.total_bytes += added_size
+            entry.dirty = True
+            self.__entries.move_to_end(str(conversation.Id))
+            self.__evict()
+
+    def invalidate(self, conversation_id: str):
+        with self.__lock:
+            entry = self.__entries.get(str(conversation_id))
+
+            if entry is None:
+                return
+
+            if entry.dirty:
+                try:
+                    self.__save(entry)
+                except ConversationConflictError as e:
+                    # Dropped below either way
+                    self.__log_conflict(conversation_id, e)
+
+            self.__remove(str(conversation_id))
+
+    def flush(self):
+        # Saves happen under the lock so a concurrent miss can never reload a
+        # conversation from disk while its newer state is still being written.
+        # A failed save is logged and leaves that entry dirty for the next flush.
+        with self.__lock:
+            for conversation_id, entry in list(self.__entries.items()):
+                if not entry.dirty:
+                    continue
+
+                try:
+                    self.__save(entry)
+                except ConversationConflictError as e:
+                    self.__log_conflict(conversation_id, e)
+                    self.__remove(conversation_id)
+                except Exception as e:
+                    logger.error("cache_flush_failed", exc_info=True, conversation_id=conversation_id, error=str(e))
+
+    def stats(self):
+        with self.__lock:
+            return {
+                "entries": len(self.__entries),
+                "bytes": self.total_bytes,
+                "dirty": sum(1 for entry in self.__entries.values() if entry.dirty),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "flushes": self.flushes,
+                "conflicts": self.conflicts
+            }
+
+    def close(self):
+        self.__stop.set()
+
+        if self.__flusher is not None and self.__flusher is not threading.current_thread():
+            self.__flusher.join(timeout=self.flush_interval)
+
+        # Runs at exit, where an exception would only hide what was saved
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error("cache_close_failed", exc_info=True, error=str(e))
+
+    def __evict(self):
+        # Always keep the most recently used entry, even if it alone exceeds max_bytes
+        while len(self.__entries) > 1 and (len(self.__entries) > self.max_entries or self.total_bytes > self.max_bytes):
+            conversation_id, entry = next(iter(self.__entries.items()))
+
+            # Write a dirty entry back before dropping it so a failed save keeps it cached
+            # (over budget until a later flush succeeds) instead of failing the caller's read
+            if entry.dirty:
+                try:
+                    self.__save(entry)
+                except ConversationConflictError as e:
+                    self.__log_conflict(conversation_id, e)
+                except Exception as e:
+                    logger.error("cache_evict_failed", exc_info=True, conversation_id=conversation_id, error=str(e))
+                    break
+
+            self.__remove(conversation_id)
+            self.evictions += 1
+
+    def __remove(self, conversation_id: str):
+        entry = self.__entries.pop(conversation_id)
+        self.total_bytes -= entry.size
+
+    def __log_conflict(self, conversation_id: str, error: ConversationConflictError):
+        self.conflicts += 1
+        logger.warning("cache_entry_stale", conversation_id=str(conversation_id), error=str(error))
+
+    def __save(self, entry: CacheEntry):
+        with Tracing.span("db_save"):
+            self.engine.save_conversation(entry.conversation)
+
+        entry.dirty = False
+        self.flushes += 1
+
+    def __flush_loop(self):
+        while not self.__stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("cache_flush_failed", exc_info=True, error=str(e))
@@ -0,0 +1,77 @@
+import os
+import threading
+import zlib
+from contextlib import contextmanager
+from uuid import UUID
+
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows, where only the single-process development server is used
+    fcntl = None
+
+class ConversationLock:
+    # Serializes changes to one conversation across threads and, through advisory
+    # file locks, across the worker processes of the production server. Work on
+    # different conversations proceeds in parallel.
+
+    STRIPES = 64
+
+    def __init__(self, lock_path: str):
+        self.lock_path = lock_path
+        # Used only when advisory file locks are unavailable
+        self.__stripes = [threading.Lock() for _ in range(ConversationLock.STRIPES)]
+
+        os.makedirs(lock_path, exist_ok=True)
+
+    @staticmethod
+    def lock_name(conversation_id) -> str:
+        # Lock file names come from request data, so only conversation ids (UUIDs) are accepted;
+        # raises ValueError for anything else, e.g. "../../name"
+        return str(UUID(str(conversation_id)))
+
+    def get_file_path(self, conversation_id: str):
+        return os.path.join(self.lock_path, f"{ConversationLock.lock_name(conversation_id)}.lock")
+
+    @contextmanager
+    def hold(self, conversation_id: str):
+        conversation_id = ConversationLock.lock_name(conversation_id)
+
+        if fcntl is None:
+            with self.__stripes[zlib.crc32(conversation_id.encode("utf-8")) % ConversationLock.STRIPES]:
+                yield
+            return
+
+        file_path = self.get_file_path(conversation_id)
+
+        # Every acquisition opens its own file description, so flock also excludes
+        # other threads of this process, not just other processes
+        while True:
+            file = open(file_path, "a")
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+
+            # The holder may have removed the file (see remove) while we waited on it;
+            # a lock on the unlinked file excludes nobody, so start over on a new one
+            try:
+                if os.fstat(file.fileno()).st_ino == os.stat(file_path).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+
+            file.close()
+
+        with file:
+            try:
+                yield
+            finally:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+    def remove(self, conversation_id: str):
+        # Deletes the conversation's lock file once it is gone from storage; call while holding it
+        if fcntl is None:
+            return
+
+        try:
+            os.remove(self.get_file_path(conversation_id))
+        except FileNotFoundError:
+            pass
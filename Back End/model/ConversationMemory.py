@@ -0,0 +1,131 @@
+from typing import List
+from model.data_models.Conversation import Conversation
+from model.providers.OpenAI import Model
+from model.providers.ProviderRegistry import ProviderRegistry
+from model.TokenCounter import estimate_tokens
+from model.Logger import Logger
+from EnvironmentVars import MEMORY_RECENT_TURNS, MEMORY_SUMMARY_BATCH_TURNS, MEMORY_TOKEN_BUDGET, MEMORY_SUMMARY_TOKENS
+
+logger = Logger("conversation_memory")
+
+class ConversationMemory:
+    # Bounds how much of the transcript goes into each prompt. Recent turns are kept
+    # verbatim; older ones are folded into conversation.summary, so the prompt size
+    # (and latency) of a turn does not grow with the length of the session.
+
+    summary_model = Model.GPT_4O_MINI
+    stats = {"prompts": 0, "summaries": 0, "summary_failures": 0, "history_tokens": 0, "prompt_tokens": 0, "tokens_saved": 0}
+
+    @staticmethod
+    def update(conversation: Conversation, recent_turns: int = MEMORY_RECENT_TURNS, token_budget: int = MEMORY_TOKEN_BUDGET) -> bool:
+        # Folds turns that left the recent window into the summary once a batch has
+        # built up, or earlier if the transcript no longer fits the budget.
+        # Returns True if the summary changed.
+        history = conversation.conversation_history
+        start = conversation.summarized_entries
+        pending = len(history) - 2 * recent_turns - start
+
+        if pending < 2 * MEMORY_SUMMARY_BATCH_TURNS and ConversationMemory.tokens(conversation) <= token_budget:
+            return False
+
+        # Keep as many recent entries as fit next to a full-size summary
+        keep_from = len(history)
+        used = 0
+
+        while keep_from > start and len(history) - keep_from < 2 * recent_turns:
+            cost = estimate_tokens(history[keep_from - 1])
+
+            if used + cost > token_budget - MEMORY_SUMMARY_TOKENS:
+                break
+
+            used += cost
+            keep_from -= 1
+
+        if keep_from == start:
+            return False
+
+        try:
+            conversation.summary = ConversationMemory.summarize(conversation.summary, history[start:keep_from])
+        except Exception as e:
+            # The entries stay verbatim; build() trims them if they do not fit
+            logger.warning("summary_failed", conversation_id=str(conversation.Id), error=str(e))
+            ConversationMemory.stats["summary_failures"] += 1
+            return False
+
+        conversation.summarized_entries = keep_from
+        ConversationMemory.stats["summaries"] += 1
+
+        return True
+
+    @staticmethod
+    def summarize(summary: str, entries: List[str]) -> str:
+        model = ProviderRegistry.get(ConversationMemory.summary_model)
+        transcript = "\n".join(entries)
+
+        system = """
+        You maintain a running summary of a tutoring conversation in which the user teaches Alex, a student, the material of an exam.
+        """
+
+        prompt = f"""
+        Current summary:
+        {summary or "(none yet)"}
+
+        New conversation turns:
+        {transcript}
+
+        Rewrite the summary so it also covers the new turns. Keep what the user has explained, what Alex has understood or is still confused about, and any open questions.
+        Use at most {MEMORY_SUMMARY_TOKENS * 3 // 4} words and respond with just the summary.
+        """
+
+        return model.query(prompt, temperature=0, system=system).strip()
+
+    @staticmethod
+    def tokens(conversation: Conversation) -> int:
+        # Size of what build() would include: the summary and every entry after it
+        history = conversation.conversation_history
+        return estimate_tokens(conversation.summary) + sum(estimate_tokens(entry) for entry in history[conversation.summarized_entries:])
+
+    @staticmethod
+    def summarized_tokens(conversation: Conversation) -> int:
+        # Estimated size of the entries folded into the summary, kept as a running total next to
+        # the cursor: only the entries folded since the last call are counted (all of them once
+        # after the conversation is loaded)
+        counted, size = getattr(conversation, "_summarized_size", None) or (0, 0)
+
+        if counted > conversation.summarized_entries:
+            counted, size = 0, 0
+
+        size += sum(estimate_tokens(entry) for entry in conversation.conversation_history[counted:conversation.summarized_entries])
+        conversation._summarized_size = (conversation.summarized_entries, size)
+
+        return size
+
+    @staticmethod
+    def build(conversation: Conversation, token_budget: int = MEMORY_TOKEN_BUDGET) -> str:
+        history = conversation.conversation_history
+        entries = history[conversation.summarized_entries:]
+        sizes = [estimate_tokens(entry) for entry in entries]
+        summary_tokens = estimate_tokens(conversation.summary)
+        history_tokens = ConversationMemory.summarized_tokens(conversation) + sum(sizes)
+
+        # Only needed when summarizing failed: the oldest verbatim entries are dropped
+        while entries and summary_tokens + sum(sizes) > token_budget:
+            entries.pop(0)
+            sizes.pop(0)
+
+        sections = []
+
+        if conversation.summary:
+            sections.append(f"Summary of the earlier conversation:\n{conversation.summary}")
+
+        if entries:
+            sections.append("Recent conversation:\n" + "\n".join(entries))
+
+        prompt_tokens = summary_tokens + sum(sizes)
+
+        ConversationMemory.stats["prompts"] += 1
+        ConversationMemory.stats["prompt_tokens"] += prompt_tokens
+        ConversationMemory.stats["history_tokens"] += history_tokens
+        ConversationMemory.stats["tokens_saved"] += max(0, history_tokens - prompt_tokens)
+
+        return "\n\n".join(sections)
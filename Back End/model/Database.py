@@ -1,59 +1,306 @@
 from model.data_models.Conversation import Conversation
-import json
+from model.storage.StorageEngine import StorageEngine, ConversationConflictError
+from model.storage.JsonStorage import JsonStorage
+from model.storage.SqliteStorage import SqliteStorage
+from model.storage.ConversationIndex import ConversationIndex
+from model.storage.ConversationArchive import ConversationArchive
+from model.storage.DocumentStore import DocumentStore
+from model.ConversationCache import ConversationCache
+from model.ConversationLock import ConversationLock
+from model.Tracing import Tracing
+from model.Logger import Logger
+from EnvironmentVars import DATABASE_ENGINE, DATABASE_FILE, CONVERSATION_CACHE_ENTRIES, CONVERSATION_CACHE_BYTES, WRITE_BEHIND_INTERVAL, CONVERSATION_INDEX_FILE
+from typing import List
 import os
+import threading
+
+logger = Logger("database")
 
 class Database:
+    _database_path = None
+    _engine = None
+    _cache = None
+    _cache_enabled = True
+    _conversation_lock = None
+    _index = None
+    _archive = None
+    _document_store = None
+    _document_store_lock = threading.Lock()
+    _engine_lock = threading.Lock()
+
     @staticmethod
     def get_database_path():
+        # Resolved once per process instead of probing the filesystem on every call
+        if Database._database_path is not None:
+            return Database._database_path
+
         # Check for database directory in current directory
         if os.path.exists("database"):
-            return "database"
+            Database._database_path = "database"
         # Check for database directory in Back End directory
         elif os.path.exists("Back End/database"):
-            return "Back End/database"
+            Database._database_path = "Back End/database"
         # If we can't find it, create it in the current directory
         else:
             os.makedirs("database", exist_ok=True)
-            return "database"
-    
+            Database._database_path = "database"
+
+        return Database._database_path
+
     @staticmethod
-    def save_conversation(conversation: Conversation):
-        conversation_dict = conversation.to_dict()        
-        
+    def create_engine(engine_name: str = DATABASE_ENGINE) -> StorageEngine:
         database_path = Database.get_database_path()
-        file_path = os.path.join(database_path, f"{conversation.Id}.json")
-        
-        with open(file_path, "w") as file:
-            json.dump(conversation_dict, file, indent=4)
-    
+
+        if engine_name == "sqlite":
+            return SqliteStorage(os.path.join(database_path, DATABASE_FILE), document_store=Database.get_document_store())
+        elif engine_name == "json":
+            return JsonStorage(database_path, document_store=Database.get_document_store())
+
+        raise Exception(f"Unknown database engine: {engine_name}")
+
     @staticmethod
-    def get_conversation(conversation_id: str):
-        database_path = Database.get_database_path()
-        file_path = os.path.join(database_path, f"{conversation_id}.json")
-        
-        try:
-            print(f"Attempting to open file: {file_path}")
-            with open(file_path, "r") as file:
-                conversation_data = json.load(file)
-                print("Loaded conversation data:", conversation_data)
-                try:
-                    return Conversation.from_dict(conversation_data)
-                except Exception as e:
-                    print(f"Error creating Conversation object: {str(e)}")
-                    raise Exception(f"Error converting data to Conversation: {str(e)}")
-        except FileNotFoundError:
-            # Check if the file actually exists in the correct location
-            current_dir = os.getcwd()
-            print(f"Current working directory: {current_dir}")
-            
-            # List files in the database directory to see if the file is there
+    def get_engine() -> StorageEngine:
+        if Database._engine is None:
+            imported = []
+
+            with Database._engine_lock:
+                if Database._engine is None:
+                    engine = Database.create_engine()
+
+                    # First start with SQLite: bring over the conversations of the legacy JSON engine
+                    if isinstance(engine, SqliteStorage) and engine.created:
+                        imported = Database.import_conversations(Database.create_engine("json"), engine)
+
+                    if CONVERSATION_CACHE_ENTRIES > 0 and Database._cache_enabled:
+                        Database._cache = ConversationCache(engine, CONVERSATION_CACHE_ENTRIES, CONVERSATION_CACHE_BYTES, WRITE_BEHIND_INTERVAL)
+
+                    Database._engine = engine
+
+            # Outside the lock, which get_index takes too
+            for conversation_id in imported:
+                Database.get_index().update(Database._engine.get_conversation(conversation_id))
+
+        return Database._engine
+
+    @staticmethod
+    def import_conversations(source: StorageEngine, target: StorageEngine, overwrite: bool = False) -> List[str]:
+        # Copies the conversations of one engine into another and returns the IDs of those copied.
+        # Existing conversations are skipped unless overwrite is set; failures are logged and skipped.
+        imported = []
+
+        for conversation_id in source.list_conversation_ids():
+            if not overwrite and target.conversation_exists(conversation_id):
+                continue
+
             try:
-                files = os.listdir(database_path)
-                print(f"Files in {database_path}: {files}")
-                
-                if f"{conversation_id}.json" in files:
-                    print(f"File {conversation_id}.json exists but could not be opened from {file_path}")
+                conversation = source.get_conversation(conversation_id)
+
+                # Overwriting on purpose, so take over the stored version instead of conflicting with it
+                if target.conversation_exists(conversation_id):
+                    conversation.version = target.get_conversation(conversation_id).version
+
+                target.save_conversation(conversation)
             except Exception as e:
-                print(f"Error listing database directory: {str(e)}")
-            
-            raise Exception(f"No conversation found with ID: {conversation_id}")
\ No newline at end of file
+                logger.error("conversation_import_failed", exc_info=True, conversation_id=conversation_id, error=str(e))
+                continue
+
+            imported.append(conversation_id)
+
+        if imported:
+            logger.info("conversations_imported", conversations=len(imported))
+
+        return imported
+
+    @staticmethod
+    def set_engine(engine: StorageEngine, cache: ConversationCache = None):
+        with Database._engine_lock:
+            if Database._cache is not None:
+                Database._cache.close()
+
+            Database._engine = engine
+            Database._cache = cache
+
+    @staticmethod
+    def disable_cache():
+        # Called in each worker of the multi-process server: another process may change a
+        # conversation at any time, so every read must go to the storage engine
+        Database._cache_enabled = False
+
+        if Database._cache is not None:
+            Database.set_engine(Database._engine)
+
+    @staticmethod
+    def lock(conversation_id: str):
+        # Hold while reading, changing and saving a conversation so that concurrent
+        # turns on it are applied one after the other instead of overwriting each other.
+        # Check that the conversation exists first: every id locked leaves a lock file behind.
+        return Database.get_conversation_lock().hold(conversation_id)
+
+    @staticmethod
+    def get_conversation_lock() -> ConversationLock:
+        if Database._conversation_lock is None:
+            with Database._engine_lock:
+                if Database._conversation_lock is None:
+                    Database._conversation_lock = ConversationLock(os.path.join(Database.get_database_path(), "locks"))
+
+        return Database._conversation_lock
+
+    @staticmethod
+    def get_index() -> ConversationIndex:
+        if Database._index is None:
+            with Database._engine_lock:
+                if Database._index is None:
+                    index = ConversationIndex(os.path.join(Database.get_database_path(), CONVERSATION_INDEX_FILE))
+
+                    # First start with the index: add the conversations stored so far. Their
+                    # update time is unknown here, so retention counts from now for them.
+                    if index.created:
+                        engine = Database._engine or Database.create_engine()
+
+                        for conversation_id in engine.list_conversation_ids():
+                            index.update(engine.get_conversation(conversation_id))
+
+                        archive = Database._archive or ConversationArchive(os.path.join(Database.get_database_path(), "archive"), Database.get_document_store())
+
+                        for conversation_id in archive.list_conversation_ids():
+                            index.update(archive.load(conversation_id))
+                            index.set_archived(conversation_id, True)
+
+                    Database._index = index
+
+        return Database._index
+
+    @staticmethod
+    def get_document_store() -> DocumentStore:
+        # Own lock: engines are created while _engine_lock is held
+        if Database._document_store is None:
+            with Database._document_store_lock:
+                if Database._document_store is None:
+                    Database._document_store = DocumentStore(os.path.join(Database.get_database_path(), "documents"))
+
+        return Database._document_store
+
+    @staticmethod
+    def get_archive() -> ConversationArchive:
+        if Database._archive is None:
+            with Database._engine_lock:
+                if Database._archive is None:
+                    Database._archive = ConversationArchive(os.path.join(Database.get_database_path(), "archive"), Database.get_document_store())
+
+        return Database._archive
+
+    @staticmethod
+    def get_cache() -> ConversationCache:
+        Database.get_engine()
+        return Database._cache
+
+    @staticmethod
+    def write_behind() -> bool:
+        cache = Database.get_cache()
+        return cache is not None and bool(cache.flush_interval)
+
+    @staticmethod
+    def save_conversation(conversation: Conversation):
+        cache = Database.get_cache()
+
+        if Database.write_behind():
+            cache.put(conversation, dirty=True)
+            Database.get_index().update(conversation)
+            return
+
+        try:
+            with Tracing.span("db_save"):
+                Database.get_engine().save_conversation(conversation)
+        except ConversationConflictError:
+            Database.invalidate(conversation)
+            raise
+
+        Database.get_index().update(conversation)
+
+        if cache is not None:
+            cache.put(conversation)
+
+    @staticmethod
+    def append_turn(conversation: Conversation, entries: List[str]):
+        # Appends the entries to the conversation and persists only the new turn
+        position = conversation.append_turn(entries)
+
+        if Database.write_behind():
+            Database.get_cache().mark_dirty(conversation, entries)
+            Database.get_index().update(conversation)
+            return
+
+        try:
+            with Tracing.span("db_save"):
+                Database.get_engine().append_turn(conversation, position, entries)
+        except ConversationConflictError:
+            Database.invalidate(conversation)
+            raise
+
+        Database.get_index().update(conversation)
+
+    @staticmethod
+    def invalidate(conversation: Conversation):
+        # The cached copy is stale (or holds a rejected change); the next read reloads it
+        cache = Database.get_cache()
+
+        if cache is not None:
+            cache.invalidate(conversation.Id)
+
+    @staticmethod
+    def get_conversation(conversation_id: str):
+        cache = Database.get_cache()
+
+        if cache is not None:
+            conversation = cache.get(conversation_id)
+
+            if conversation is not None:
+                return conversation
+
+        try:
+            with Tracing.span("db_load"):
+                conversation = Database.get_engine().get_conversation(conversation_id)
+        except Exception:
+            if not Database.get_index().is_archived(conversation_id):
+                raise
+
+            conversation = Database.restore(conversation_id)
+
+        if cache is not None:
+            cache.put(conversation)
+
+        return conversation
+
+    @staticmethod
+    def archive(conversation_id: str):
+        # Moves a conversation out of the storage engine; hold Database.lock(conversation_id)
+        conversation = Database.get_conversation(conversation_id)
+        # Writes back a pending write-behind change first, so nothing is saved after the delete
+        Database.invalidate(conversation)
+
+        Database.get_archive().store(conversation)
+        Database.get_engine().delete_conversation(conversation_id)
+        Database.get_index().set_archived(conversation_id, True)
+        # Recreated if the conversation is restored
+        Database.get_conversation_lock().remove(conversation_id)
+
+    @staticmethod
+    def restore(conversation_id: str) -> Conversation:
+        try:
+            conversation = Database.get_archive().load(conversation_id)
+            Database.get_engine().save_conversation(conversation)
+        except (FileNotFoundError, ConversationConflictError):
+            # Another process restored it in the meantime
+            return Database.get_engine().get_conversation(conversation_id)
+
+        Database.get_index().set_archived(conversation_id, False)
+        Database.get_archive().remove(conversation_id)
+
+        return conversation
+
+    @staticmethod
+    def flush():
+        cache = Database.get_cache()
+
+        if cache is not None:
+            cache.flush()
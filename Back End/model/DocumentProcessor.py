@@ -1,20 +1,136 @@
-import io
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
 from PyPDF2 import PdfReader
+from model.ContentCache import ContentCache
+from model.Tracing import Tracing
+from EnvironmentVars import MAX_DOCUMENT_CHARS, PDF_EXTRACTION_WORKERS, PDF_PAGES_PER_TASK
+
+def extract_page_range(path: str, start: int, end: int) -> List[str]:
+    # Runs inside a pool worker, so it reopens the PDF from the spooled file
+    reader = PdfReader(path)
+    return [reader.pages[index].extract_text() or "" for index in range(start, end)]
+
+class ExtractionResult:
+    def __init__(self, text: str, page_offsets: List[int], page_count: int, exceeded: bool, document_hash: str = None):
+        self.text = text
+        # Character offset in text where each extracted page starts
+        self.page_offsets = page_offsets
+        self.page_count = page_count
+        # True when extraction stopped early because the character budget ran out
+        self.exceeded = exceeded
+        # SHA-256 of the uploaded PDF bytes
+        self.document_hash = document_hash
 
 class DocumentProcessor:
-    def extractText(file_obj):            
-        text = ""
+    _pool = None
+    _pool_lock = threading.Lock()
+
+    def extractText(file_obj):
+        return DocumentProcessor.extract(file_obj, max_chars=None).text
+
+    @staticmethod
+    def extract(file_obj, max_chars: int = MAX_DOCUMENT_CHARS) -> ExtractionResult:
+        path, document_hash = DocumentProcessor.spool(file_obj)
 
         try:
-            # Create a BytesIO object from the file data
-            file_stream = io.BytesIO(file_obj.read())
-            
-            # Process the PDF using PyPDF2
-            reader = PdfReader(file_stream)
-            for page in reader.pages:
-                text += page.extract_text()
-        
+            # The same PDF uploaded again is served from the content cache without parsing
+            cached = ContentCache.shared().get("document_text", document_hash)
+
+            if cached is not None:
+                exceeded = max_chars is not None and len(cached["text"]) > max_chars
+                return ExtractionResult(cached["text"], cached["page_offsets"], len(cached["page_offsets"]), exceeded, document_hash)
+
+            pages = []
+            page_offsets = []
+            length = 0
+            exceeded = False
+
+            with Tracing.span("pdf_extract"):
+                for page_text in DocumentProcessor.iter_pages(path):
+                    page_offsets.append(length)
+                    pages.append(page_text)
+                    length += len(page_text)
+
+                    if max_chars is not None and length > max_chars:
+                        exceeded = True
+                        break
+
+            Tracing.count("pdf_pages", len(pages))
+            result = ExtractionResult("".join(pages), page_offsets, len(pages), exceeded, document_hash)
+
+            # Partial extractions are not cached since a larger budget would need the rest
+            if not exceeded:
+                ContentCache.shared().put("document_text", document_hash, {"text": result.text, "page_offsets": page_offsets})
+
+            return result
+
         except Exception as e:
             raise Exception(f"Error extracting text from PDF: {str(e)}")
-            
-        return text
\ No newline at end of file
+
+        finally:
+            os.remove(path)
+
+    @staticmethod
+    def spool(file_obj):
+        # Copy the upload to disk in chunks rather than holding it all in memory,
+        # hashing the bytes on the way for the content cache
+        digest = hashlib.sha256()
+
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as spooled:
+            while True:
+                chunk = file_obj.read(1024 * 1024)
+
+                if not chunk:
+                    break
+
+                digest.update(chunk)
+                spooled.write(chunk)
+
+            return spooled.name, digest.hexdigest()
+
+    @staticmethod
+    def iter_pages(path: str):
+        # Yields page texts in order; pages are extracted ahead by the process pool
+        page_count = len(PdfReader(path).pages)
+
+        if page_count <= PDF_PAGES_PER_TASK or PDF_EXTRACTION_WORKERS <= 1:
+            for page_text in extract_page_range(path, 0, page_count):
+                yield page_text
+            return
+
+        ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count)) for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+        pool = DocumentProcessor.get_pool()
+        pending = []
+
+        try:
+            for start, end in ranges:
+                pending.append(pool.submit(extract_page_range, path, start, end))
+
+                # Keep a bounded window in flight so an early stop wastes little work
+                if len(pending) >= PDF_EXTRACTION_WORKERS * 2:
+                    for page_text in pending.pop(0).result():
+                        yield page_text
+
+            while pending:
+                for page_text in pending.pop(0).result():
+                    yield page_text
+
+        finally:
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    def get_pool() -> ProcessPoolExecutor:
+        if DocumentProcessor._pool is None:
+            with DocumentProcessor._pool_lock:
+                if DocumentProcessor._pool is None:
+                    # Spawned, not forked: the server's other threads may hold locks (SQLite,
+                    # logging, the AsyncRunner loop) that a forked child would inherit held
+                    DocumentProcessor._pool = ProcessPoolExecutor(max_workers=PDF_EXTRACTION_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+
+        return DocumentProcessor._pool
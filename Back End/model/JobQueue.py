@@ -0,0 +1,241 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from uuid import uuid4
+from model.Database import Database
+from model.Logger import Logger
+from EnvironmentVars import JOBS_FILE, JOB_WORKERS, JOB_LEASE_SECONDS, JOB_POLL_INTERVAL, JOB_MAX_ATTEMPTS, JOB_RETENTION_SECONDS, JOB_PRUNE_INTERVAL, BATCH_JOB_WORKERS
+
+logger = Logger("jobs")
+
+class JobQueue:
+    # Durable background job queue. Jobs are rows in SQLite, so queued work and
+    # jobs whose worker died (lease expired) are picked up again after a restart.
+    # Finished jobs are kept for JOB_RETENTION_SECONDS so pollers can read the result.
+    # Several queues can share one jobs file: each one's workers only claim the kinds
+    # registered with it, so long jobs can get workers of their own (see batches()).
+
+    _shared = None
+    _batches = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, jobs_file: str, workers: int = JOB_WORKERS):
+        self.jobs_file = jobs_file
+        self.workers = workers
+        self.handlers = {}
+        self.__local = threading.local()
+        self.__wakeup = threading.Event()
+        self.__threads = []
+        self.__lock = threading.Lock()
+        self.__pruned_at = 0.0
+
+        self.connection().execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_expires_at REAL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self.connection().execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self.connection().execute("CREATE INDEX IF NOT EXISTS jobs_finished ON jobs (status, updated_at)")
+
+    @staticmethod
+    def shared():
+        if JobQueue._shared is None:
+            with JobQueue._shared_lock:
+                if JobQueue._shared is None:
+                    JobQueue._shared = JobQueue(os.path.join(Database.get_database_path(), JOBS_FILE))
+
+        return JobQueue._shared
+
+    @staticmethod
+    def batches():
+        # Batch uploads run for minutes; BATCH_JOB_WORKERS caps how many run at once
+        # and they never hold up the jobs of the shared queue
+        if JobQueue._batches is None:
+            with JobQueue._shared_lock:
+                if JobQueue._batches is None:
+                    JobQueue._batches = JobQueue(os.path.join(Database.get_database_path(), JOBS_FILE), BATCH_JOB_WORKERS)
+
+        return JobQueue._batches
+
+    def connection(self):
+        connection = getattr(self.__local, "connection", None)
+
+        if connection is None:
+            connection = sqlite3.connect(self.jobs_file, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.__local.connection = connection
+
+        return connection
+
+    def register(self, kind: str, handler):
+        # handler(payload, report) returns the job's result; report(partial_result)
+        # publishes intermediate results to pollers while the job runs
+        self.handlers[kind] = handler
+
+    def start(self):
+        with self.__lock:
+            while len(self.__threads) < self.workers:
+                thread = threading.Thread(target=self.__work, name=f"job-worker-{len(self.__threads)}", daemon=True)
+                thread.start()
+                self.__threads.append(thread)
+
+    def submit(self, kind: str, payload: dict) -> str:
+        job_id = str(uuid4())
+        now = time.time()
+
+        self.connection().execute(
+            "INSERT INTO jobs (id, kind, payload, status, created_at, updated_at) VALUES (?, ?, ?, 'queued', ?, ?)",
+            (job_id, kind, json.dumps(payload), now, now)
+        )
+
+        self.start()
+        self.__wakeup.set()
+
+        return job_id
+
+    def get(self, job_id: str):
+        row = self.connection().execute(
+            "SELECT id, kind, status, result, error, attempts, created_at, updated_at FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            "job_id": row[0],
+            "kind": row[1],
+            "status": row[2],
+            "result": json.loads(row[3]) if row[3] else None,
+            "error": row[4],
+            "attempts": row[5],
+            "created_at": row[6],
+            "updated_at": row[7]
+        }
+
+    def claim(self):
+        # Takes the oldest queued job of a registered kind, or such a running job whose
+        # worker stopped renewing its lease
+        kinds = list(self.handlers)
+
+        if not kinds:
+            return None
+
+        connection = self.connection()
+        now = time.time()
+
+        connection.execute("BEGIN IMMEDIATE")
+
+        try:
+            row = connection.execute(
+                f"""
+                SELECT id, kind, payload, attempts FROM jobs
+                WHERE (status = 'queued' OR (status = 'running' AND lease_expires_at < ?)) AND kind IN ({", ".join("?" * len(kinds))})
+                ORDER BY created_at LIMIT 1
+                """,
+                (now, *kinds)
+            ).fetchone()
+
+            if row is not None:
+                connection.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_expires_at = ?, updated_at = ? WHERE id = ?",
+                    (now + JOB_LEASE_SECONDS, now, row[0])
+                )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        else:
+            connection.execute("COMMIT")
+
+        return row
+
+    def prune(self, retention_seconds: float = JOB_RETENTION_SECONDS) -> int:
+        # Deletes jobs that finished more than retention_seconds ago; returns how many
+        return self.connection().execute(
+            "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND updated_at < ?", (time.time() - retention_seconds,)
+        ).rowcount
+
+    def __prune_if_due(self):
+        with self.__lock:
+            if time.time() - self.__pruned_at < JOB_PRUNE_INTERVAL:
+                return
+
+            self.__pruned_at = time.time()
+
+        try:
+            pruned = self.prune()
+        except sqlite3.Error as e:
+            logger.warning("job_prune_failed", error=str(e))
+            return
+
+        if pruned:
+            logger.info("jobs_pruned", jobs=pruned)
+
+    def __update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        self.connection().execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def __work(self):
+        # Nothing may end the loop: a dead worker would leave its jobs queued until restart
+        while True:
+            job = None
+
+            try:
+                job = self.claim()
+
+                if job is None:
+                    # Idle workers clean up; every process does, at most once per JOB_PRUNE_INTERVAL
+                    self.__prune_if_due()
+                    self.__wakeup.wait(JOB_POLL_INTERVAL)
+                    self.__wakeup.clear()
+                    continue
+
+                job_id, kind, payload, attempts = job
+                self.__run(job_id, kind, json.loads(payload), attempts + 1)
+            except Exception as e:
+                logger.error("job_worker_error", exc_info=True, job_id=job[0] if job else None)
+
+                if job is not None:
+                    self.__fail(job[0], e)
+
+                # Do not spin while the jobs file is unavailable
+                self.__wakeup.wait(JOB_POLL_INTERVAL)
+                self.__wakeup.clear()
+
+    def __fail(self, job_id: str, error: Exception):
+        try:
+            self.__update(job_id, status="failed", error=str(error), lease_expires_at=None)
+        except sqlite3.Error:
+            # The job stays running; once its lease expires it is claimed again
+            logger.warning("job_fail_update_failed", job_id=job_id)
+
+    def __run(self, job_id: str, kind: str, payload: dict, attempts: int):
+        handler = self.handlers[kind]
+
+        if attempts > JOB_MAX_ATTEMPTS:
+            self.__update(job_id, status="failed", error="Job was interrupted too many times")
+            return
+
+        def report(partial_result):
+            # Publishing progress also renews the lease
+            self.__update(job_id, result=json.dumps(partial_result), lease_expires_at=time.time() + JOB_LEASE_SECONDS)
+
+        try:
+            result = handler(payload, report)
+        except Exception as e:
+            logger.error("job_failed", exc_info=True, job_id=job_id, kind=kind, attempts=attempts)
+            self.__update(job_id, status="failed", error=str(e))
+        else:
+            self.__update(job_id, status="succeeded", result=json.dumps(result), lease_expires_at=None)
@@ -0,0 +1,66 @@
+import json
+import logging
+import sys
+import threading
+from EnvironmentVars import LOG_LEVEL
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage()
+        }
+        entry.update(getattr(record, "fields", {}))
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+class Logger:
+    # Leveled structured logger: every call is an event name plus key/value fields,
+    # written as one JSON line. Fields are only serialized when the level is enabled.
+
+    _configured = False
+    _lock = threading.Lock()
+
+    def __init__(self, name: str):
+        Logger.configure()
+        self.__logger = logging.getLogger(f"teachalex.{name}")
+
+    @staticmethod
+    def configure(level: str = LOG_LEVEL):
+        with Logger._lock:
+            if Logger._configured:
+                return
+
+            root = logging.getLogger("teachalex")
+            handler = logging.StreamHandler(sys.stderr)
+            handler.setFormatter(JsonFormatter())
+            root.addHandler(handler)
+            root.propagate = False
+            # Anything above CRITICAL turns logging off entirely
+            root.setLevel(logging.CRITICAL + 1 if level.upper() == "OFF" else level.upper())
+
+            Logger._configured = True
+
+    def enabled(self, level: int) -> bool:
+        return self.__logger.isEnabledFor(level)
+
+    def debug(self, event: str, **fields):
+        if self.__logger.isEnabledFor(logging.DEBUG):
+            self.__logger.debug(event, extra={"fields": fields})
+
+    def info(self, event: str, **fields):
+        if self.__logger.isEnabledFor(logging.INFO):
+            self.__logger.info(event, extra={"fields": fields})
+
+    def warning(self, event: str, **fields):
+        if self.__logger.isEnabledFor(logging.WARNING):
+            self.__logger.warning(event, extra={"fields": fields})
+
+    def error(self, event: str, exc_info: bool = False, **fields):
+        if self.__logger.isEnabledFor(logging.ERROR):
+            self.__logger.error(event, exc_info=exc_info, extra={"fields": fields})
@@ -0,0 +1,99 @@
+import re
+from typing import Dict, List
+from model.data_models.Conversation import Conversation
+from model.agents.ProgressAgent import ProgressAgent
+from model.retrieval.Chunker import question_labels, split_questions
+from model.retrieval.ContextBuilder import ContextBuilder
+from model.retrieval.DocumentIndex import tokenize
+from model.Logger import Logger
+from EnvironmentVars import (
+    PROGRESS_MAX_STEP, PROGRESS_MIN_WORDS, PROGRESS_FULL_MATCH_TERMS, PROGRESS_UNCERTAIN_LOW, PROGRESS_UNCERTAIN_HIGH,
+    PROGRESS_PARAPHRASE_WORDS, PROGRESS_LLM_ESCALATION
+)
+
+QUESTION_LABEL_TERM = re.compile(r"q\d+")
+
+logger = Logger("progress_scorer")
+
+class ProgressScorer:
+    # Turns one user message into progress steps for every concept of the conversation.
+    # A local lexical-overlap pass settles the clear cases; the uncertain ones are
+    # scored together in a single ProgressAgent call instead of one call per concept.
+
+    stats = {"evaluations": 0, "concepts_scored": 0, "escalations": 0, "escalated_concepts": 0, "escalation_failures": 0}
+
+    @staticmethod
+    def concept_terms(conversation: Conversation) -> List[set]:
+        # Terms of each concept's name and exam questions. Terms shared by every concept
+        # (general exam vocabulary) say nothing about which one is being taught.
+        blocks = [block for chunk in ContextBuilder.chunks(conversation) for block in split_questions(chunk)]
+        block_labels = [set(question_labels(block)) for block in blocks]
+        terms = []
+
+        for concept in conversation.concepts:
+            questions = set(concept.questions)
+            text = " ".join([concept.name] + [block for block, labels in zip(blocks, block_labels) if questions & labels])
+            # Question labels ("q3") match nothing the user would write
+            terms.append({term for term in tokenize(text) if not QUESTION_LABEL_TERM.fullmatch(term)})
+
+        if len(terms) > 1:
+            common = set.intersection(*terms)
+            terms = [concept_terms - common for concept_terms in terms]
+
+        return terms
+
+    @staticmethod
+    def match_strengths(conversation: Conversation, message: str) -> List[float]:
+        # 0..1 per concept: distinct concept terms in the message, relative to PROGRESS_FULL_MATCH_TERMS
+        message_terms = set(tokenize(message))
+        return [min(1.0, len(message_terms & terms) / PROGRESS_FULL_MATCH_TERMS) for terms in ProgressScorer.concept_terms(conversation)]
+
+    @staticmethod
+    def evaluate(conversation: Conversation, message: str, question: str = "") -> Dict[str, int]:
+        # Returns the progress step per concept name
+        ProgressScorer.stats["evaluations"] += 1
+        concepts = [concept for concept in conversation.concepts if concept.progress < 100]
+
+        # Short acknowledgements ("ok", "got it") teach nothing
+        if not concepts or len(tokenize(message)) < PROGRESS_MIN_WORDS:
+            return {}
+
+        strengths = dict(zip([concept.name for concept in conversation.concepts], ProgressScorer.match_strengths(conversation, message)))
+        steps = {}
+        uncertain = []
+
+        for concept in concepts:
+            strength = strengths[concept.name]
+
+            if strength < PROGRESS_UNCERTAIN_LOW:
+                steps[concept.name] = 0
+            elif strength >= PROGRESS_UNCERTAIN_HIGH:
+                steps[concept.name] = PROGRESS_MAX_STEP
+            else:
+                steps[concept.name] = round(PROGRESS_MAX_STEP * strength)
+                uncertain.append(concept)
+
+        # A long explanation matching no concept may be teaching the current one in other words
+        if not any(steps.values()) and len(tokenize(message)) >= PROGRESS_PARAPHRASE_WORDS and not uncertain:
+            uncertain.append(concepts[0])
+
+        ProgressScorer.stats["concepts_scored"] += len(concepts)
+
+        if uncertain and PROGRESS_LLM_ESCALATION:
+            ProgressScorer.stats["escalations"] += 1
+            ProgressScorer.stats["escalated_concepts"] += len(uncertain)
+
+            try:
+                steps.update(ProgressAgent().score(uncertain, message, question))
+            except Exception as e:
+                # Keep the local estimate for these concepts
+                logger.warning("progress_escalation_failed", conversation_id=str(conversation.Id), concepts=len(uncertain), error=str(e))
+                ProgressScorer.stats["escalation_failures"] += 1
+
+        return {name: step for name, step in steps.items() if step > 0}
+
+    @staticmethod
+    def apply(conversation: Conversation, steps: Dict[str, int]):
+        for concept in conversation.concepts:
+            if concept.name in steps:
+                concept.progress = min(100, concept.progress + steps[concept.name])
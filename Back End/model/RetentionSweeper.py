@@ -0,0 +1,85 @@
+import threading
+import time
+from model.Database import Database
+from model.Logger import Logger
+from EnvironmentVars import RETENTION_MAX_AGE_DAYS, RETENTION_MAX_CONVERSATIONS, RETENTION_SWEEP_INTERVAL, RETENTION_BATCH_SIZE
+
+logger = Logger("retention")
+
+class RetentionSweeper:
+    # Periodically archives stale conversations (see the RETENTION_* settings).
+    # Candidates come from the conversation index, so a sweep never scans the
+    # storage engine. Every worker process runs one; the conversation lock and
+    # the archived flag keep them from archiving the same conversation twice.
+
+    stats = {"sweeps": 0, "archived": 0, "failures": 0}
+
+    _thread = None
+    _lock = threading.Lock()
+    _stop = threading.Event()
+
+    @staticmethod
+    def start(interval: float = RETENTION_SWEEP_INTERVAL):
+        if interval <= 0 or (RETENTION_MAX_AGE_DAYS <= 0 and RETENTION_MAX_CONVERSATIONS <= 0):
+            return
+
+        with RetentionSweeper._lock:
+            if RetentionSweeper._thread is None:
+                RetentionSweeper._thread = threading.Thread(target=RetentionSweeper.__loop, args=(interval,), name="retention-sweeper", daemon=True)
+                RetentionSweeper._thread.start()
+
+    @staticmethod
+    def stop():
+        RetentionSweeper._stop.set()
+
+    @staticmethod
+    def __loop(interval: float):
+        while not RetentionSweeper._stop.wait(interval):
+            try:
+                RetentionSweeper.sweep()
+            except Exception as e:
+                logger.error("retention_sweep_failed", exc_info=True, error=str(e))
+
+    @staticmethod
+    def sweep(max_age_days: float = RETENTION_MAX_AGE_DAYS, max_conversations: int = RETENTION_MAX_CONVERSATIONS, batch_size: int = RETENTION_BATCH_SIZE) -> int:
+        # Returns the number of archived conversations
+        index = Database.get_index()
+        updated_before = time.time() - max_age_days * 24 * 60 * 60 if max_age_days > 0 else None
+        keep = max_conversations if max_conversations > 0 else None
+        archived = 0
+
+        RetentionSweeper.stats["sweeps"] += 1
+
+        if updated_before is None and keep is None:
+            return archived
+
+        while True:
+            conversation_ids = index.stale(updated_before, keep, batch_size)
+            archived_in_batch = 0
+
+            for conversation_id in conversation_ids:
+                try:
+                    with Database.lock(conversation_id):
+                        # Another process may have archived it since the index was read
+                        if index.is_archived(conversation_id):
+                            continue
+
+                        Database.archive(conversation_id)
+                except Exception as e:
+                    logger.error("archive_failed", exc_info=True, conversation_id=conversation_id, error=str(e))
+                    RetentionSweeper.stats["failures"] += 1
+                    continue
+
+                archived_in_batch += 1
+
+            archived += archived_in_batch
+            RetentionSweeper.stats["archived"] += archived_in_batch
+
+            # Stop on the last batch, or when nothing in a batch could be archived
+            if len(conversation_ids) < batch_size or archived_in_batch == 0:
+                break
+
+        if archived:
+            logger.info("retention_sweep", archived=archived)
+
+        return archived
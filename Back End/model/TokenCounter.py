@@ -0,0 +1,13 @@
+import math
+import re
+
+# Word pieces and individual punctuation marks, roughly how BPE tokenizers split English
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+def estimate_tokens(text: str) -> int:
+    # Local estimate without a tokenizer: long words cost more than one token,
+    # so take the larger of the piece count and the ~4 characters per token rule
+    if not text:
+        return 0
+
+    return max(len(TOKEN_PATTERN.findall(text)), math.ceil(len(text) / 4))
@@ -0,0 +1,162 @@
+import contextvars
+import threading
+import time
+from collections import defaultdict
+from EnvironmentVars import TRACING_ENABLED
+
+# Upper bounds (seconds) of the span duration histogram buckets
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class RequestTrace:
+    # Total time and count per span name within one request
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = defaultdict(lambda: [0.0, 0])
+        self.lock = threading.Lock()
+
+    def add(self, name: str, seconds: float):
+        with self.lock:
+            self.spans[name][0] += seconds
+            self.spans[name][1] += 1
+
+class Span:
+    __slots__ = ("name", "labels", "started")
+
+    def __init__(self, name: str, labels: dict):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        Tracing.observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+class NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_SPAN = NullSpan()
+
+class Tracing:
+    # Process-wide span timings and counters, rendered in the Prometheus text format.
+    # Spans also add up per request (see start_request) for the Server-Timing header.
+    # With TRACING_ENABLED off, span() returns a shared no-op and count() returns at once.
+
+    enabled = TRACING_ENABLED
+
+    _histograms = {}
+    _counters = defaultdict(float)
+    _lock = threading.Lock()
+    _request = contextvars.ContextVar("request_trace", default=None)
+
+    @staticmethod
+    def span(name: str, **labels):
+        # with Tracing.span("db_load"): ...
+        if not Tracing.enabled:
+            return NULL_SPAN
+
+        return Span(name, labels)
+
+    @staticmethod
+    def observe(name: str, seconds: float, **labels):
+        key = (name, tuple(sorted(labels.items())))
+
+        with Tracing._lock:
+            histogram = Tracing._histograms.get(key)
+
+            if histogram is None:
+                histogram = Tracing._histograms[key] = [[0] * len(BUCKETS), 0.0, 0]
+
+            for index, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    histogram[0][index] += 1
+
+            histogram[1] += seconds
+            histogram[2] += 1
+
+        trace = Tracing._request.get()
+
+        if trace is not None:
+            trace.add(name, seconds)
+
+    @staticmethod
+    def count(name: str, value: float = 1, **labels):
+        if not Tracing.enabled:
+            return
+
+        key = (name, tuple(sorted(labels.items())))
+
+        with Tracing._lock:
+            Tracing._counters[key] += value
+
+    @staticmethod
+    def start_request() -> RequestTrace:
+        if not Tracing.enabled:
+            return None
+
+        trace = RequestTrace()
+        Tracing._request.set(trace)
+        return trace
+
+    @staticmethod
+    def finish_request():
+        # Returns the request's trace, or None if tracing was off when it started
+        trace = Tracing._request.get()
+        Tracing._request.set(None)
+        return trace
+
+    @staticmethod
+    def render(gauges=()) -> str:
+        # gauges: (name, labels, value) samples from component stats, exported as they are
+        lines = []
+
+        with Tracing._lock:
+            histograms = sorted(Tracing._histograms.items())
+            counters = sorted(Tracing._counters.items())
+
+        if histograms:
+            lines.append("# HELP teachalex_span_seconds Time spent in instrumented operations")
+            lines.append("# TYPE teachalex_span_seconds histogram")
+
+        for (name, labels), (buckets, total, count) in histograms:
+            label_text = format_labels((("span", name),) + labels)
+
+            for bound, bucket_count in zip(BUCKETS, buckets):
+                lines.append(f"teachalex_span_seconds_bucket{format_labels((('span', name),) + labels + (('le', str(bound)),))} {bucket_count}")
+
+            lines.append(f"teachalex_span_seconds_bucket{format_labels((('span', name),) + labels + (('le', '+Inf'),))} {count}")
+            lines.append(f"teachalex_span_seconds_sum{label_text} {total}")
+            lines.append(f"teachalex_span_seconds_count{label_text} {count}")
+
+        declared = set()
+
+        for (name, labels), value in counters:
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE teachalex_{name}_total counter")
+
+            lines.append(f"teachalex_{name}_total{format_labels(labels)} {value}")
+
+        for name, labels, value in sorted(gauges, key=lambda gauge: gauge[0]):
+            if name not in declared:
+                declared.add(name)
+                lines.append(f"# TYPE teachalex_{name} gauge")
+
+            lines.append(f"teachalex_{name}{format_labels(tuple(labels.items()))} {value}")
+
+        return "\n".join(lines) + "\n"
+
+def format_labels(labels) -> str:
+    if not labels:
+        return ""
+
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + "}"
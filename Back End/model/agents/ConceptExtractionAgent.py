@@ -1,12 +1,194 @@
-from model.providers.OpenAI import OpenAI, Model
+from concurrent.futures import ThreadPoolExecutor
+from model.providers.OpenAI import Model
+from model.providers.ProviderRegistry import ProviderRegistry
 from model.Database import Database
+from model.ContentCache import ContentCache, content_hash, normalize_text
+from model.retrieval.Chunker import chunk_text
+from EnvironmentVars import CONCEPT_EXTRACTION_MODE, EXTRACTION_CHUNK_CHARS, EXTRACTION_CONCURRENCY, EXTRACTION_JSON_RETRIES
 import json
+import re
+
+# Bump whenever the extraction prompt changes so cached concept maps are not reused
+PROMPT_VERSION = "3"
+
+def parse_concepts(response: str):
+    # Accepts the reply with or without a ```json fence; raises ValueError if it is not a concept map
+    text = response.strip()
+    fenced = re.match(r"^```(?:json)?\s*(.*?)\s*```$", text, re.DOTALL)
+
+    concepts = json.loads(fenced.group(1) if fenced else text)
+
+    if not isinstance(concepts, dict) or not all(isinstance(questions, list) for questions in concepts.values()):
+        raise ValueError("Concept map must be a JSON object of question lists")
+
+    return concepts
+
+# The first complete key of a (possibly fenced) JSON object that is still being streamed
+FIRST_KEY_PATTERN = re.compile(r'^\s*(?:```(?:json)?\s*)?\{\s*"((?:[^"\\]|\\.)*)"\s*:')
+
+def first_concept_name(partial_response: str):
+    match = FIRST_KEY_PATTERN.match(partial_response)
+
+    try:
+        return json.loads(f'"{match.group(1)}"') if match else None
+    except ValueError:
+        return None
+
+def concept_key(name: str) -> str:
+    # "Linear Equations", "linear equations." and "Linear  Equations" are the same concept
+    return " ".join(re.sub(r"[^\w\s]", " ", name).casefold().split())
+
+def merge_concepts(partial_maps):
+    # Reduce step: concepts keep the name and position of their first appearance,
+    # and question lists are unioned in order
+    names = {}
+    merged = {}
+
+    for partial in partial_maps:
+        for name, questions in partial.items():
+            key = concept_key(name)
+
+            if key not in names:
+                names[key] = name
+                merged[name] = []
+
+            merged_questions = merged[names[key]]
+
+            for question in questions:
+                if question not in merged_questions:
+                    merged_questions.append(question)
+
+    return merged
 
 class ConceptExtractionAgent:
-    def __init__(self, model: Model = Model.O3_MINI):
-        self.model = OpenAI(model)
-    def extract(self, exam_text):
-        prompt = f"""
+    def __init__(self, model: Model = Model.O3_MINI, mode: str = CONCEPT_EXTRACTION_MODE, chunk_chars: int = EXTRACTION_CHUNK_CHARS):
+        self.model_name = model
+        self.model = ProviderRegistry.get(model)
+        self.mode = mode
+        self.chunk_chars = chunk_chars
+
+    def cache_key(self, exam_text):
+        # Includes how the map is extracted: a single prompt and a map-reduce over parts of
+        # a given size give different maps for the same exam
+        strategy = f"map_reduce:{self.chunk_chars}" if self.use_map_reduce(exam_text) else "single"
+        return content_hash(normalize_text(exam_text), self.model_name, PROMPT_VERSION, strategy)
+
+    def use_map_reduce(self, exam_text):
+        return self.mode == "map_reduce" and len(exam_text) > self.chunk_chars
+
+    def extract(self, exam_text, on_first_concept=None):
+        # on_first_concept(name) is called as soon as the first concept of the
+        # final map is known, before the rest of the extraction finishes
+        cache_key = self.cache_key(exam_text)
+        cached = ContentCache.shared().get("concepts", cache_key)
+
+        if cached is not None:
+            if on_first_concept and cached:
+                on_first_concept(next(iter(cached)))
+
+            return cached
+
+        if self.use_map_reduce(exam_text):
+            concepts = self.map_reduce(exam_text, on_first_concept)
+        else:
+            concepts = self.query(exam_text, on_first_concept=on_first_concept)
+
+        ContentCache.shared().put("concepts", cache_key, concepts)
+
+        return concepts
+
+    def stream(self, exam_text):
+        # Yields the raw JSON reply as it arrives; the parsed map is cached once complete.
+        # Map-reduce extractions have no single reply to forward, so the merged map is yielded at once.
+        cache_key = self.cache_key(exam_text)
+        cached = ContentCache.shared().get("concepts", cache_key)
+
+        if cached is not None:
+            yield json.dumps(cached)
+            return
+
+        if self.use_map_reduce(exam_text):
+            yield json.dumps(self.extract(exam_text))
+            return
+
+        response = ""
+        system, prompt = self.build_prompt(exam_text)
+
+        for token in self.model.stream(prompt, system=system):
+            response += token
+            yield token
+
+        try:
+            ContentCache.shared().put("concepts", cache_key, parse_concepts(response))
+        except ValueError:
+            # Not cached; the caller parses the streamed reply itself and reports the error
+            pass
+
+    def query(self, exam_text, part=None, on_first_concept=None):
+        # Invalid JSON is asked for again rather than failing the whole extraction
+        for attempt in range(EXTRACTION_JSON_RETRIES + 1):
+            system, prompt = self.build_prompt(exam_text, part)
+
+            if on_first_concept:
+                response = self.stream_first_concept(system, prompt, on_first_concept)
+            else:
+                response = self.model.query(prompt, system=system)
+
+            try:
+                return parse_concepts(response)
+            except ValueError:
+                if attempt == EXTRACTION_JSON_RETRIES:
+                    raise
+
+    def stream_first_concept(self, system, prompt, on_first_concept):
+        # Streams the reply so the first concept name can be reported as soon as its key is complete
+        response = ""
+        reported = False
+
+        for token in self.model.stream(prompt, system=system):
+            response += token
+
+            if not reported:
+                name = first_concept_name(response)
+
+                if name is not None:
+                    reported = True
+                    on_first_concept(name)
+
+        return response
+
+    def map_reduce(self, exam_text, on_first_concept=None):
+        chunks = chunk_text(exam_text, self.chunk_chars)
+
+        def extract_chunk(index):
+            try:
+                return self.query(chunks[index], part=(index + 1, len(chunks)))
+            except ValueError:
+                return None
+
+        # Map: chunks are extracted concurrently; the provider enforces the model's limits
+        with ThreadPoolExecutor(max_workers=EXTRACTION_CONCURRENCY) as executor:
+            partial_maps = []
+
+            # Results arrive in part order, so the first non-empty part holds the merged map's first concept
+            for partial in executor.map(extract_chunk, range(len(chunks))):
+                if on_first_concept and partial and not any(partial_maps):
+                    on_first_concept(next(iter(partial)))
+
+                partial_maps.append(partial)
+
+        if all(partial is None for partial in partial_maps):
+            raise ValueError("No valid concept map was returned for any part of the exam")
+
+        # Reduce: a chunk that never produced valid JSON is skipped instead of losing the rest
+        return merge_concepts(partial for partial in partial_maps if partial is not None)
+
+    def build_prompt(self, exam_text, part=None):
+        # Returns the (system, user) prompt pair. The instructions and exam text form
+        # the stable prefix; only the part description varies between calls.
+        scope = f"The exam is split into {part[1]} parts; you are given part {part[0]}. Only consider the questions in this part." if part else ""
+
+        system = f"""
         You are an AI assistant helping to extract key concepts from an exam for a teaching-focused learning application. Your goal is to identify the most important concepts that a student would need to understand in order to effectively teach the material to someone else.
 
         Analyze the following exam text and extract fundamental concepts that:
@@ -26,6 +208,9 @@ class ConceptExtractionAgent:
         {exam_text}
         """
 
-        response = self.model.query(prompt)
+        prompt = f"""
+        {scope}
+        Extract the concepts from the exam text above and respond with the JSON object only.
+        """
 
-        return json.loads(response)
\ No newline at end of file
+        return system, prompt
@@ -1,37 +1,93 @@
-from model.providers.OpenAI import OpenAI, Model
+from model.providers.OpenAI import Model
+from model.providers.ProviderRegistry import ProviderRegistry
+from model.data_models.Concept import Concept
+from model.data_models.Conversation import Conversation
+from model.retrieval.ContextBuilder import ContextBuilder
+from model.ConversationMemory import ConversationMemory
 from model.Database import Database
+from model.Tracing import Tracing
 import json
 
 class ConversationAgent:
     
-    def start_conversation(self, exam_text, concept):
-        model = OpenAI(Model.GPT_4_TURBO)
+    def start_conversation(self, conversation: Conversation, concept: Concept):
+        model = ProviderRegistry.get(Model.GPT_4_TURBO)
+        with Tracing.span("prompt_build"):
+            system, prompt = self.start_conversation_prompt(conversation, concept)
 
-        prompt = f"""
-        Given the following exam content and the concept '{concept}', generate one short, open-ended question an eager student might ask to start learning about this concept.
-        
-        Focus specifically on aspects of '{concept}' that appear in the exam content.
+        # The opening question only depends on the exam and the concept, so it can be reused
+        return model.query(prompt, temperature=0.5, system=system, cache=True)
+
+    def stream_start_conversation(self, conversation: Conversation, concept: Concept):
+        model = ProviderRegistry.get(Model.GPT_4_TURBO)
+        with Tracing.span("prompt_build"):
+            system, prompt = self.start_conversation_prompt(conversation, concept)
+
+        return model.stream(prompt, temperature=0.5, system=system, cache=True)
+    
+    def input(self, conversation: Conversation, concept: Concept, message: str = ""):
+        model = ProviderRegistry.get(Model.GPT_4_TURBO)
+        ConversationMemory.update(conversation)
+        with Tracing.span("prompt_build"):
+            system, prompt = self.input_prompt(conversation, concept, message)
+
+        return model.query(prompt, temperature=0.5, system=system)
+
+    def stream_input(self, conversation: Conversation, concept: Concept, message: str = ""):
+        model = ProviderRegistry.get(Model.GPT_4_TURBO)
+        ConversationMemory.update(conversation)
+        with Tracing.span("prompt_build"):
+            system, prompt = self.input_prompt(conversation, concept, message)
+
+        return model.stream(prompt, temperature=0.5, system=system)
+
+    def exam_prefix(self, conversation: Conversation):
+        # Stable prompt prefix: the same for every call on the conversation, whatever the
+        # concept, so repeated calls share a cacheable prefix. A document within the context
+        # budget is the same for every concept and goes here; otherwise only the excerpts
+        # retrieved for the concept are sent, after the prefix (see exam_excerpts).
+        if ContextBuilder.fits(conversation):
+            return f"""
+        You are Alex, an eager student learning the material of the following exam.
         
         Exam Content:
-        {exam_text}
-        
-        Respond with just the question, without any additional text.
+        {ContextBuilder.build(conversation, None)}
         """
 
-        return model.query(prompt, temperature=0.5)
-    
-    def input(self, exam_text, concept):
-        model = OpenAI(Model.GPT_4_TURBO)
+        return """
+        You are Alex, an eager student learning the material of an exam. Each request includes the exam excerpts relevant to the concept being discussed.
+        """
 
-        prompt = f"""
-        Given the following exam content and the concept '{concept}', generate one short, open-ended question an eager student might ask to start learning about this concept.
-        
-        Focus specifically on aspects of '{concept}' that appear in the exam content.
+    def exam_excerpts(self, conversation: Conversation, concept: Concept):
+        # Concept-specific retrieval; empty when the whole exam is already in the prefix
+        if ContextBuilder.fits(conversation):
+            return ""
+
+        return f"""
+        Exam Content (excerpts about '{concept.name}'):
+        {ContextBuilder.build(conversation, concept)}
+        """
+
+    def start_conversation_prompt(self, conversation: Conversation, concept: Concept):
+        # Returns the (system, user) prompt pair; only the user part varies with the concept
+        return self.exam_prefix(conversation), f"""
+        {self.exam_excerpts(conversation, concept)}
+        Given the exam content above and the concept '{concept.name}', generate one short, open-ended question an eager student might ask to start learning about this concept.
         
-        Exam Content:
-        {exam_text}
+        Focus specifically on aspects of '{concept.name}' that appear in the exam content.
         
         Respond with just the question, without any additional text.
         """
 
-        return model.query(prompt, temperature=0.5)
\ No newline at end of file
+    def input_prompt(self, conversation: Conversation, concept: Concept, message: str = ""):
+        # The transcript comes from the conversation memory: a summary of older turns plus the recent ones
+        return self.exam_prefix(conversation), f"""
+        {self.exam_excerpts(conversation, concept)}
+        {ConversationMemory.build(conversation)}
+        
+        User: {message}
+        
+        The user is teaching you the concept '{concept.name}'. Reply as Alex: respond to the user's latest message and ask one short, open-ended follow-up question about aspects of '{concept.name}' that appear in the exam content.
+        
+        Respond with just your reply, without any additional text.
+        """
@@ -0,0 +1,59 @@
+from typing import List
+from model.providers.OpenAI import Model
+from model.providers.ProviderRegistry import ProviderRegistry
+from model.data_models.Concept import Concept
+from EnvironmentVars import PROGRESS_MAX_STEP
+import json
+import re
+
+def parse_scores(response: str, concepts: List[Concept]):
+    # Accepts the reply with or without a ```json fence; scores are clamped to 0..PROGRESS_MAX_STEP
+    text = response.strip()
+    fenced = re.match(r"^```(?:json)?\s*(.*?)\s*```$", text, re.DOTALL)
+    scores = json.loads(fenced.group(1) if fenced else text)
+
+    if not isinstance(scores, dict):
+        raise ValueError("Progress scores must be a JSON object")
+
+    names = {concept.name for concept in concepts}
+
+    return {
+        name: max(0, min(PROGRESS_MAX_STEP, int(score)))
+        for name, score in scores.items()
+        if name in names and isinstance(score, (int, float))
+    }
+
+class ProgressAgent:
+    # Scores how much one user message advanced several concepts, in a single call
+    def __init__(self, model: Model = Model.GPT_4O_MINI):
+        self.model = ProviderRegistry.get(model)
+
+    def score(self, concepts: List[Concept], message: str, question: str = ""):
+        system, prompt = self.build_prompt(concepts, message, question)
+        inputs = {"agent": "progress", "concepts": [concept.name for concept in concepts]}
+
+        return parse_scores(self.model.query(prompt, temperature=0, system=system, inputs=inputs), concepts)
+
+    def build_prompt(self, concepts: List[Concept], message: str, question: str = ""):
+        concept_lines = "\n".join(
+            f"- {concept.name} (exam questions: {', '.join(concept.questions) or 'none'})" for concept in concepts
+        )
+
+        system = f"""
+        You grade a tutoring session in which a user teaches Alex, a student, the concepts of an exam.
+        For each concept, rate from 0 to {PROGRESS_MAX_STEP} how much the user's latest message teaches it correctly:
+        0 means the message does not explain the concept, {PROGRESS_MAX_STEP} means a clear, correct explanation.
+
+        Return your response as a valid JSON object where keys are the concept names exactly as given and values are the ratings.
+        """
+
+        prompt = f"""
+        Concepts:
+        {concept_lines}
+
+        Alex asked: {question or "(nothing yet)"}
+
+        The user answered: {message}
+        """
+
+        return system, prompt
@@ -0,0 +1,96 @@
+import json
+from uuid import UUID
+from model.data_models import MessagePack
+from model.Tracing import Tracing
+
+# Serialization shared by every data model. A model lists its fields in SCHEMA as
+# (attribute, kind, default) entries, where kind is None for plain values (str,
+# int, lists of those), UUID, another model class, or [kind] for a list of them.
+#
+# The dict form (JSON, API responses) uses the attribute names as keys. The binary
+# form stores each model as a MessagePack array in SCHEMA order, so new fields must
+# be appended to the end of a SCHEMA to keep older binary data readable.
+
+class Codec:
+    @staticmethod
+    def to_dict(model, exclude=()):
+        return {name: Codec.encode(getattr(model, name), kind, False) for name, kind, _ in model.SCHEMA if name not in exclude}
+
+    @staticmethod
+    def to_list(model, exclude=()):
+        # Excluded fields keep their position as None and read back as their default
+        return [None if name in exclude else Codec.encode(getattr(model, name), kind, True) for name, kind, _ in model.SCHEMA]
+
+    @staticmethod
+    def encode(value, kind, positional: bool):
+        # Lists of plain values are passed through as they are instead of being copied
+        if kind is None or value is None or kind == [None]:
+            return value
+
+        if kind is UUID:
+            return str(value)
+
+        if isinstance(kind, list):
+            return [Codec.encode(item, kind[0], positional) for item in value]
+
+        return Codec.to_list(value) if positional else Codec.to_dict(value)
+
+    @staticmethod
+    def from_dict(model_class, data: dict):
+        model = model_class.__new__(model_class)
+
+        for name, kind, default in model_class.SCHEMA:
+            value = data.get(name)
+            setattr(model, name, Codec.default(kind, default) if value is None else Codec.decode(value, kind, False))
+
+        return model
+
+    @staticmethod
+    def from_list(model_class, values: list):
+        model = model_class.__new__(model_class)
+
+        # Data written before a field was added is shorter than the schema
+        for index, (name, kind, default) in enumerate(model_class.SCHEMA):
+            value = values[index] if index < len(values) else None
+            setattr(model, name, Codec.default(kind, default) if value is None else Codec.decode(value, kind, True))
+
+        return model
+
+    @staticmethod
+    def decode(value, kind, positional: bool):
+        if kind is None or kind == [None]:
+            return value
+
+        if kind is UUID:
+            return UUID(value)
+
+        if isinstance(kind, list):
+            return [Codec.decode(item, kind[0], positional) for item in value]
+
+        return Codec.from_list(kind, value) if positional else Codec.from_dict(kind, value)
+
+    @staticmethod
+    def default(kind, default):
+        # List fields get a fresh list per model
+        return [] if isinstance(kind, list) else default
+
+    @staticmethod
+    def dumps(model, format: str = "json", exclude=()) -> bytes:
+        # exclude: top-level fields left out, e.g. a document kept in the DocumentStore
+        with Tracing.span("serialize", format=format):
+            if format == "binary":
+                return MessagePack.pack(Codec.to_list(model, exclude))
+            if format == "json":
+                return json.dumps(Codec.to_dict(model, exclude), separators=(",", ":")).encode("utf-8")
+
+        raise Exception(f"Unknown serialization format: {format}")
+
+    @staticmethod
+    def loads(model_class, data: bytes, format: str = "json"):
+        with Tracing.span("deserialize", format=format):
+            if format == "binary":
+                return Codec.from_list(model_class, MessagePack.unpack(data))
+            if format == "json":
+                return Codec.from_dict(model_class, json.loads(data))
+
+        raise Exception(f"Unknown serialization format: {format}")
@@ -1,29 +1,30 @@
 from typing import List, Dict, Any
 from model.data_models.SubConcept import SubConcept
+from model.data_models.Codec import Codec
 
 class Concept:
-    def __init__(self, name: str, subConcepts: List[SubConcept] = None, progress: int = None):
+    __slots__ = ("name", "progress", "subConcepts", "questions")
+
+    SCHEMA = (
+        ("name", None, None),
+        ("progress", None, 0),
+        ("subConcepts", [SubConcept], None),
+        # Exam question labels (e.g. "Q3") that fall under this concept
+        ("questions", [None], None)
+    )
+
+    def __init__(self, name: str, subConcepts: List[SubConcept] = None, progress: int = None, questions: List[str] = None):
         self.name = name
         self.progress = progress if progress is not None else 0
         self.subConcepts = subConcepts if subConcepts is not None else []
+        self.questions = questions if questions is not None else []
         
     def __iter__(self):
-        yield 'name', self.name
-        yield 'progress', self.progress
-        yield 'subConcepts', [subConcept.to_dict() for subConcept in self.subConcepts] if self.subConcepts else []
+        return iter(self.to_dict().items())
     
     def to_dict(self):
-        return {
-            'name': self.name,
-            'progress': self.progress,
-            'subConcepts': [subConcept.to_dict() for subConcept in self.subConcepts] if self.subConcepts else []
-        }
+        return Codec.to_dict(self)
         
     @staticmethod
     def from_dict(data: Dict[str, Any]):
-        concept = Concept(data['name'], progress=data.get('progress', 0))
-        
-        if 'subConcepts' in data and data['subConcepts']:
-            concept.subConcepts = [SubConcept.from_dict(subconcept) for subconcept in data['subConcepts']]
-            
-        return concept
\ No newline at end of file
+        return Codec.from_dict(Concept, data)
@@ -1,37 +1,80 @@
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
 from uuid import UUID, uuid4
 from model.data_models.Concept import Concept
+from model.data_models.Codec import Codec
 
 class Conversation:
-    def __init__(self, documentText: str, concepts: Optional[List[Concept]] = None, conversation_history: Optional[List[str]] = None):
+    __slots__ = ("Id", "_documentText", "_load_document", "pageOffsets", "chunks", "concepts", "conversation_history", "version", "summary", "summarized_entries", "_summarized_size", "documentHash")
+
+    SCHEMA = (
+        ("Id", UUID, None),
+        ("documentText", None, ""),
+        ("pageOffsets", [None], None),
+        # Document text split at question boundaries for retrieval
+        ("chunks", [None], None),
+        ("concepts", [Concept], None),
+        ("conversation_history", [None], None),
+        # Number of saves when the conversation was read; SqliteStorage uses it to detect concurrent writers
+        ("version", None, 0),
+        # Rolling summary of the first summarized_entries history entries (see ConversationMemory)
+        ("summary", None, ""),
+        ("summarized_entries", None, 0),
+        # SHA-256 of the document text, under which the DocumentStore keeps the text and chunks
+        # ("" for conversations that still carry their own copy)
+        ("documentHash", None, "")
+    )
+
+    def __init__(self, documentText: str, concepts: Optional[List[Concept]] = None, conversation_history: Optional[List[str]] = None, pageOffsets: Optional[List[int]] = None, chunks: Optional[List[str]] = None, documentHash: str = ""):
         self.Id = uuid4()
         self.documentText = documentText
+        self.pageOffsets = pageOffsets if pageOffsets is not None else []
+        self.chunks = chunks if chunks is not None else []
         self.concepts = concepts if concepts is not None else []
         self.conversation_history = conversation_history if conversation_history is not None else []
+        self.version = 0
+        self.summary = ""
+        self.summarized_entries = 0
+        # Running (entries, tokens) count of the summarized entries; not stored (see ConversationMemory)
+        self._summarized_size = None
+        self.documentHash = documentHash
+
+    @property
+    def documentText(self) -> str:
+        # Loaded on first access when the storage engine deferred it (see defer_document)
+        if self._load_document is not None:
+            self._documentText = self._load_document()
+            self._load_document = None
+
+        return self._documentText
+
+    @documentText.setter
+    def documentText(self, documentText: str):
+        self._documentText = documentText
+        self._load_document = None
+        # Whatever hash was set belonged to the previous text
+        self.documentHash = ""
+
+    @property
+    def document_loaded(self) -> bool:
+        return self._load_document is None
+
+    def defer_document(self, load_document: Callable[[], str]):
+        # Most turns only need the chunks, so the full document is fetched only if something reads it
+        self._documentText = None
+        self._load_document = load_document
+
+    def append_turn(self, entries: List[str]) -> int:
+        # Returns the history position of the first appended entry
+        position = len(self.conversation_history)
+        self.conversation_history.extend(entries)
+        return position
     
     def __iter__(self):
-        yield 'Id', str(self.Id)
-        yield 'documentText', self.documentText
-        yield 'concepts', [concept.to_dict() for concept in self.concepts] if self.concepts else []
-        yield 'conversation_history', self.conversation_history
+        return iter(self.to_dict().items())
     
     def to_dict(self):
-        return {
-            'Id': str(self.Id),
-            'documentText': self.documentText,
-            'concepts': [concept.to_dict() for concept in self.concepts] if self.concepts else [],
-            'conversation_history': self.conversation_history
-        }
+        return Codec.to_dict(self)
         
     @staticmethod
     def from_dict(data: Dict[str, Any]):
-        conversation = Conversation(data['documentText'])
-        conversation.Id = UUID(data['Id'])
-        
-        if 'concepts' in data and data['concepts']:
-            conversation.concepts = [Concept.from_dict(concept) for concept in data['concepts']]
-        
-        if 'conversation_history' in data and data['conversation_history']:
-            conversation.conversation_history = data['conversation_history']
-        
-        return conversation
+        return Codec.from_dict(Conversation, data)
@@ -0,0 +1,143 @@
+import struct
+
+# Minimal MessagePack (https://msgpack.org) encoder/decoder covering the types the
+# data models use: None, bool, int, float, str, bytes, list and dict
+
+def pack(value) -> bytes:
+    buffer = bytearray()
+    _pack(value, buffer)
+    return bytes(buffer)
+
+def unpack(data: bytes):
+    value, offset = _unpack(memoryview(data), 0)
+
+    if offset != len(data):
+        raise ValueError(f"{len(data) - offset} trailing bytes after MessagePack value")
+
+    return value
+
+def _pack_length(length, buffer, fix_prefix, fix_limit, prefixes):
+    # prefixes are the 8, 16 and 32 bit length markers (None where the type has no 8 bit form)
+    if length < fix_limit:
+        buffer.append(fix_prefix | length)
+    elif length <= 0xff and prefixes[0] is not None:
+        buffer += struct.pack(">BB", prefixes[0], length)
+    elif length <= 0xffff:
+        buffer += struct.pack(">BH", prefixes[1], length)
+    else:
+        buffer += struct.pack(">BI", prefixes[2], length)
+
+def _pack(value, buffer):
+    if value is None:
+        buffer.append(0xc0)
+    elif value is True:
+        buffer.append(0xc3)
+    elif value is False:
+        buffer.append(0xc2)
+    elif isinstance(value, int):
+        if 0 <= value < 0x80:
+            buffer.append(value)
+        elif -0x20 <= value < 0:
+            buffer.append(value & 0xff)
+        elif 0 <= value <= 0xffff:
+            buffer += struct.pack(">BB", 0xcc, value) if value <= 0xff else struct.pack(">BH", 0xcd, value)
+        elif 0 <= value <= 0xffffffffffffffff:
+            buffer += struct.pack(">BI", 0xce, value) if value <= 0xffffffff else struct.pack(">BQ", 0xcf, value)
+        elif -0x80000000 <= value < 0:
+            buffer += struct.pack(">Bi", 0xd2, value)
+        elif -0x8000000000000000 <= value < 0:
+            buffer += struct.pack(">Bq", 0xd3, value)
+        else:
+            raise ValueError(f"Integer {value} does not fit in 64 bits")
+    elif isinstance(value, float):
+        buffer += struct.pack(">Bd", 0xcb, value)
+    elif isinstance(value, str):
+        encoded = value.encode("utf-8")
+        _pack_length(len(encoded), buffer, 0xa0, 32, (0xd9, 0xda, 0xdb))
+        buffer += encoded
+    elif isinstance(value, (bytes, bytearray)):
+        _pack_length(len(value), buffer, 0, 0, (0xc4, 0xc5, 0xc6))
+        buffer += value
+    elif isinstance(value, (list, tuple)):
+        _pack_length(len(value), buffer, 0x90, 16, (None, 0xdc, 0xdd))
+
+        for item in value:
+            _pack(item, buffer)
+    elif isinstance(value, dict):
+        _pack_length(len(value), buffer, 0x80, 16, (None, 0xde, 0xdf))
+
+        for key, item in value.items():
+            _pack(key, buffer)
+            _pack(item, buffer)
+    else:
+        raise TypeError(f"Cannot pack value of type {type(value).__name__}")
+
+# Fixed-size values: marker -> (struct format, size)
+FIXED = {
+    0xca: (">f", 4), 0xcb: (">d", 8),
+    0xcc: (">B", 1), 0xcd: (">H", 2), 0xce: (">I", 4), 0xcf: (">Q", 8),
+    0xd0: (">b", 1), 0xd1: (">h", 2), 0xd2: (">i", 4), 0xd3: (">q", 8)
+}
+
+# Length-prefixed values: marker -> (kind, struct format of the length, size of the length)
+SIZED = {
+    0xd9: ("str", ">B", 1), 0xda: ("str", ">H", 2), 0xdb: ("str", ">I", 4),
+    0xc4: ("bin", ">B", 1), 0xc5: ("bin", ">H", 2), 0xc6: ("bin", ">I", 4),
+    0xdc: ("array", ">H", 2), 0xdd: ("array", ">I", 4),
+    0xde: ("map", ">H", 2), 0xdf: ("map", ">I", 4)
+}
+
+def _unpack(data, offset):
+    marker = data[offset]
+    offset += 1
+
+    if marker < 0x80:
+        return marker, offset
+    if marker >= 0xe0:
+        return marker - 0x100, offset
+    if marker == 0xc0:
+        return None, offset
+    if marker == 0xc2:
+        return False, offset
+    if marker == 0xc3:
+        return True, offset
+
+    if marker in FIXED:
+        fmt, size = FIXED[marker]
+        return struct.unpack_from(fmt, data, offset)[0], offset + size
+
+    if 0xa0 <= marker <= 0xbf:
+        kind, length = "str", marker & 0x1f
+    elif 0x90 <= marker <= 0x9f:
+        kind, length = "array", marker & 0x0f
+    elif 0x80 <= marker <= 0x8f:
+        kind, length = "map", marker & 0x0f
+    elif marker in SIZED:
+        kind, fmt, size = SIZED[marker]
+        length = struct.unpack_from(fmt, data, offset)[0]
+        offset += size
+    else:
+        raise ValueError(f"Unsupported MessagePack marker 0x{marker:02x}")
+
+    if kind == "str":
+        return str(data[offset:offset + length], "utf-8"), offset + length
+
+    if kind == "bin":
+        return bytes(data[offset:offset + length]), offset + length
+
+    if kind == "array":
+        items = []
+
+        for _ in range(length):
+            item, offset = _unpack(data, offset)
+            items.append(item)
+
+        return items, offset
+
+    mapping = {}
+
+    for _ in range(length):
+        key, offset = _unpack(data, offset)
+        mapping[key], offset = _unpack(data, offset)
+
+    return mapping, offset
@@ -1,19 +1,23 @@
+from model.data_models.Codec import Codec
+
 class SubConcept:
+    __slots__ = ("name", "connections")
+
+    SCHEMA = (
+        ("name", None, None),
+        ("connections", [None], None)
+    )
+
     def __init__(self, name, connections=None):
         self.name = name
         self.connections = connections if connections is not None else []
         
     def __iter__(self):
-        yield 'name', self.name
-        yield 'connections', self.connections
+        return iter(self.to_dict().items())
         
     def to_dict(self):
-        return {
-            'name': self.name,
-            'connections': self.connections
-        }
+        return Codec.to_dict(self)
     
     @staticmethod
     def from_dict(data):
-        return SubConcept(data['name'], data.get('connections', []))
-    
\ No newline at end of file
+        return Codec.from_dict(SubConcept, data)
@@ -0,0 +1,66 @@
+import asyncio
+import contextvars
+import queue
+import threading
+
+class AsyncRunner:
+    # One background event loop shared by the whole process. Sync Flask views
+    # hand it coroutines and async iterators, so many in-flight LLM calls share
+    # a single thread instead of each blocking their own.
+
+    _loop = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_loop():
+        if AsyncRunner._loop is None:
+            with AsyncRunner._lock:
+                if AsyncRunner._loop is None:
+                    loop = asyncio.new_event_loop()
+                    threading.Thread(target=loop.run_forever, name="async-runner", daemon=True).start()
+                    AsyncRunner._loop = loop
+
+        return AsyncRunner._loop
+
+    @staticmethod
+    def run(coroutine):
+        return asyncio.run_coroutine_threadsafe(AsyncRunner.with_context(coroutine, contextvars.copy_context()), AsyncRunner.get_loop()).result()
+
+    @staticmethod
+    async def with_context(coroutine, context: contextvars.Context):
+        # Tasks on the shared loop start from the loop thread's context; carry the
+        # caller's context variables (e.g. the current request trace) over to the task
+        for variable, value in context.items():
+            variable.set(value)
+
+        return await coroutine
+
+    @staticmethod
+    def iterate(async_iterator):
+        # Bridges an async iterator into a blocking generator for the calling thread
+        items = queue.Queue()
+
+        async def pump():
+            try:
+                async for item in async_iterator:
+                    items.put(("item", item))
+            except BaseException as e:
+                items.put(("error", e))
+            else:
+                items.put(("done", None))
+
+        future = asyncio.run_coroutine_threadsafe(AsyncRunner.with_context(pump(), contextvars.copy_context()), AsyncRunner.get_loop())
+
+        try:
+            while True:
+                kind, value = items.get()
+
+                if kind == "item":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    return
+        finally:
+            # Stops the upstream call when the consumer goes away (e.g. client disconnect)
+            future.cancel()
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import math
+import random
+import time
+from model.providers.OpenAI import Model
+from model.providers.Provider import Provider
+from model.TokenCounter import estimate_tokens
+from model.Tracing import Tracing
+from EnvironmentVars import FAKE_LLM_LATENCY, FAKE_LLM_LATENCY_DISTRIBUTION, FAKE_LLM_LATENCY_SPREAD, FAKE_LLM_TOKEN_DELAY, FAKE_LLM_SEED, PROGRESS_MAX_STEP
+
+class FakeProvider(Provider):
+    # Local stand-in for OpenAI used in development and benchmarks: returns a
+    # canned response per model after a configurable delay, without network
+
+    responses = {
+        Model.O3_MINI: json.dumps({
+            "Concept 1": ["Q1", "Q2"],
+            "Concept 2": ["Q3", "Q4"],
+            "Concept 3": ["Q5"]
+        })
+    }
+    default_response = "Could you explain how this concept works with a simple example?"
+    # Rating given to every concept of a progress scoring prompt
+    progress_score = PROGRESS_MAX_STEP // 2
+    # Replies built from a call's inputs, keyed by the agent named in them. Agents that share
+    # a model (progress scoring and conversation summaries) still get their own kind of reply.
+    responders = {
+        "progress": lambda inputs: json.dumps({name: FakeProvider.progress_score for name in inputs["concepts"]})
+    }
+
+    def __init__(self, model: Model, latency: float = FAKE_LLM_LATENCY, token_delay: float = FAKE_LLM_TOKEN_DELAY,
+                 distribution: str = FAKE_LLM_LATENCY_DISTRIBUTION, spread: float = FAKE_LLM_LATENCY_SPREAD, seed: int = FAKE_LLM_SEED):
+        if distribution not in ("fixed", "uniform", "lognormal"):
+            raise Exception(f"Unknown fake LLM latency distribution: {distribution}")
+
+        self.model = model
+        # Mean seconds before the first token, and seconds between streamed tokens
+        self.latency = latency
+        self.token_delay = token_delay
+        self.distribution = distribution
+        self.spread = spread
+        # One generator per model so each model's delays repeat from run to run
+        self.random = random.Random(f"{seed}:{self.model_name()}")
+
+    def delay(self) -> float:
+        if self.latency <= 0 or self.distribution == "fixed":
+            return self.latency
+
+        if self.distribution == "uniform":
+            return self.random.uniform(max(0.0, self.latency * (1 - self.spread)), self.latency * (1 + self.spread))
+
+        # Shifted so the mean stays at latency while the tail grows with the spread
+        return self.random.lognormvariate(math.log(self.latency) - self.spread ** 2 / 2, self.spread)
+
+    def response(self, prompt: str, inputs: dict = None) -> str:
+        responder = FakeProvider.responders.get((inputs or {}).get("agent"))
+
+        if responder is not None:
+            return responder(inputs)
+
+        return FakeProvider.responses.get(self.model, FakeProvider.default_response)
+
+    def query(self, prompt: str, temperature=None, system: str = None, cache: bool = False, inputs: dict = None):
+        with Tracing.span("llm_call", model=self.model_name()):
+            time.sleep(self.delay())
+            response = self.response(prompt, inputs)
+            self.count_tokens(prompt, system, response)
+            return response
+
+    async def astream(self, prompt: str, temperature=None, system: str = None, cache: bool = False, inputs: dict = None):
+        with Tracing.span("llm_call", model=self.model_name()):
+            await asyncio.sleep(self.delay())
+            response = self.response(prompt, inputs)
+            self.count_tokens(prompt, system, response)
+
+            for index, word in enumerate(response.split(" ")):
+                yield word if index == 0 else " " + word
+                await asyncio.sleep(self.token_delay)
+
+    def model_name(self) -> str:
+        return getattr(self.model, "value", self.model)
+
+    def count_tokens(self, prompt: str, system: str, response: str):
+        # Same token counters as the OpenAI provider, so benchmarks report comparable numbers
+        Tracing.count("llm_tokens", estimate_tokens(prompt) + estimate_tokens(system), model=self.model_name(), kind="prompt")
+        Tracing.count("llm_tokens", estimate_tokens(response), model=self.model_name(), kind="completion")
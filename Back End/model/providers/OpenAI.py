@@ -1,5 +1,23 @@
+import asyncio
 import enum
-from openai import OpenAI as GPT
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+import openai
+from openai import AsyncOpenAI as AsyncGPT
+from model.providers.AsyncRunner import AsyncRunner
+from model.providers.Provider import Provider
+from model.providers.RateLimiter import TokenBucket
+from model.Logger import Logger
+from model.TokenCounter import estimate_tokens
+from model.Tracing import Tracing
+from EnvironmentVars import (
+    OPENAI_API_KEY, OPENAI_BASE_URL, LLM_REQUEST_TIMEOUT, LLM_MAX_CONCURRENCY, LLM_REQUESTS_PER_MINUTE,
+    LLM_MAX_RETRIES, LLM_RETRY_BASE_DELAY, LLM_RETRY_MAX_DELAY, LLM_MODEL_LIMITS, RESPONSE_CACHE_ENTRIES, RESPONSE_CACHE_TTL
+)
 
 class Model(str, enum.Enum):
     GPT_3_5_TURBO = "gpt-3.5-turbo"
@@ -13,32 +31,229 @@ class Model(str, enum.Enum):
     GPT_4 = "gpt-4"
     GPT_4_5_PREVIEW = "gpt-4.5-preview"
 
+# Failures worth another attempt; anything else (bad request, auth) is raised immediately
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+logger = Logger("providers.openai")
+
+
+class ResponseCache:
+    # Exact-match LRU cache of completions keyed by (model, messages, temperature),
+    # with entries expiring after ttl seconds
+
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+
+    @staticmethod
+    def key(params: dict) -> str:
+        return hashlib.sha256(json.dumps([params["model"], params["messages"], params.get("temperature")]).encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        with self.__lock:
+            entry = self.__entries.get(key)
+
+            if entry is not None and entry[1] < time.monotonic():
+                del self.__entries[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self.__entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: str, response: str):
+        with self.__lock:
+            self.__entries[key] = (response, time.monotonic() + self.ttl)
+            self.__entries.move_to_end(key)
+
+            while len(self.__entries) > self.max_entries:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self):
+        with self.__lock:
+            lookups = self.hits + self.misses
+
+            return {
+                "entries": len(self.__entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+class OpenAI(Provider):
+    # All instances share one pooled client; calls run on the AsyncRunner loop,
+    # limited per model by a concurrency semaphore and a token-bucket rate limit
+
+    _client = None
+    _client_lock = threading.Lock()
+    response_cache = ResponseCache(RESPONSE_CACHE_ENTRIES, RESPONSE_CACHE_TTL)
 
-class OpenAI():
     def __init__(self, model: Model):
-        self.__api_key = "INSERT_YOUR_API_KEY_HERE"
+        limits = LLM_MODEL_LIMITS.get(getattr(model, "value", model), {})
+
         self.__model = model
-    
-    def query(self, prompt: str, temperature=None):
-        client = GPT(api_key=self.__api_key)
-        
+        self.__semaphore = asyncio.Semaphore(limits.get("max_concurrency", LLM_MAX_CONCURRENCY))
+
+        requests_per_minute = limits.get("requests_per_minute", LLM_REQUESTS_PER_MINUTE)
+        self.__rate_limiter = TokenBucket(requests_per_minute / 60, max(1, requests_per_minute / 60))
+
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "rate_limited_seconds": 0.0}
+
+    @staticmethod
+    def client() -> AsyncGPT:
+        if OpenAI._client is None:
+            with OpenAI._client_lock:
+                if OpenAI._client is None:
+                    # Retries are handled here so they also respect the rate limiter
+                    OpenAI._client = AsyncGPT(
+                        api_key=OPENAI_API_KEY,
+                        base_url=OPENAI_BASE_URL,
+                        timeout=LLM_REQUEST_TIMEOUT,
+                        max_retries=0
+                    )
+
+        return OpenAI._client
+
+    def __params(self, prompt: str, temperature=None, system: str = None):
+        # The stable part goes first so the API can reuse its cached prompt prefix
+        if system is not None:
+            messages = [{"role": "system", "content": system}, {"role": "user", "content": prompt}]
+        else:
+            messages = [{"role": "system", "content": prompt}]
+
         # Create base parameters
         params = {
             "model": self.__model,
-            "messages": [
-                {"role": "system", "content": prompt}
-            ]
+            "messages": messages
         }
-        
+
         # Only add temperature if it's provided
         if temperature is not None:
             params["temperature"] = temperature
-        
-        response = client.chat.completions.create(**params)
-        response = response.choices[0].message.content
 
-        return response    
+        return params
+
+    def query(self, prompt: str, temperature=None, system: str = None, cache: bool = False, inputs: dict = None):
+        return AsyncRunner.run(self.aquery(prompt, temperature=temperature, system=system, cache=cache))
+
+    async def aquery(self, prompt: str, temperature=None, system: str = None, cache: bool = False, inputs: dict = None):
+        params = self.__params(prompt, temperature, system)
+        cache_key = ResponseCache.key(params) if cache else None
+
+        if cache_key:
+            cached = OpenAI.response_cache.get(cache_key)
+
+            if cached is not None:
+                return cached
+
+        with Tracing.span("llm_call", model=self.__model_name()):
+            for attempt in range(LLM_MAX_RETRIES + 1):
+                try:
+                    async with self.__semaphore:
+                        await self.__throttle()
+                        response = await OpenAI.client().chat.completions.create(**params)
+
+                    content = response.choices[0].message.content
+                    usage = getattr(response, "usage", None)
+
+                    if usage is not None:
+                        self.__count_tokens(usage.prompt_tokens, usage.completion_tokens)
+                    else:
+                        self.__count_tokens(estimate_tokens(prompt) + estimate_tokens(system), estimate_tokens(content))
+
+                    if cache_key:
+                        OpenAI.response_cache.put(cache_key, content)
+
+                    return content
+
+                except RETRYABLE_ERRORS as e:
+                    await self.__backoff(attempt, e)
+
+    async def astream(self, prompt: str, temperature=None, system: str = None, cache: bool = False, inputs: dict = None):
+        params = self.__params(prompt, temperature, system)
+        cache_key = ResponseCache.key(params) if cache else None
+
+        if cache_key:
+            cached = OpenAI.response_cache.get(cache_key)
+
+            if cached is not None:
+                yield cached
+                return
+
+        with Tracing.span("llm_call", model=self.__model_name()):
+            for attempt in range(LLM_MAX_RETRIES + 1):
+                started = False
+                content = ""
+
+                try:
+                    async with self.__semaphore:
+                        await self.__throttle()
+                        stream = await OpenAI.client().chat.completions.create(stream=True, **params)
+
+                        async for chunk in stream:
+                            if chunk.choices and chunk.choices[0].delta.content:
+                                started = True
+                                content += chunk.choices[0].delta.content
+                                yield chunk.choices[0].delta.content
+
+                    # Streamed responses carry no usage, so both sides are estimated
+                    self.__count_tokens(estimate_tokens(prompt) + estimate_tokens(system), estimate_tokens(content))
+
+                    if cache_key:
+                        OpenAI.response_cache.put(cache_key, content)
+
+                    return
+
+                except RETRYABLE_ERRORS as e:
+                    # Tokens already forwarded cannot be taken back, so only retry before the first one
+                    if started:
+                        self.stats["failures"] += 1
+                        logger.error("llm_stream_failed", model=self.__model_name(), error=str(e))
+                        raise
+
+                    await self.__backoff(attempt, e)
+
+    def __model_name(self) -> str:
+        return getattr(self.__model, "value", self.__model)
+
+    def __count_tokens(self, prompt_tokens: int, completion_tokens: int):
+        Tracing.count("llm_tokens", prompt_tokens, model=self.__model_name(), kind="prompt")
+        Tracing.count("llm_tokens", completion_tokens, model=self.__model_name(), kind="completion")
+
+    async def __throttle(self):
+        self.stats["requests"] += 1
+        self.stats["rate_limited_seconds"] += await self.__rate_limiter.acquire()
+
+    async def __backoff(self, attempt: int, error: Exception):
+        if attempt >= LLM_MAX_RETRIES:
+            self.stats["failures"] += 1
+            logger.error("llm_call_failed", model=self.__model_name(), attempts=attempt + 1, error=str(error))
+            raise error
+
+        # Exponential backoff with full jitter, never shorter than the server's Retry-After
+        delay = random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2 ** attempt))
+        response = getattr(error, "response", None)
 
-model = OpenAI(Model.CHATGPT_4O_LATEST)
+        try:
+            delay = max(delay, float(response.headers.get("retry-after", 0)))
+        except (AttributeError, TypeError, ValueError):
+            pass
 
-print(model.query("asd"))
\ No newline at end of file
+        self.stats["retries"] += 1
+        logger.warning("llm_call_retry", model=self.__model_name(), attempt=attempt + 1, delay=round(delay, 3), error=str(error))
+        await asyncio.sleep(min(delay, LLM_RETRY_MAX_DELAY))
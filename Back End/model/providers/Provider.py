@@ -0,0 +1,21 @@
+from model.providers.AsyncRunner import AsyncRunner
+
+class Provider:
+    # Interface shared by LLM providers
+
+    # system is an optional stable prefix (sent as the system message, with prompt
+    # as the user message) so providers can reuse their cached prompt prefix;
+    # cache=True allows an identical earlier response to be returned;
+    # inputs are the structured values the prompt was built from, with "agent" naming
+    # the caller. Real models only read the prompt; FakeProvider answers from the inputs.
+
+    def query(self, prompt: str, temperature=None, system: str = None, cache: bool = False, inputs: dict = None) -> str:
+        raise NotImplementedError
+
+    async def astream(self, prompt: str, temperature=None, system: str = None, cache: bool = False, inputs: dict = None):
+        # Async iterator over text deltas of the completion
+        raise NotImplementedError
+        yield
+
+    def stream(self, prompt: str, temperature=None, system: str = None, cache: bool = False, inputs: dict = None):
+        return AsyncRunner.iterate(self.astream(prompt, temperature=temperature, system=system, cache=cache, inputs=inputs))
@@ -0,0 +1,38 @@
+import threading
+from model.providers.OpenAI import OpenAI, Model
+from model.providers.FakeProvider import FakeProvider
+from model.providers.Provider import Provider
+from EnvironmentVars import LLM_PROVIDER
+
+class ProviderRegistry:
+    # One provider per model for the whole process, so every agent shares the
+    # same connection pool, concurrency limits and rate limiter
+
+    _providers = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get(model: Model) -> Provider:
+        key = (LLM_PROVIDER, model)
+
+        if key not in ProviderRegistry._providers:
+            with ProviderRegistry._lock:
+                if key not in ProviderRegistry._providers:
+                    ProviderRegistry._providers[key] = ProviderRegistry.create(model)
+
+        return ProviderRegistry._providers[key]
+
+    @staticmethod
+    def create(model: Model) -> Provider:
+        # LLM_PROVIDER = "fake" swaps every agent onto the local fake provider
+        if LLM_PROVIDER == "fake":
+            return FakeProvider(model)
+
+        return OpenAI(model)
+
+    @staticmethod
+    def stats():
+        stats = {str(getattr(model, "value", model)): getattr(provider, "stats", {}) for (_, model), provider in ProviderRegistry._providers.items()}
+        stats["response_cache"] = OpenAI.response_cache.stats()
+
+        return stats
@@ -0,0 +1,29 @@
+import asyncio
+import time
+
+class TokenBucket:
+    # Allows `rate` requests per second on average with bursts of up to
+    # `capacity`. Only used from the AsyncRunner loop, so it needs no lock.
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        # Returns the number of seconds spent waiting for a token
+        waited = 0.0
+
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return waited
+
+            delay = (1 - self.tokens) / self.rate
+            waited += delay
+            await asyncio.sleep(delay)
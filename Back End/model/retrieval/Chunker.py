@@ -0,0 +1,69 @@
+import re
+from typing import List
+from EnvironmentVars import CHUNK_CHARS
+
+# Lines that start a new exam question: "Q3:", "Question 3", "3." or "3)"
+QUESTION_PATTERN = re.compile(r"^\s*(?:Q(?:uestion)?\s*(\d+)\b|(\d+)\s*[.)]\s)", re.IGNORECASE | re.MULTILINE)
+
+def question_label(number: str) -> str:
+    return f"Q{int(number)}"
+
+def normalize_question_label(value) -> str:
+    # The LLM may answer with "Q3", "Question 3" or just 3
+    match = re.search(r"\d+", str(value))
+    return question_label(match.group(0)) if match else str(value)
+
+def question_labels(text: str) -> List[str]:
+    # Normalized labels ("Q3") of every question that starts in the text
+    return [question_label(match.group(1) or match.group(2)) for match in QUESTION_PATTERN.finditer(text)]
+
+def split_questions(text: str) -> List[str]:
+    # Splits the text at question boundaries; any preamble becomes the first block
+    starts = [match.start() for match in QUESTION_PATTERN.finditer(text)]
+
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+
+    blocks = [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)])]
+    return [block for block in blocks if block.strip()]
+
+def split_long_block(block: str, max_chars: int) -> List[str]:
+    # Falls back to line boundaries, and hard cuts for single overlong lines
+    pieces = []
+    current = ""
+
+    for line in block.splitlines(keepends=True):
+        while len(line) > max_chars:
+            pieces.append(current + line[:max_chars - len(current)])
+            line = line[max_chars - len(current):]
+            current = ""
+
+        if current and len(current) + len(line) > max_chars:
+            pieces.append(current)
+            current = ""
+
+        current += line
+
+    if current:
+        pieces.append(current)
+
+    return pieces
+
+def chunk_text(text: str, max_chars: int = CHUNK_CHARS) -> List[str]:
+    # Packs whole questions into chunks of at most max_chars, so a question is
+    # only ever split across chunks when it is longer than a chunk on its own
+    chunks = []
+    current = ""
+
+    for block in split_questions(text):
+        for piece in (split_long_block(block, max_chars) if len(block) > max_chars else [block]):
+            if current and len(current) + len(piece) > max_chars:
+                chunks.append(current)
+                current = ""
+
+            current += piece
+
+    if current:
+        chunks.append(current)
+
+    return chunks
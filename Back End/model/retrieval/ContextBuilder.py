@@ -0,0 +1,103 @@
+import threading
+from collections import OrderedDict
+from model.data_models.Concept import Concept
+from model.data_models.Conversation import Conversation
+from model.retrieval.Chunker import chunk_text, question_labels
+from model.retrieval.DocumentIndex import DocumentIndex
+from model.TokenCounter import estimate_tokens
+from EnvironmentVars import CONTEXT_TOKEN_BUDGET, CONTEXT_TOP_K
+
+class ContextBuilder:
+    # Picks the exam chunks relevant to a concept, within a token budget, so
+    # prompts no longer carry the whole document on every call
+
+    _indexes = OrderedDict()
+    _lock = threading.Lock()
+    stats = {"prompts": 0, "document_tokens": 0, "context_tokens": 0}
+
+    @staticmethod
+    def chunks(conversation: Conversation):
+        # Conversations created before chunking was stored are chunked on the fly
+        if not conversation.chunks and conversation.documentText:
+            conversation.chunks = chunk_text(conversation.documentText)
+
+        return conversation.chunks
+
+    @staticmethod
+    def index(conversation: Conversation) -> DocumentIndex:
+        # Conversations on the same stored document share one index
+        key = conversation.documentHash or str(conversation.Id)
+
+        with ContextBuilder._lock:
+            if key in ContextBuilder._indexes:
+                ContextBuilder._indexes.move_to_end(key)
+                return ContextBuilder._indexes[key]
+
+        index = DocumentIndex(ContextBuilder.chunks(conversation))
+
+        with ContextBuilder._lock:
+            ContextBuilder._indexes[key] = index
+
+            while len(ContextBuilder._indexes) > 128:
+                ContextBuilder._indexes.popitem(last=False)
+
+        return index
+
+    @staticmethod
+    def fits(conversation: Conversation, token_budget: int = CONTEXT_TOKEN_BUDGET) -> bool:
+        # Documents within the budget are included whole, so their context is the same for every concept
+        return sum(estimate_tokens(chunk) for chunk in ContextBuilder.chunks(conversation)) <= token_budget
+
+    @staticmethod
+    def select(conversation: Conversation, concept: Concept, token_budget: int = CONTEXT_TOKEN_BUDGET, top_k: int = CONTEXT_TOP_K):
+        # Chunk indexes to include, in document order
+        chunks = ContextBuilder.chunks(conversation)
+        sizes = [estimate_tokens(chunk) for chunk in chunks]
+
+        # Small documents fit entirely; nothing to gain from retrieval
+        if sum(sizes) <= token_budget:
+            return list(range(len(chunks)))
+
+        # Chunks holding the concept's own questions come first, then BM25 matches
+        # on the concept name, then the rest of the document in order
+        questions = set(concept.questions) if concept else set()
+        candidates = [index for index, chunk in enumerate(chunks) if questions.intersection(question_labels(chunk))]
+
+        if concept:
+            candidates += ContextBuilder.index(conversation).search(concept.name, top_k)
+
+        candidates += range(len(chunks))
+
+        selected = []
+        used = 0
+
+        for index in candidates:
+            if index in selected or used + sizes[index] > token_budget:
+                continue
+
+            selected.append(index)
+            used += sizes[index]
+
+            if len(selected) >= max(top_k, len(questions)):
+                break
+
+        return sorted(selected)
+
+    @staticmethod
+    def build(conversation: Conversation, concept: Concept, token_budget: int = CONTEXT_TOKEN_BUDGET, top_k: int = CONTEXT_TOP_K) -> str:
+        chunks = ContextBuilder.chunks(conversation)
+        selected = ContextBuilder.select(conversation, concept, token_budget, top_k)
+
+        # Chunks are consecutive slices of the document, so joining all of them gives the
+        # whole text without loading a deferred document
+        if len(selected) == len(chunks):
+            context = "".join(chunks)
+        else:
+            context = "\n...\n".join(chunks[index] for index in selected)
+
+        ContextBuilder.stats["prompts"] += 1
+        # Counted from the chunks so a deferred document text is not loaded just for the stats
+        ContextBuilder.stats["document_tokens"] += sum(estimate_tokens(chunk) for chunk in chunks)
+        ContextBuilder.stats["context_tokens"] += estimate_tokens(context)
+
+        return context
@@ -0,0 +1,56 @@
+import math
+import re
+from collections import Counter
+from typing import List
+
+WORD_PATTERN = re.compile(r"\w+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in", "is", "it", "of", "on",
+    "or", "that", "the", "this", "to", "what", "which", "with"
+}
+
+def tokenize(text: str) -> List[str]:
+    return [word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+
+class DocumentIndex:
+    # Okapi BM25 over a conversation's document chunks, computed locally
+
+    def __init__(self, chunks: List[str], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.term_counts = [Counter(tokenize(chunk)) for chunk in chunks]
+        self.lengths = [sum(counts.values()) for counts in self.term_counts]
+        self.average_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0
+
+        document_frequency = Counter()
+
+        for counts in self.term_counts:
+            document_frequency.update(counts.keys())
+
+        total = len(chunks)
+        self.idf = {term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5)) for term, frequency in document_frequency.items()}
+
+    def score(self, query: str) -> List[float]:
+        terms = tokenize(query)
+        scores = []
+
+        for counts, length in zip(self.term_counts, self.lengths):
+            score = 0.0
+            normalization = self.k1 * (1 - self.b + self.b * length / self.average_length) if self.average_length else self.k1
+
+            for term in terms:
+                frequency = counts.get(term)
+
+                if frequency:
+                    score += self.idf[term] * frequency * (self.k1 + 1) / (frequency + normalization)
+
+            scores.append(score)
+
+        return scores
+
+    def search(self, query: str, top_k: int):
+        # Indexes of the best matching chunks, best first; chunks with no matching term are left out
+        scores = self.score(query)
+        ranked = sorted((index for index, score in enumerate(scores) if score > 0), key=lambda index: -scores[index])
+        return ranked[:top_k]
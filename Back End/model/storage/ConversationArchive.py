@@ -0,0 +1,49 @@
+import os
+import zlib
+from model.data_models.Codec import Codec
+from model.data_models.Conversation import Conversation
+from model.storage.DocumentStore import DocumentStore
+from model.storage.JsonStorage import DOCUMENT_FIELDS
+
+class ConversationArchive:
+    # Conversations moved out of the storage engine by the retention sweeper, one
+    # zlib-compressed MessagePack snapshot per conversation. Documents in the
+    # document store are referenced by hash rather than copied into the snapshot.
+
+    def __init__(self, archive_path: str, document_store: DocumentStore = None):
+        self.archive_path = archive_path
+        self.document_store = document_store
+
+        os.makedirs(archive_path, exist_ok=True)
+
+    def get_file_path(self, conversation_id: str):
+        return os.path.join(self.archive_path, f"{conversation_id}.msgpack.z")
+
+    def store(self, conversation: Conversation):
+        file_path = self.get_file_path(conversation.Id)
+        temp_path = file_path + ".tmp"
+        external = self.document_store is not None and self.document_store.externalize(conversation)
+
+        with open(temp_path, "wb") as file:
+            file.write(zlib.compress(Codec.dumps(conversation, "binary", DOCUMENT_FIELDS if external else ())))
+
+        os.replace(temp_path, file_path)
+
+    def load(self, conversation_id: str) -> Conversation:
+        with open(self.get_file_path(conversation_id), "rb") as file:
+            conversation = Codec.loads(Conversation, zlib.decompress(file.read()), "binary")
+
+        if self.document_store is not None and not conversation.documentText:
+            self.document_store.attach(conversation)
+
+        return conversation
+
+    def list_conversation_ids(self):
+        suffix = ".msgpack.z"
+        return [file_name[:-len(suffix)] for file_name in sorted(os.listdir(self.archive_path)) if file_name.endswith(suffix)]
+
+    def remove(self, conversation_id: str):
+        try:
+            os.remove(self.get_file_path(conversation_id))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,274 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from model.data_models.Conversation import Conversation
+
+# Each entry upgrades the schema by one version (tracked with PRAGMA user_version)
+MIGRATIONS = [
+    [
+        """
+        CREATE TABLE IF NOT EXISTS conversations (
+            id TEXT PRIMARY KEY,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            document_hash TEXT NOT NULL DEFAULT '',
+            concept_names TEXT NOT NULL DEFAULT '[]',
+            turn_count INTEGER NOT NULL DEFAULT 0,
+            history_entries INTEGER NOT NULL DEFAULT 0,
+            archived_at REAL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS conversations_updated_at ON conversations (archived_at, updated_at, id)",
+        # Searchable text: the concept names (position -1) and every history entry of a conversation
+        """
+        CREATE TABLE IF NOT EXISTS entries (
+            rowid INTEGER PRIMARY KEY,
+            conversation_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            text TEXT NOT NULL
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS entries_conversation ON entries (conversation_id, position)",
+        "CREATE VIRTUAL TABLE IF NOT EXISTS entries_search USING fts5 (text, content='entries', content_rowid='rowid')",
+        """
+        CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+            INSERT INTO entries_search (rowid, text) VALUES (new.rowid, new.text);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+            INSERT INTO entries_search (entries_search, rowid, text) VALUES ('delete', old.rowid, old.text);
+        END
+        """,
+    ],
+]
+
+CONCEPTS_POSITION = -1
+
+def turn_count(entries) -> int:
+    return sum(1 for entry in entries if entry.startswith("User: "))
+
+def search_expression(query: str) -> str:
+    # Every word of the query must appear; quoting keeps FTS5 operators in user input literal
+    return " ".join(f'"{term}"' for term in re.findall(r"\w+", query))
+
+class ConversationIndex:
+    # Metadata of every conversation (times, document hash, concept names, turn
+    # count) with a full-text index over concept names and history, kept next to
+    # the storage engine so listing, searching and retention never have to load
+    # or scan the stored conversations. History is indexed incrementally: an
+    # update only adds the entries appended since the previous one.
+
+    def __init__(self, index_file: str):
+        self.index_file = index_file
+        self.__local = threading.local()
+        # True when this call created the index, so existing conversations still need adding
+        self.created = self.__migrate()
+
+    def connection(self):
+        connection = getattr(self.__local, "connection", None)
+
+        if connection is None:
+            connection = sqlite3.connect(self.index_file, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.__local.connection = connection
+
+        return connection
+
+    def __migrate(self):
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+
+        try:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+
+            for statements in MIGRATIONS[version:]:
+                for statement in statements:
+                    connection.execute(statement)
+
+            connection.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+        connection.execute("COMMIT")
+
+        return version == 0
+
+    def update(self, conversation: Conversation):
+        conversation_id = str(conversation.Id)
+        history = conversation.conversation_history
+        concept_names = [concept.name for concept in conversation.concepts]
+        now = time.time()
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+
+        try:
+            row = connection.execute(
+                "SELECT concept_names, turn_count, history_entries FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+
+            if row is None:
+                row = (None, 0, 0)
+                connection.execute(
+                    "INSERT INTO conversations (id, created_at, updated_at) VALUES (?, ?, ?)", (conversation_id, now, now)
+                )
+
+            stored_names, count, indexed = row
+
+            if stored_names != json.dumps(concept_names):
+                connection.execute("DELETE FROM entries WHERE conversation_id = ? AND position = ?", (conversation_id, CONCEPTS_POSITION))
+                connection.execute(
+                    "INSERT INTO entries (conversation_id, position, text) VALUES (?, ?, ?)",
+                    (conversation_id, CONCEPTS_POSITION, " ".join(concept_names))
+                )
+
+            # History is append-only in the app; start over if the caller removed entries
+            if indexed > len(history):
+                connection.execute("DELETE FROM entries WHERE conversation_id = ? AND position >= 0", (conversation_id,))
+                count, indexed = 0, 0
+
+            connection.executemany(
+                "INSERT INTO entries (conversation_id, position, text) VALUES (?, ?, ?)",
+                [(conversation_id, position, history[position]) for position in range(indexed, len(history))]
+            )
+            connection.execute(
+                "UPDATE conversations SET updated_at = ?, document_hash = ?, concept_names = ?, turn_count = ?, history_entries = ?, archived_at = NULL WHERE id = ?",
+                (now, conversation.documentHash, json.dumps(concept_names), count + turn_count(history[indexed:]), len(history), conversation_id)
+            )
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+        connection.execute("COMMIT")
+
+    def get(self, conversation_id: str):
+        row = self.connection().execute(
+            "SELECT id, created_at, updated_at, document_hash, concept_names, turn_count, archived_at FROM conversations WHERE id = ?", (str(conversation_id),)
+        ).fetchone()
+
+        return self.__metadata(row) if row is not None else None
+
+    def list(self, limit: int = 20, cursor: str = None, archived: bool = False):
+        # Most recently updated first. Paging continues after the cursor (the last
+        # item's "updated_at:id" from the previous page) instead of using an offset,
+        # so every page is a single range read of the updated_at index.
+        # Returns (items, next cursor or None).
+        condition = "archived_at IS NOT NULL" if archived else "archived_at IS NULL"
+        parameters = []
+
+        if cursor:
+            updated_at, cursor_id = cursor.split(":", 1)
+            condition += " AND (updated_at, id) < (?, ?)"
+            parameters += [float(updated_at), cursor_id]
+
+        rows = self.connection().execute(
+            f"SELECT id, created_at, updated_at, document_hash, concept_names, turn_count, archived_at FROM conversations WHERE {condition} ORDER BY updated_at DESC, id DESC LIMIT ?",
+            parameters + [limit + 1]
+        ).fetchall()
+
+        items = [self.__metadata(row) for row in rows[:limit]]
+        next_cursor = f"{rows[limit - 1][2]!r}:{rows[limit - 1][0]}" if len(rows) > limit else None
+
+        return items, next_cursor
+
+    def search(self, query: str, limit: int = 20, offset: int = 0, archived: bool = False):
+        # Conversations whose concept names or history contain every word of the query, best match first
+        expression = search_expression(query)
+
+        if not expression:
+            return []
+
+        rows = self.connection().execute(
+            f"""
+            SELECT c.id, c.created_at, c.updated_at, c.document_hash, c.concept_names, c.turn_count, c.archived_at
+            FROM (
+                SELECT entries.conversation_id, MIN(entries_search.rank) AS rank
+                FROM entries_search JOIN entries ON entries.rowid = entries_search.rowid
+                WHERE entries_search MATCH ?
+                GROUP BY entries.conversation_id
+            ) matches
+            JOIN conversations c ON c.id = matches.conversation_id
+            WHERE c.archived_at IS {"NOT NULL" if archived else "NULL"}
+            ORDER BY matches.rank, c.updated_at DESC
+            LIMIT ? OFFSET ?
+            """,
+            (expression, limit, offset)
+        ).fetchall()
+
+        return [self.__metadata(row) for row in rows]
+
+    def stale(self, updated_before: float = None, keep: int = None, limit: int = 100):
+        # Ids of active conversations last updated before updated_before, or beyond
+        # the keep most recently updated ones; least recently updated first
+        ids = []
+
+        if updated_before is not None:
+            ids += [row[0] for row in self.connection().execute(
+                "SELECT id FROM conversations WHERE archived_at IS NULL AND updated_at < ? ORDER BY updated_at LIMIT ?", (updated_before, limit)
+            )]
+
+        if keep is not None:
+            overflow = self.counts()["active"] - keep
+
+            if overflow > 0:
+                ids += [row[0] for row in self.connection().execute(
+                    "SELECT id FROM conversations WHERE archived_at IS NULL ORDER BY updated_at, id LIMIT ?", (min(overflow, limit),)
+                )]
+
+        return list(dict.fromkeys(ids))[:limit]
+
+    def set_archived(self, conversation_id: str, archived: bool):
+        self.connection().execute(
+            "UPDATE conversations SET archived_at = ? WHERE id = ?", (time.time() if archived else None, str(conversation_id))
+        )
+
+    def set_document_hash(self, conversation_id: str, document_hash: str):
+        self.connection().execute("UPDATE conversations SET document_hash = ? WHERE id = ?", (document_hash, str(conversation_id)))
+
+    def is_archived(self, conversation_id: str) -> bool:
+        row = self.connection().execute("SELECT archived_at FROM conversations WHERE id = ?", (str(conversation_id),)).fetchone()
+        return row is not None and row[0] is not None
+
+    def remove(self, conversation_id: str):
+        connection = self.connection()
+        connection.execute("BEGIN IMMEDIATE")
+
+        try:
+            connection.execute("DELETE FROM entries WHERE conversation_id = ?", (str(conversation_id),))
+            connection.execute("DELETE FROM conversations WHERE id = ?", (str(conversation_id),))
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+        connection.execute("COMMIT")
+
+    def counts(self):
+        active, archived = self.connection().execute(
+            "SELECT COUNT(*) - COUNT(archived_at), COUNT(archived_at) FROM conversations"
+        ).fetchone()
+
+        return {"active": active, "archived": archived}
+
+    def __metadata(self, row):
+        conversation_id, created_at, updated_at, document_hash, concept_names, count, archived_at = row
+
+        return {
+            "Id": conversation_id,
+            "createdAt": created_at,
+            "updatedAt": updated_at,
+            "documentHash": document_hash,
+            "conceptNames": json.loads(concept_names),
+            "turnCount": count,
+            "archived": archived_at is not None
+        }
+
+    def close(self):
+        connection = getattr(self.__local, "connection", None)
+
+        if connection is not None:
+            connection.close()
+            self.__local.connection = None
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import mmap
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from model.data_models.Conversation import Conversation
+from model.retrieval.Chunker import chunk_text
+from EnvironmentVars import DOCUMENT_STORE_COMPRESSION, DOCUMENT_STORE_CACHE_ENTRIES
+
+try:
+    import zstandard
+except ImportError:
+    # Optional; only needed for DOCUMENT_STORE_COMPRESSION = "zstd"
+    zstandard = None
+
+# File extension per compression; a blob is read back with whichever it was written with
+EXTENSIONS = {"zstd": ".zst", "zlib": ".z", "none": ""}
+
+def document_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class DocumentStore:
+    # Content-addressed store of document texts and their chunks, shared by every
+    # conversation on the same document. Blobs are written once per hash under
+    # documents/<first two hex digits>/ and read through a memory map. Recently
+    # used documents stay decoded in memory, so conversations on the same exam
+    # also share one copy when loaded. Blobs are never rewritten or removed.
+
+    def __init__(self, store_path: str, compression: str = DOCUMENT_STORE_COMPRESSION, cache_entries: int = DOCUMENT_STORE_CACHE_ENTRIES):
+        if compression not in EXTENSIONS:
+            raise Exception(f"Unknown document compression: {compression}")
+
+        if compression == "zstd" and zstandard is None:
+            raise Exception("Document compression 'zstd' requires the zstandard package")
+
+        self.store_path = store_path
+        self.compression = compression
+        self.cache_entries = cache_entries
+        self.stats = {"puts": 0, "deduplicated": 0, "bytes_written": 0, "reads": 0, "cache_hits": 0}
+
+        self.__known = set()
+        self.__cache = OrderedDict()
+        self.__lock = threading.Lock()
+
+        os.makedirs(store_path, exist_ok=True)
+
+    def get_file_path(self, document_hash: str, kind: str, compression: str = None):
+        return os.path.join(self.store_path, document_hash[:2], f"{document_hash}.{kind}{EXTENSIONS[compression or self.compression]}")
+
+    def exists(self, document_hash: str) -> bool:
+        if document_hash in self.__known:
+            return True
+
+        if any(os.path.exists(self.get_file_path(document_hash, "chunks", compression)) for compression in EXTENSIONS):
+            self.__known.add(document_hash)
+            return True
+
+        return False
+
+    def put(self, text: str, chunks=None, key: str = None) -> str:
+        # Returns the document's hash (key, if the caller already computed it); stores the
+        # text and chunks unless they already are
+        key = key or document_hash(text)
+        self.stats["puts"] += 1
+
+        if self.exists(key):
+            self.stats["deduplicated"] += 1
+            return key
+
+        os.makedirs(os.path.dirname(self.get_file_path(key, "text")), exist_ok=True)
+
+        # The chunks file is written last: it marks the document as complete (see exists)
+        self.__write(self.get_file_path(key, "text"), text.encode("utf-8"))
+        self.__write(self.get_file_path(key, "chunks"), json.dumps(chunks or chunk_text(text)).encode("utf-8"))
+        self.__known.add(key)
+
+        return key
+
+    def text(self, document_hash: str) -> str:
+        return self.__cached(document_hash, "text", lambda data: str(data, "utf-8"))
+
+    def chunks(self, document_hash: str):
+        return self.__cached(document_hash, "chunks", json.loads)
+
+    def externalize(self, conversation: Conversation) -> bool:
+        # Stores a loaded document before its conversation is saved. True when the
+        # conversation can be saved without its document text and chunks. The hash is
+        # kept on the conversation (and cleared if its text is replaced), so saving a
+        # conversation whose document is already stored neither hashes nor writes it.
+        if conversation.documentHash and self.exists(conversation.documentHash):
+            return True
+
+        if conversation.document_loaded and conversation.documentText:
+            conversation.documentHash = self.put(conversation.documentText, conversation.chunks, conversation.documentHash or None)
+            return True
+
+        return False
+
+    def attach(self, conversation: Conversation) -> bool:
+        # Points a conversation saved without its document at the stored copy
+        document_hash = conversation.documentHash
+
+        if not document_hash or not self.exists(document_hash):
+            return False
+
+        conversation.defer_document(lambda: self.text(document_hash))
+        conversation.chunks = self.chunks(document_hash)
+
+        return True
+
+    def __cached(self, document_hash: str, kind: str, decode):
+        key = (document_hash, kind)
+
+        with self.__lock:
+            if key in self.__cache:
+                self.__cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+                return self.__cache[key]
+
+        value = decode(self.__read(document_hash, kind))
+        self.stats["reads"] += 1
+
+        with self.__lock:
+            self.__cache[key] = value
+
+            while len(self.__cache) > self.cache_entries:
+                self.__cache.popitem(last=False)
+
+        return value
+
+    def __write(self, file_path: str, data: bytes):
+        if self.compression == "zlib":
+            data = zlib.compress(data)
+        elif self.compression == "zstd":
+            data = zstandard.ZstdCompressor().compress(data)
+
+        temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        with open(temp_path, "wb") as file:
+            file.write(data)
+
+        os.replace(temp_path, file_path)
+        self.stats["bytes_written"] += len(data)
+
+    def __read(self, document_hash: str, kind: str) -> bytes:
+        # Tries the configured compression first, then blobs written under another setting
+        for compression in [self.compression] + [other for other in EXTENSIONS if other != self.compression]:
+            try:
+                file = open(self.get_file_path(document_hash, kind, compression), "rb")
+            except FileNotFoundError:
+                continue
+
+            with file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    return b""
+
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    if compression == "zlib":
+                        return zlib.decompress(mapped)
+                    if compression == "zstd":
+                        if zstandard is None:
+                            raise Exception("Reading a zstd-compressed document requires the zstandard package")
+                        return zstandard.ZstdDecompressor().decompress(mapped)
+
+                    return bytes(mapped)
+
+        raise Exception(f"No stored document with hash: {document_hash}")
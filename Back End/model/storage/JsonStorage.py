@@ -0,0 +1,143 @@
+import json
+import os
+import threading
+from model.data_models.Codec import Codec
+from model.data_models.Conversation import Conversation
+from model.storage.StorageEngine import StorageEngine
+from model.storage.DocumentStore import DocumentStore
+from EnvironmentVars import HISTORY_COMPACTION_THRESHOLD, SNAPSHOT_FORMAT
+
+DOCUMENT_FIELDS = ("documentText", "chunks")
+
+class JsonStorage(StorageEngine):
+    # Legacy backend: one {Id}.json snapshot per conversation, plus an append-only
+    # {Id}.history.jsonl segment that chat turns write to. The segment is folded
+    # back into the snapshot once it holds HISTORY_COMPACTION_THRESHOLD turns.
+    # Snapshots are compact JSON, or MessagePack ({Id}.msgpack) with the "binary" format.
+    # With a document store, snapshots leave out the document text and chunks.
+
+    def __init__(self, database_path: str, compaction_threshold: int = HISTORY_COMPACTION_THRESHOLD, snapshot_format: str = SNAPSHOT_FORMAT, document_store: DocumentStore = None):
+        self.database_path = database_path
+        self.document_store = document_store
+        self.compaction_threshold = compaction_threshold
+        self.snapshot_format = snapshot_format
+        self.extension = ".msgpack" if snapshot_format == "binary" else ".json"
+        self.__segment_lengths = {}
+        self.__lock = threading.Lock()
+
+    def get_file_path(self, conversation_id: str):
+        return os.path.join(self.database_path, f"{conversation_id}{self.extension}")
+
+    def get_segment_path(self, conversation_id: str):
+        return os.path.join(self.database_path, f"{conversation_id}.history.jsonl")
+
+    def save_conversation(self, conversation: Conversation):
+        file_path = self.get_file_path(conversation.Id)
+        temp_path = file_path + ".tmp"
+        external = self.document_store is not None and self.document_store.externalize(conversation)
+
+        with open(temp_path, "wb") as file:
+            file.write(Codec.dumps(conversation, self.snapshot_format, DOCUMENT_FIELDS if external else ()))
+
+        os.replace(temp_path, file_path)
+
+        # The snapshot now contains every turn, so the segment can be dropped
+        try:
+            os.remove(self.get_segment_path(conversation.Id))
+        except FileNotFoundError:
+            pass
+
+        with self.__lock:
+            self.__segment_lengths[str(conversation.Id)] = 0
+
+    def append_turn(self, conversation: Conversation, position: int, entries):
+        conversation_id = str(conversation.Id)
+
+        # Each line records where its entries start so replaying a segment that
+        # was already compacted into the snapshot is harmless
+        line = json.dumps({
+            'position': position,
+            'entries': list(entries),
+            'progress': [concept.progress for concept in conversation.concepts],
+            'summary': conversation.summary,
+            'summarized_entries': conversation.summarized_entries
+        })
+
+        with open(self.get_segment_path(conversation_id), "a") as file:
+            file.write(line + "\n")
+
+        with self.__lock:
+            segment_length = self.__segment_lengths.get(conversation_id, 0) + 1
+            self.__segment_lengths[conversation_id] = segment_length
+
+        if segment_length >= self.compaction_threshold:
+            self.save_conversation(conversation)
+
+    def get_conversation(self, conversation_id: str):
+        try:
+            with open(self.get_file_path(conversation_id), "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            raise Exception(f"No conversation found with ID: {conversation_id}")
+
+        try:
+            conversation = Codec.loads(Conversation, data, self.snapshot_format)
+        except Exception as e:
+            raise Exception(f"Error converting data to Conversation: {str(e)}")
+
+        # Snapshots written before the document store still carry the document themselves
+        if self.document_store is not None and not conversation.documentText:
+            self.document_store.attach(conversation)
+
+        segment_length = self.__replay_segment(conversation)
+
+        with self.__lock:
+            self.__segment_lengths[str(conversation_id)] = segment_length
+
+        return conversation
+
+    def __replay_segment(self, conversation: Conversation):
+        segment_length = 0
+
+        try:
+            with open(self.get_segment_path(conversation.Id), "r") as file:
+                lines = file.readlines()
+        except FileNotFoundError:
+            return segment_length
+
+        for line in lines:
+            try:
+                turn = json.loads(line)
+            except ValueError:
+                # A torn write from a crash mid-append; everything before it is intact
+                break
+
+            segment_length += 1
+            history = conversation.conversation_history
+
+            if turn['position'] + len(turn['entries']) > len(history):
+                history[turn['position']:] = turn['entries']
+
+            for concept, progress in zip(conversation.concepts, turn['progress']):
+                concept.progress = progress
+
+            conversation.summary = turn.get('summary', conversation.summary)
+            conversation.summarized_entries = turn.get('summarized_entries', conversation.summarized_entries)
+
+        return segment_length
+
+    def delete_conversation(self, conversation_id: str):
+        for path in [self.get_file_path(conversation_id), self.get_segment_path(conversation_id)]:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+        with self.__lock:
+            self.__segment_lengths.pop(str(conversation_id), None)
+
+    def conversation_exists(self, conversation_id: str):
+        return os.path.exists(self.get_file_path(conversation_id))
+
+    def list_conversation_ids(self):
+        return [file_name[:-len(self.extension)] for file_name in sorted(os.listdir(self.database_path)) if file_name.endswith(self.extension)]
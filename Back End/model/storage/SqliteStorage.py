@@ -0,0 +1,279 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from model.data_models.Conversation import Conversation
+from model.storage.StorageEngine import StorageEngine, ConversationConflictError
+from model.storage.DocumentStore import DocumentStore
+
+# Each entry upgrades the schema by one version (tracked with PRAGMA user_version)
+MIGRATIONS = [
+    [
+        """
+        CREATE TABLE IF NOT EXISTS conversations (
+            id TEXT PRIMARY KEY,
+            document_text TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS concepts (
+            conversation_id TEXT NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            name TEXT NOT NULL,
+            progress INTEGER NOT NULL,
+            sub_concepts TEXT NOT NULL,
+            PRIMARY KEY (conversation_id, position)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS history (
+            conversation_id TEXT NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+            position INTEGER NOT NULL,
+            entry TEXT NOT NULL,
+            PRIMARY KEY (conversation_id, position)
+        )
+        """,
+    ],
+    [
+        "ALTER TABLE conversations ADD COLUMN page_offsets TEXT NOT NULL DEFAULT '[]'",
+    ],
+    [
+        "ALTER TABLE conversations ADD COLUMN chunks TEXT NOT NULL DEFAULT '[]'",
+        "ALTER TABLE concepts ADD COLUMN questions TEXT NOT NULL DEFAULT '[]'",
+    ],
+    [
+        "ALTER TABLE conversations ADD COLUMN version INTEGER NOT NULL DEFAULT 0",
+    ],
+    [
+        "ALTER TABLE conversations ADD COLUMN summary TEXT NOT NULL DEFAULT ''",
+        "ALTER TABLE conversations ADD COLUMN summarized_entries INTEGER NOT NULL DEFAULT 0",
+    ],
+    [
+        "ALTER TABLE conversations ADD COLUMN document_hash TEXT NOT NULL DEFAULT ''",
+    ],
+]
+
+class SqliteStorage(StorageEngine):
+    # Document text, concepts and history live in separate tables so that a
+    # chat turn only appends history rows and updates concept progress values.
+    # With a document store, the document text and chunks are kept there, once per
+    # document, instead of in every conversation row.
+
+    def __init__(self, database_file: str, document_store: DocumentStore = None):
+        self.database_file = database_file
+        self.document_store = document_store
+        self.__local = threading.local()
+        # True when this call created the database, so conversations of the JSON engine still need importing
+        self.created = self.__migrate()
+
+    def connection(self):
+        connection = getattr(self.__local, "connection", None)
+
+        if connection is None:
+            # Autocommit mode; writes open explicit transactions in transaction()
+            connection = sqlite3.connect(self.database_file, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            self.__local.connection = connection
+
+        return connection
+
+    @contextmanager
+    def transaction(self, mode: str = "IMMEDIATE"):
+        # Writers take the write lock up front; readers use DEFERRED for a consistent snapshot
+        connection = self.connection()
+        connection.execute(f"BEGIN {mode}")
+
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        else:
+            connection.execute("COMMIT")
+
+    def __migrate(self):
+        with self.transaction() as connection:
+            version = connection.execute("PRAGMA user_version").fetchone()[0]
+
+            for statements in MIGRATIONS[version:]:
+                for statement in statements:
+                    connection.execute(statement)
+
+            connection.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+
+        return version == 0
+
+    def save_conversation(self, conversation: Conversation):
+        conversation_id = str(conversation.Id)
+        now = time.time()
+        external = self.document_store is not None and self.document_store.externalize(conversation)
+
+        with self.transaction() as connection:
+            # The document text never changes after upload, so it is only written once
+            if not self.__bump_version(connection, conversation, now):
+                connection.execute(
+                    "INSERT INTO conversations (id, document_text, page_offsets, chunks, created_at, updated_at, version, summary, summarized_entries, document_hash) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        conversation_id, "" if external else conversation.documentText, json.dumps(conversation.pageOffsets),
+                        "[]" if external else json.dumps(conversation.chunks), now, now, conversation.version + 1,
+                        conversation.summary, conversation.summarized_entries, conversation.documentHash
+                    )
+                )
+            elif external:
+                # A conversation that still has its own copy of the document drops it
+                connection.execute(
+                    "UPDATE conversations SET document_text = '', chunks = '[]', document_hash = ? WHERE id = ? AND (document_hash != ? OR length(chunks) > 2)",
+                    (conversation.documentHash, conversation_id, conversation.documentHash)
+                )
+
+            self.__save_concepts(connection, conversation_id, conversation.concepts)
+            self.__save_history(connection, conversation_id, conversation.conversation_history)
+
+        conversation.version += 1
+
+    def __bump_version(self, connection, conversation: Conversation, now: float):
+        # Optimistic concurrency: the row is only updated if nobody saved it since it was read.
+        # Returns False when the conversation is not stored yet. The conversation memory
+        # summary is written along with it since it can change on any turn.
+        updated = connection.execute(
+            "UPDATE conversations SET updated_at = ?, version = version + 1, summary = ?, summarized_entries = ? WHERE id = ? AND version = ?",
+            (now, conversation.summary, conversation.summarized_entries, str(conversation.Id), conversation.version)
+        ).rowcount
+
+        if updated:
+            return True
+
+        stored = connection.execute("SELECT version FROM conversations WHERE id = ?", (str(conversation.Id),)).fetchone()
+
+        if stored is not None:
+            raise ConversationConflictError(
+                f"Conversation {conversation.Id} was modified concurrently (version {stored[0]}, expected {conversation.version})"
+            )
+
+        return False
+
+    def __save_concepts(self, connection, conversation_id, concepts):
+        stored_names = [row[0] for row in connection.execute(
+            "SELECT name FROM concepts WHERE conversation_id = ? ORDER BY position", (conversation_id,)
+        )]
+
+        rows = [
+            (concept.name, concept.progress, json.dumps([subConcept.to_dict() for subConcept in concept.subConcepts]), json.dumps(concept.questions), conversation_id, position)
+            for position, concept in enumerate(concepts)
+        ]
+
+        # Same concept map as before: only the progress values need updating
+        if stored_names == [concept.name for concept in concepts]:
+            connection.executemany(
+                "UPDATE concepts SET name = ?, progress = ?, sub_concepts = ?, questions = ? WHERE conversation_id = ? AND position = ?", rows
+            )
+            return
+
+        connection.execute("DELETE FROM concepts WHERE conversation_id = ?", (conversation_id,))
+        connection.executemany(
+            "INSERT INTO concepts (name, progress, sub_concepts, questions, conversation_id, position) VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+
+    def __save_history(self, connection, conversation_id, history):
+        stored_count = connection.execute(
+            "SELECT COALESCE(MAX(position) + 1, 0) FROM history WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()[0]
+
+        # History is append-only in the app; truncate if the caller removed entries
+        if stored_count > len(history):
+            connection.execute("DELETE FROM history WHERE conversation_id = ? AND position >= ?", (conversation_id, len(history)))
+            stored_count = len(history)
+
+        connection.executemany(
+            "INSERT INTO history (conversation_id, position, entry) VALUES (?, ?, ?)",
+            [(conversation_id, position, history[position]) for position in range(stored_count, len(history))]
+        )
+
+    def append_turn(self, conversation: Conversation, position: int, entries):
+        conversation_id = str(conversation.Id)
+
+        with self.transaction() as connection:
+            if not self.__bump_version(connection, conversation, time.time()):
+                raise Exception(f"No conversation found with ID: {conversation_id}")
+
+            connection.executemany(
+                "INSERT INTO history (conversation_id, position, entry) VALUES (?, ?, ?)",
+                [(conversation_id, position + offset, entry) for offset, entry in enumerate(entries)]
+            )
+            connection.executemany(
+                "UPDATE concepts SET progress = ? WHERE conversation_id = ? AND position = ?",
+                [(concept.progress, conversation_id, index) for index, concept in enumerate(conversation.concepts)]
+            )
+
+        conversation.version += 1
+
+    def get_conversation(self, conversation_id: str):
+        # Read in one transaction so the history always matches the version
+        with self.transaction("DEFERRED") as connection:
+            # The document text is left out; it is loaded separately if something reads it
+            row = connection.execute("SELECT page_offsets, chunks, version, summary, summarized_entries, document_hash FROM conversations WHERE id = ?", (str(conversation_id),)).fetchone()
+
+            if row is None:
+                raise Exception(f"No conversation found with ID: {conversation_id}")
+
+            concepts = [
+                {'name': name, 'progress': progress, 'subConcepts': json.loads(sub_concepts), 'questions': json.loads(questions)}
+                for name, progress, sub_concepts, questions in connection.execute(
+                    "SELECT name, progress, sub_concepts, questions FROM concepts WHERE conversation_id = ? ORDER BY position", (str(conversation_id),)
+                )
+            ]
+
+            history = [entry for (entry,) in connection.execute(
+                "SELECT entry FROM history WHERE conversation_id = ? ORDER BY position", (str(conversation_id),)
+            )]
+
+        try:
+            conversation = Conversation.from_dict({
+                'Id': str(conversation_id),
+                'pageOffsets': json.loads(row[0]),
+                'chunks': json.loads(row[1]),
+                'concepts': concepts,
+                'conversation_history': history,
+                'version': row[2],
+                'summary': row[3],
+                'summarized_entries': row[4],
+                'documentHash': row[5]
+            })
+        except Exception as e:
+            raise Exception(f"Error converting data to Conversation: {str(e)}")
+
+        if self.document_store is None or not self.document_store.attach(conversation):
+            conversation.defer_document(lambda: self.get_document_text(conversation_id))
+
+        return conversation
+
+    def get_document_text(self, conversation_id: str) -> str:
+        row = self.connection().execute("SELECT document_text FROM conversations WHERE id = ?", (str(conversation_id),)).fetchone()
+
+        if row is None:
+            raise Exception(f"No conversation found with ID: {conversation_id}")
+
+        return row[0]
+
+    def delete_conversation(self, conversation_id: str):
+        # Concepts and history rows go with it (ON DELETE CASCADE)
+        with self.transaction() as connection:
+            connection.execute("DELETE FROM conversations WHERE id = ?", (str(conversation_id),))
+
+    def conversation_exists(self, conversation_id: str):
+        return self.connection().execute("SELECT 1 FROM conversations WHERE id = ?", (str(conversation_id),)).fetchone() is not None
+
+    def list_conversation_ids(self):
+        return [row[0] for row in self.connection().execute("SELECT id FROM conversations ORDER BY created_at")]
+
+    def close(self):
+        connection = getattr(self.__local, "connection", None)
+
+        if connection is not None:
+            connection.close()
+            self.__local.connection = None
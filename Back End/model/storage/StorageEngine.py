@@ -0,0 +1,31 @@
+from model.data_models.Conversation import Conversation
+
+class ConversationConflictError(Exception):
+    # Raised when a conversation was changed by someone else since it was read
+    pass
+
+class StorageEngine:
+    # Interface implemented by every storage backend used by Database
+
+    def save_conversation(self, conversation: Conversation):
+        raise NotImplementedError
+
+    def get_conversation(self, conversation_id: str) -> Conversation:
+        raise NotImplementedError
+
+    def append_turn(self, conversation: Conversation, position: int, entries):
+        # Persists history entries already appended to the conversation at the given
+        # position, along with the current concept progress values
+        self.save_conversation(conversation)
+
+    def delete_conversation(self, conversation_id: str):
+        raise NotImplementedError
+
+    def conversation_exists(self, conversation_id: str) -> bool:
+        raise NotImplementedError
+
+    def list_conversation_ids(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
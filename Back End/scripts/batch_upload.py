@@ -0,0 +1,44 @@
+# Preloads a directory or zip archive of exam PDFs as conversations ready to start,
+# the same way as POST /extract/batch but in this process, and reports the
+# throughput of every pipeline stage. With --manifest the finished documents are
+# recorded there, and running the same command again skips them.
+# Usage (from the Back End directory):
+#   python -m scripts.batch_upload exams.zip [--manifest exams.jsonl] [--concept-workers 8]
+import argparse
+from controller.extraction_controller import run_batch
+from model.Database import Database
+from EnvironmentVars import BATCH_TEXT_WORKERS, BATCH_CHUNK_WORKERS, BATCH_CONCEPT_WORKERS, BATCH_QUEUE_SIZE
+
+def print_stages(stages):
+    print(f"{'stage':<18}{'workers':>8}{'items':>7}{'failed':>7}{'docs/s':>9}{'avg ms':>9}{'busy s':>9}{'blocked s':>10}{'elapsed s':>10}")
+
+    for stage in stages:
+        average = 1000 * stage["busy_seconds"] / stage["items"] if stage["items"] else 0.0
+        print(f"{stage['stage']:<18}{stage['workers']:>8}{stage['items']:>7}{stage['failures']:>7}{stage['per_second']:>9.2f}{average:>9.1f}"
+              f"{stage['busy_seconds']:>9.1f}{stage['blocked_seconds']:>10.1f}{stage['elapsed_seconds']:>10.1f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Extract text and concepts from a batch of PDFs")
+    parser.add_argument("path", help="Directory (searched recursively) or zip archive of PDFs")
+    parser.add_argument("--manifest", help="JSON lines file recording finished documents; existing entries are skipped")
+    parser.add_argument("--text-workers", type=int, default=BATCH_TEXT_WORKERS)
+    parser.add_argument("--chunk-workers", type=int, default=BATCH_CHUNK_WORKERS)
+    parser.add_argument("--concept-workers", type=int, default=BATCH_CONCEPT_WORKERS)
+    parser.add_argument("--queue-size", type=int, default=BATCH_QUEUE_SIZE, help="Documents waiting in front of each stage")
+    args = parser.parse_args()
+
+    def report(progress):
+        print(f"[{progress['done']}/{progress['total']}] {progress['failed']} failed", end="\r", flush=True)
+
+    result = run_batch(args.path, report, args.manifest, args.text_workers, args.chunk_workers, args.concept_workers, args.queue_size)
+
+    # Writes conversations still held by the write-behind cache
+    Database.flush()
+    print()
+
+    for record in result["documents"]:
+        if record["error"] is not None:
+            print(f"{record['file']}: {record['error']}")
+
+    print(f"{result['done'] - result['failed']} of {result['total']} documents ready, {result['failed']} failed")
+    print_stages(result["stages"])
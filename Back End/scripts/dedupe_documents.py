@@ -0,0 +1,54 @@
+# Moves the documents of existing conversations into the shared document store, so
+# conversations on the same exam keep a single copy. Works on database/*.json
+# conversations (--engine json) as well as SQLite; conversations already using the
+# store are skipped. Safe to run again.
+# Usage (from the Back End directory): python -m scripts.dedupe_documents [--engine json] [--vacuum]
+import argparse
+from model.Database import Database
+from EnvironmentVars import DATABASE_ENGINE
+
+def dedupe(engine_name: str = DATABASE_ENGINE, vacuum: bool = False):
+    engine = Database.create_engine(engine_name)
+    store = Database.get_document_store()
+    written = store.stats["bytes_written"]
+    moved, skipped, failed = 0, 0, 0
+    documents = set()
+    document_chars = 0
+
+    for conversation_id in engine.list_conversation_ids():
+        try:
+            # Held so a running server cannot save this conversation at the same time
+            with Database.lock(conversation_id):
+                conversation = engine.get_conversation(conversation_id)
+
+                if (conversation.documentHash and store.exists(conversation.documentHash)) or not conversation.documentText:
+                    # Using the store already, or there is no document
+                    skipped += 1
+                    continue
+
+                document_chars += len(conversation.documentText)
+                engine.save_conversation(conversation)
+
+                if engine_name == DATABASE_ENGINE:
+                    Database.get_index().set_document_hash(conversation_id, conversation.documentHash)
+
+            documents.add(conversation.documentHash)
+            moved += 1
+        except Exception as e:
+            print(f"Failed to move the document of {conversation_id}: {str(e)}")
+            failed += 1
+
+    if vacuum and engine_name == "sqlite":
+        # Gives the space of the removed document copies back to the file system
+        engine.connection().execute("VACUUM")
+
+    print(f"Moved {moved} documents ({len(documents)} distinct), skipped {skipped}, failed {failed} conversations")
+    print(f"{document_chars} characters of document copies replaced by {store.stats['bytes_written'] - written} bytes in the document store")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Move conversation documents into the shared document store")
+    parser.add_argument("--engine", choices=["sqlite", "json"], default=DATABASE_ENGINE, help="Storage engine to process (default: the configured one)")
+    parser.add_argument("--vacuum", action="store_true", help="Compact the SQLite file afterwards")
+    args = parser.parse_args()
+
+    dedupe(args.engine, args.vacuum)
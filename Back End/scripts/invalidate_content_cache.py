@@ -0,0 +1,12 @@
+# Clears cached extraction results, e.g. after changing the concept extraction prompt.
+# Usage (from the Back End directory): python -m scripts.invalidate_content_cache [--namespace concepts]
+import argparse
+from model.ContentCache import ContentCache
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Invalidate the document and concept extraction cache")
+    parser.add_argument("--namespace", choices=["document_text", "concepts"], help="Only clear this namespace (default: everything)")
+    args = parser.parse_args()
+
+    removed = ContentCache.shared().invalidate(args.namespace)
+    print(f"Removed {removed} cached entries")
@@ -0,0 +1,30 @@
+# Imports the legacy database/*.json conversations into the SQLite engine. The app does this
+# by itself when it creates the SQLite database; run this for JSON files added later.
+# Usage (from the Back End directory): python -m scripts.migrate_json_database [--overwrite]
+import argparse
+from model.Database import Database
+from EnvironmentVars import DATABASE_ENGINE
+
+def migrate(overwrite: bool = False):
+    source = Database.create_engine("json")
+    target = Database.create_engine("sqlite")
+    conversation_ids = source.list_conversation_ids()
+    skipped = 0 if overwrite else sum(1 for conversation_id in conversation_ids if target.conversation_exists(conversation_id))
+
+    imported = Database.import_conversations(source, target, overwrite)
+
+    # The app lists and searches conversations through the index of its configured engine
+    if DATABASE_ENGINE == "sqlite":
+        for conversation_id in imported:
+            Database.get_index().update(target.get_conversation(conversation_id))
+
+    failed = len(conversation_ids) - len(imported) - skipped
+
+    print(f"Imported {len(imported)}, skipped {skipped}, failed {failed} conversations")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Import database/*.json conversations into SQLite")
+    parser.add_argument("--overwrite", action="store_true", help="Re-import conversations that already exist in SQLite")
+    args = parser.parse_args()
+
+    migrate(args.overwrite)
@@ -0,0 +1,33 @@
+# Reports the estimated prompt size of the conversation agent for every stored
+# conversation and concept, with the whole exam versus the retrieved excerpts.
+# Usage (from the Back End directory): python -m scripts.prompt_size_report
+from model.Database import Database
+from model.agents.ConversationAgent import ConversationAgent
+from model.data_models.Concept import Concept
+from model.retrieval.ContextBuilder import ContextBuilder
+from model.TokenCounter import estimate_tokens
+from EnvironmentVars import CONTEXT_TOKEN_BUDGET
+
+if __name__ == '__main__':
+    engine = Database.get_engine()
+    agent = ConversationAgent()
+    total_before, total_after = 0, 0
+
+    print(f"Context token budget: {CONTEXT_TOKEN_BUDGET}")
+    print(f"{'conversation':<38}{'concept':<32}{'before':>10}{'after':>10}")
+
+    for conversation_id in engine.list_conversation_ids():
+        conversation = engine.get_conversation(conversation_id)
+
+        for concept in conversation.concepts or [Concept(name="(no concepts)")]:
+            after = sum(estimate_tokens(part) for part in agent.start_conversation_prompt(conversation, concept))
+
+            # The same prompt with the whole exam in place of the retrieved excerpts
+            before = after - estimate_tokens(ContextBuilder.build(conversation, concept)) + estimate_tokens(conversation.documentText)
+
+            total_before += before
+            total_after += after
+            print(f"{conversation_id:<38}{concept.name[:30]:<32}{before:>10}{after:>10}")
+
+    if total_before:
+        print(f"Total estimated prompt tokens: {total_before} before, {total_after} after ({100 * (1 - total_after / total_before):.1f}% saved)")
@@ -0,0 +1,41 @@
+# Production entry point: serves the app with gunicorn using pre-forked worker
+# processes (configured by the SERVER_* settings in EnvironmentVars.py).
+# Usage (from the Back End directory): python serve.py
+# For development, `python app.py` still runs Flask's single-process debug server.
+from gunicorn.app.base import BaseApplication
+from EnvironmentVars import SERVER_BIND, SERVER_WORKERS, SERVER_THREADS, SERVER_TIMEOUT
+
+class Server(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self):
+        # The app is imported in each worker after the fork, so database connections,
+        # thread pools and job workers are never shared between processes
+        from model.Database import Database
+        Database.disable_cache()
+
+        from app import app
+        return app
+
+def post_worker_init(worker):
+    # Runs in each worker once it has loaded the app, so every worker process resumes
+    # background jobs and sweeps; the master process never starts any
+    from app import start_background_workers
+    start_background_workers()
+
+if __name__ == '__main__':
+    Server({
+        "bind": SERVER_BIND,
+        "workers": SERVER_WORKERS,
+        "threads": SERVER_THREADS,
+        "worker_class": "gthread",
+        "timeout": SERVER_TIMEOUT,
+        "preload_app": False,
+        "post_worker_init": post_worker_init
+    }).run()
@@ -0,0 +1,67 @@
+# Tests run against the fake LLM provider and a throwaway database directory.
+# Usage (from the Back End directory): python -m pytest
+import io
+import os
+import shutil
+import sys
+import tempfile
+import pytest
+
+# Must be set before EnvironmentVars is imported by the app
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["FAKE_LLM_LATENCY"] = "0"
+os.environ["FAKE_LLM_TOKEN_DELAY"] = "0"
+os.environ.setdefault("LOG_LEVEL", "OFF")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from model.Database import Database
+
+DATABASE_PATH = tempfile.mkdtemp(prefix="teachalex-tests-")
+# Resolved once per process, so every component (jobs, caches, documents) lands in the temporary directory
+Database._database_path = DATABASE_PATH
+
+from controller.extraction_controller import extract_bp
+from controller.conversation_controller import conversation_bp
+from controller.metrics_controller import metrics_bp, TracedJSONProvider
+from benchmarks.synthetic_pdf import build_pdf
+from EnvironmentVars import MAX_UPLOAD_BYTES
+
+def pytest_sessionfinish(session, exitstatus):
+    Database.flush()
+    shutil.rmtree(DATABASE_PATH, ignore_errors=True)
+
+@pytest.fixture(scope="session")
+def app():
+    # Same blueprints as app.py, without the Swagger UI
+    app = Flask(__name__)
+    app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
+    app.json = TracedJSONProvider(app)
+    app.register_blueprint(extract_bp)
+    app.register_blueprint(conversation_bp)
+    app.register_blueprint(metrics_bp)
+
+    return app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def upload(client):
+    # Uploads a synthetic exam PDF and returns the new conversation's ID
+    def upload(pages: int = 2, seed: int = 0):
+        response = client.post("/extract/text", data={"file": (io.BytesIO(build_pdf(pages, seed=seed)), "exam.pdf")}, content_type="multipart/form-data")
+        assert response.status_code == 200
+        return response.get_json()["Id"]
+
+    return upload
+
+@pytest.fixture
+def conversation_id(client, upload):
+    # A conversation with its concepts extracted and Alex's first message
+    conversation_id = upload()
+    assert client.post("/extract/concepts", data={"id": conversation_id}).status_code == 200
+
+    return conversation_id
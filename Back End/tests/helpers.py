@@ -0,0 +1,42 @@
+import json
+import threading
+import time
+from model.Database import Database
+
+def sse_events(response):
+    # (event, data) pairs of a server-sent event stream
+    events = []
+
+    for block in response.get_data(as_text=True).split("\n\n"):
+        if not block.strip():
+            continue
+
+        lines = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((lines["event"], json.loads(lines["data"])))
+
+    return events
+
+def wait_for(condition, timeout: float = 10.0):
+    # Polls until condition() returns something truthy and returns it
+    deadline = time.time() + timeout
+
+    while time.time() < deadline:
+        result = condition()
+
+        if result:
+            return result
+
+        time.sleep(0.05)
+
+    raise AssertionError("Timed out waiting for the condition")
+
+def lock_is_free(conversation_id, timeout: float = 2.0):
+    # Whether another thread can take the conversation lock within timeout seconds
+    locked = threading.Event()
+
+    def hold():
+        with Database.lock(conversation_id):
+            locked.set()
+
+    threading.Thread(target=hold, daemon=True).start()
+    return locked.wait(timeout)
@@ -0,0 +1,76 @@
+import pytest
+from model.data_models import MessagePack
+from model.data_models.Codec import Codec
+from model.data_models.Concept import Concept
+from model.data_models.Conversation import Conversation
+from model.data_models.SubConcept import SubConcept
+
+def sample_conversation():
+    conversation = Conversation(
+        documentText="Q1. What is a derivative?\nQ2. What is an integral? ✓",
+        concepts=[Concept(name="Calculus", progress=40, questions=["Q1", "Q2"], subConcepts=[SubConcept(name="Derivatives", connections=["Integrals"])])],
+        conversation_history=["Alex: What is a derivative?", "User: A rate of change"],
+        pageOffsets=[0, 26],
+        chunks=["Q1. What is a derivative?\n", "Q2. What is an integral? ✓"],
+        documentHash="abc123"
+    )
+    conversation.version = 3
+    conversation.summary = "The user explained derivatives."
+    conversation.summarized_entries = 2
+    return conversation
+
+@pytest.mark.parametrize("format", ["json", "binary"])
+def test_conversation_round_trip(format):
+    conversation = sample_conversation()
+    loaded = Codec.loads(Conversation, Codec.dumps(conversation, format), format)
+
+    assert loaded.to_dict() == conversation.to_dict()
+    assert loaded.Id == conversation.Id
+    assert loaded.concepts[0].subConcepts[0].connections == ["Integrals"]
+
+@pytest.mark.parametrize("format", ["json", "binary"])
+def test_excluded_fields_read_back_as_defaults(format):
+    loaded = Codec.loads(Conversation, Codec.dumps(sample_conversation(), format, ("documentText", "chunks")), format)
+
+    assert loaded.documentText == "" and loaded.chunks == []
+    assert loaded.documentHash == "abc123"
+
+def test_binary_data_from_an_older_schema():
+    # Written before the trailing fields existed: they read back as their defaults
+    values = Codec.to_list(sample_conversation())[:6]
+    loaded = Codec.from_list(Conversation, MessagePack.unpack(MessagePack.pack(values)))
+
+    assert loaded.conversation_history == ["Alex: What is a derivative?", "User: A rate of change"]
+    assert (loaded.version, loaded.summary, loaded.summarized_entries, loaded.documentHash) == (0, "", 0, "")
+
+def test_unknown_format():
+    with pytest.raises(Exception):
+        Codec.dumps(sample_conversation(), "xml")
+
+@pytest.mark.parametrize("value", [
+    None, True, False, 0, 127, 128, 255, 256, 65535, 65536, 2 ** 32, 2 ** 64 - 1,
+    -1, -32, -33, -2 ** 31, -2 ** 63, 1.5, -0.25,
+    "", "a" * 31, "a" * 32, "é" * 200, "x" * 70000,
+    b"", b"\x00\xff" * 200,
+    [], list(range(15)), list(range(16)), list(range(70000)),
+    {}, {"a": 1, "b": [1, {"c": None}]}, {str(index): index for index in range(20)}
+])
+def test_message_pack_round_trip(value):
+    assert MessagePack.unpack(MessagePack.pack(value)) == value
+
+def test_message_pack_compact_forms():
+    assert MessagePack.pack(None) == b"\xc0"
+    assert MessagePack.pack(5) == b"\x05"
+    assert MessagePack.pack(-1) == b"\xff"
+    assert MessagePack.pack("ab") == b"\xa2ab"
+    assert MessagePack.pack([1, 2]) == b"\x92\x01\x02"
+
+def test_message_pack_rejects_bad_input():
+    with pytest.raises(ValueError):
+        MessagePack.unpack(MessagePack.pack(1) + b"\x00")
+
+    with pytest.raises(ValueError):
+        MessagePack.pack(2 ** 64)
+
+    with pytest.raises(TypeError):
+        MessagePack.pack(object())
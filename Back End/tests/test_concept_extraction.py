@@ -0,0 +1,91 @@
+import json
+import re
+import pytest
+from model.ContentCache import ContentCache
+from model.agents.ConceptExtractionAgent import ConceptExtractionAgent, merge_concepts
+from model.providers.FakeProvider import FakeProvider
+from model.providers.OpenAI import Model
+
+def exam(seed):
+    # Distinct per test so no result is served from another test's cache entry
+    return "".join(f"Q{number}. Question {number} of exam {seed} about topic {number % 3}.\n" for number in range(1, 21))
+
+@pytest.fixture
+def reply(monkeypatch):
+    def reply(concepts):
+        monkeypatch.setitem(FakeProvider.responses, Model.O3_MINI, json.dumps(concepts))
+
+    return reply
+
+class PartProvider:
+    # Replies with the concept map given for the part named in the prompt; parts without one get invalid JSON
+    def __init__(self, replies):
+        self.replies = replies
+        self.prompts = []
+
+    def query(self, prompt, temperature=None, system=None, cache=False):
+        self.prompts.append(prompt)
+        part = int(re.search(r"you are given part (\d+)", prompt).group(1))
+        return json.dumps(self.replies[part]) if part in self.replies else "not json"
+
+def map_reduce_agent(replies):
+    agent = ConceptExtractionAgent(mode="map_reduce", chunk_chars=300)
+    agent.model = PartProvider(replies)
+    return agent
+
+def test_merge_keeps_first_names_and_unions_questions():
+    merged = merge_concepts([
+        {"Linear Equations": ["Q1", "Q2"], "Graphs": ["Q3"]},
+        {"linear equations.": ["Q2", "Q4"], "Functions": ["Q5"]},
+        {"Graphs": ["Q6"]}
+    ])
+
+    assert merged == {"Linear Equations": ["Q1", "Q2", "Q4"], "Graphs": ["Q3", "Q6"], "Functions": ["Q5"]}
+    assert list(merged) == ["Linear Equations", "Graphs", "Functions"]
+
+def test_map_reduce_merges_every_part():
+    agent = map_reduce_agent({1: {"Algebra": ["Q1"]}, 2: {"algebra": ["Q8"], "Geometry": ["Q9"]}, 3: {"Geometry": ["Q15"]}})
+
+    assert agent.map_reduce(exam(4)) == {"Algebra": ["Q1", "Q8"], "Geometry": ["Q9", "Q15"]}
+    assert len(agent.model.prompts) == 3
+
+def test_map_reduce_skips_a_part_without_valid_json():
+    agent = map_reduce_agent({1: {"Algebra": ["Q1"]}, 3: {"Geometry": ["Q15"]}})
+    first_concepts = []
+
+    assert agent.map_reduce(exam(5), first_concepts.append) == {"Algebra": ["Q1"], "Geometry": ["Q15"]}
+    assert first_concepts == ["Algebra"]
+
+def test_map_reduce_fails_when_no_part_is_valid():
+    with pytest.raises(ValueError):
+        map_reduce_agent({}).map_reduce(exam(6))
+
+def test_same_extraction_is_served_from_the_cache(reply):
+    text = exam(1)
+    reply({"First": ["Q1"]})
+    assert ConceptExtractionAgent(mode="single").extract(text) == {"First": ["Q1"]}
+
+    reply({"Second": ["Q2"]})
+    assert ConceptExtractionAgent(mode="single").extract(text) == {"First": ["Q1"]}
+
+def test_different_strategy_misses_the_cache(reply):
+    text = exam(2)
+    reply({"Single": ["Q1"]})
+    ConceptExtractionAgent(mode="single").extract(text)
+
+    reply({"Mapped": ["Q1"]})
+    assert ConceptExtractionAgent(mode="map_reduce", chunk_chars=200).extract(text) == {"Mapped": ["Q1"]}
+
+    # Parts of another size are another extraction too
+    misses = ContentCache.shared().misses
+    ConceptExtractionAgent(mode="map_reduce", chunk_chars=400).extract(text)
+    assert ContentCache.shared().misses == misses + 1
+
+def test_short_exam_is_one_extraction_in_either_mode(reply):
+    # Shorter than a part, so map-reduce mode sends the same single prompt
+    text = exam(3)
+    reply({"Short": ["Q1"]})
+    ConceptExtractionAgent(mode="single").extract(text)
+
+    reply({"Other": ["Q1"]})
+    assert ConceptExtractionAgent(mode="map_reduce", chunk_chars=len(text)).extract(text) == {"Short": ["Q1"]}
@@ -0,0 +1,64 @@
+import pytest
+from model.ContentCache import ContentCache, content_hash, normalize_text
+
+@pytest.fixture
+def cache(tmp_path):
+    return ContentCache(str(tmp_path / "cache.db"))
+
+def test_values_round_trip(cache):
+    cache.put("concepts", "exam", {"Algebra": ["Q1", "Q2"]})
+
+    assert cache.get("concepts", "exam") == {"Algebra": ["Q1", "Q2"]}
+    assert cache.get("concepts", "other") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_namespaces_are_separate(cache):
+    cache.put("concepts", "exam", ["concepts"])
+    cache.put("documents", "exam", ["document"])
+
+    assert cache.get("concepts", "exam") == ["concepts"]
+    assert cache.get("documents", "exam") == ["document"]
+
+def test_put_replaces_the_value(cache):
+    cache.put("concepts", "exam", 1)
+    cache.put("concepts", "exam", 2)
+
+    assert cache.get("concepts", "exam") == 2
+    assert cache.stats()["namespaces"]["concepts"]["entries"] == 1
+
+def test_invalidate_one_namespace_or_all(cache):
+    cache.put("concepts", "a", 1)
+    cache.put("concepts", "b", 2)
+    cache.put("documents", "a", 3)
+
+    assert cache.invalidate("concepts") == 2
+    assert cache.get("concepts", "a") is None
+    assert cache.get("documents", "a") == 3
+
+    assert cache.invalidate() == 1
+    assert cache.stats()["namespaces"] == {}
+
+def test_least_recently_accessed_entries_are_evicted(cache):
+    value = "x" * 100
+    cache.max_bytes = 3 * len(f'"{value}"')
+
+    for key in ("a", "b", "c"):
+        cache.put("documents", key, value)
+
+    # "a" is read, so "b" is the oldest access when "d" no longer fits
+    cache.get("documents", "a")
+    cache.put("documents", "d", value)
+
+    assert cache.get("documents", "b") is None
+    assert all(cache.get("documents", key) == value for key in ("a", "c", "d"))
+
+def test_other_connections_see_the_entries(cache):
+    cache.put("concepts", "exam", [1, 2])
+
+    assert ContentCache(cache.cache_file).get("concepts", "exam") == [1, 2]
+
+def test_keys_ignore_whitespace_but_not_content():
+    assert content_hash(normalize_text("Q1.  What is\n x?")) == content_hash(normalize_text("Q1. What is x? "))
+    assert content_hash(normalize_text("Q1. What is x?")) != content_hash(normalize_text("Q1. What is y?"))
+    # Parts are separated, so moving text between them changes the key
+    assert content_hash("ab", "c") != content_hash("a", "bc")
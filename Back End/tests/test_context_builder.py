@@ -0,0 +1,94 @@
+import pytest
+from model.agents.ConversationAgent import ConversationAgent
+from model.data_models.Concept import Concept
+from model.data_models.Conversation import Conversation
+from model.retrieval.Chunker import chunk_text
+from model.retrieval.ContextBuilder import ContextBuilder
+from model.storage.DocumentStore import DocumentStore
+from model.storage.SqliteStorage import SqliteStorage
+
+def exam(questions):
+    return "".join(f"Q{number}. Explain topic {number} and how it relates to topic {number + 1}.\n" for number in range(1, questions + 1))
+
+EXAM = exam(40)
+
+def deferred_conversation(text):
+    # Like a conversation read from storage: chunks are present, the document text is not loaded
+    conversation = Conversation(documentText="", chunks=chunk_text(text, 200), concepts=[Concept(name="topic 7", questions=["Q7"])])
+
+    def load_document():
+        raise AssertionError("the document text was loaded")
+
+    conversation.defer_document(load_document)
+    return conversation
+
+def test_small_document_is_built_from_chunks():
+    conversation = deferred_conversation(EXAM)
+
+    assert ContextBuilder.build(conversation, conversation.concepts[0], token_budget=10 ** 6) == EXAM
+    assert not conversation.document_loaded
+
+def test_large_document_includes_concept_questions():
+    conversation = deferred_conversation(EXAM)
+    context = ContextBuilder.build(conversation, conversation.concepts[0], token_budget=100, top_k=2)
+
+    assert "Q7." in context
+    assert len(context) < len(EXAM)
+    assert not conversation.document_loaded
+
+def test_prompt_prefix_is_the_same_for_every_concept():
+    # Well over the context budget, so each concept gets its own excerpts
+    conversation = Conversation(documentText="", chunks=chunk_text(exam(600), 200))
+    first, second = Concept(name="topic 7", questions=["Q7"]), Concept(name="topic 500", questions=["Q500"])
+    agent = ConversationAgent()
+
+    first_system, first_prompt = agent.start_conversation_prompt(conversation, first)
+    second_system, second_prompt = agent.input_prompt(conversation, second, "Topic 500 is about...")
+
+    assert first_system == second_system
+    assert "Q7." in first_prompt and "Q7." not in first_system
+    assert "Q500." in second_prompt and "Q500." not in second_system
+
+def test_small_document_is_part_of_the_prompt_prefix():
+    conversation = deferred_conversation(EXAM)
+    system, prompt = ConversationAgent().start_conversation_prompt(conversation, conversation.concepts[0])
+
+    assert EXAM in system
+    assert "Q7." not in prompt
+
+@pytest.fixture(params=["document_store", "inline"])
+def engine(request, tmp_path):
+    # Documents kept in the document store, or inline in the database
+    document_store = DocumentStore(str(tmp_path / "documents")) if request.param == "document_store" else None
+    engine = SqliteStorage(str(tmp_path / "conversations.db"), document_store=document_store)
+    yield engine
+    engine.close()
+
+def stored_conversation(engine, text):
+    conversation = Conversation(documentText=text, chunks=chunk_text(text, 200), concepts=[Concept(name="topic 7", questions=["Q7"])])
+    engine.save_conversation(conversation)
+    return engine.get_conversation(conversation.Id)
+
+def test_context_is_built_from_stored_chunks(engine):
+    conversation = stored_conversation(engine, exam(600))
+    context = ContextBuilder.build(conversation, conversation.concepts[0])
+
+    assert "Q7." in context and len(context) < len(exam(600))
+    # Excerpts are slices of the stored text
+    assert all(excerpt in exam(600) for excerpt in context.split("\n...\n"))
+    assert not conversation.document_loaded
+
+def test_small_stored_document_is_rebuilt_whole(engine):
+    conversation = stored_conversation(engine, EXAM)
+
+    assert ContextBuilder.build(conversation, conversation.concepts[0]) == EXAM
+    assert not conversation.document_loaded
+
+def test_prompts_from_a_stored_conversation_do_not_load_the_document(engine):
+    conversation = stored_conversation(engine, exam(600))
+    agent = ConversationAgent()
+
+    agent.start_conversation_prompt(conversation, conversation.concepts[0])
+    agent.input_prompt(conversation, conversation.concepts[0], "Topic 7 is about...")
+
+    assert not conversation.document_loaded
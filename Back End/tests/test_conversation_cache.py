@@ -0,0 +1,81 @@
+import pytest
+from model.ConversationCache import ConversationCache
+from model.data_models.Concept import Concept
+from model.data_models.Conversation import Conversation
+from model.storage.SqliteStorage import SqliteStorage
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = SqliteStorage(str(tmp_path / "conversations.db"))
+    yield engine
+    engine.close()
+
+@pytest.fixture
+def other_process(engine):
+    # A second engine on the same file, like another process or a maintenance script
+    other = SqliteStorage(engine.database_file)
+    yield other
+    other.close()
+
+def stored_conversation(engine):
+    conversation = Conversation(documentText="Q1. What is a derivative?", concepts=[Concept(name="Derivatives")])
+    engine.save_conversation(conversation)
+    return engine.get_conversation(conversation.Id)
+
+def test_flush_writes_dirty_entries(engine):
+    cache = ConversationCache(engine, 16, 2 ** 20)
+    conversation = stored_conversation(engine)
+    cache.put(conversation)
+
+    conversation.append_turn(["User: hi", "Alex: hello"])
+    cache.mark_dirty(conversation, ["User: hi", "Alex: hello"])
+    assert engine.get_conversation(conversation.Id).conversation_history == []
+
+    cache.flush()
+    assert engine.get_conversation(conversation.Id).conversation_history == ["User: hi", "Alex: hello"]
+    assert cache.stats()["dirty"] == 0
+
+def test_flush_continues_past_externally_saved_conversation(engine, other_process):
+    cache = ConversationCache(engine, 16, 2 ** 20)
+    stale, fresh = stored_conversation(engine), stored_conversation(engine)
+
+    for conversation in (stale, fresh):
+        conversation.append_turn(["User: cached turn"])
+        cache.put(conversation, dirty=True)
+
+    external = other_process.get_conversation(stale.Id)
+    external.append_turn(["User: external turn"])
+    other_process.save_conversation(external)
+
+    cache.flush()
+
+    # The stale entry is dropped so the next read sees the external save; the other one is written
+    assert cache.get(stale.Id) is None
+    assert other_process.get_conversation(stale.Id).conversation_history == ["User: external turn"]
+    assert other_process.get_conversation(fresh.Id).conversation_history == ["User: cached turn"]
+    assert cache.stats()["dirty"] == 0 and cache.stats()["conflicts"] == 1
+
+    cache.close()
+
+def test_eviction_of_stale_entry_does_not_fail_put(engine, other_process):
+    cache = ConversationCache(engine, 1, 2 ** 20)
+    stale = stored_conversation(engine)
+    stale.append_turn(["User: cached turn"])
+    cache.put(stale, dirty=True)
+
+    external = other_process.get_conversation(stale.Id)
+    other_process.save_conversation(external)
+
+    # Reading an unrelated conversation evicts the stale one
+    cache.put(stored_conversation(engine))
+
+    assert cache.get(stale.Id) is None
+    assert cache.stats()["entries"] == 1 and cache.stats()["conflicts"] == 1
+
+def test_close_never_raises(engine, other_process):
+    cache = ConversationCache(engine, 16, 2 ** 20)
+    stale = stored_conversation(engine)
+    cache.put(stale, dirty=True)
+    other_process.save_conversation(other_process.get_conversation(stale.Id))
+
+    cache.close()
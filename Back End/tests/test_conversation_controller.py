@@ -0,0 +1,50 @@
+from helpers import lock_is_free, sse_events
+from model.Database import Database
+from model.providers.FakeProvider import FakeProvider
+
+MESSAGE = "The derivative measures how fast a function changes, and the integral accumulates it over an interval"
+
+def test_input_appends_turn(client, conversation_id):
+    response = client.post("/conversation/input", json={"conversation_id": conversation_id, "message": MESSAGE})
+
+    assert response.status_code == 200
+    result = response.get_json()
+    assert len(result["concepts"]) == 3
+
+    history = Database.get_conversation(conversation_id).conversation_history
+    assert history[-2:] == ["User: " + MESSAGE, "Alex: " + result["response"]]
+
+def test_input_requires_conversation_id(client):
+    assert client.post("/conversation/input", json={"message": MESSAGE}).status_code == 400
+
+def test_input_unknown_conversation(client):
+    assert client.post("/conversation/input", json={"conversation_id": "missing", "message": MESSAGE}).status_code == 404
+
+def test_input_stream(client, conversation_id):
+    events = sse_events(client.post("/conversation/input/stream", json={"conversation_id": conversation_id, "message": MESSAGE}))
+
+    assert events[-1][0] == "done"
+    tokens = "".join(data["text"] for name, data in events if name == "token")
+    assert tokens == events[-1][1]["response"] == FakeProvider.default_response
+
+    history = Database.get_conversation(conversation_id).conversation_history
+    assert history[-2:] == ["User: " + MESSAGE, "Alex: " + tokens]
+
+def test_input_stream_does_not_hold_the_lock_while_the_client_reads(client, conversation_id):
+    response = client.post("/conversation/input/stream", json={"conversation_id": conversation_id, "message": MESSAGE}, buffered=False)
+
+    try:
+        assert b"event: token" in next(iter(response.response))
+        # Other turns on the conversation go ahead while the stream waits on its reader
+        assert lock_is_free(conversation_id)
+    finally:
+        response.close()
+
+def test_input_stream_unknown_conversation(client):
+    assert client.post("/conversation/input/stream", json={"conversation_id": "missing", "message": MESSAGE}).status_code == 404
+
+def test_turns_are_listed_and_searchable(client, conversation_id):
+    client.post("/conversation/input", json={"conversation_id": conversation_id, "message": MESSAGE})
+
+    found = client.get("/conversations/search", query_string={"q": "derivative integral", "limit": 100}).get_json()["conversations"]
+    assert conversation_id in [conversation["Id"] for conversation in found]
@@ -0,0 +1,143 @@
+import multiprocessing
+import os
+import threading
+import time
+import pytest
+from model.ConversationLock import ConversationLock, fcntl
+from model.Database import Database
+from model.data_models.Conversation import Conversation
+
+CONVERSATION_ID = "9f1c2a4e-3b5d-4c6e-8f70-a1b2c3d4e5f6"
+OTHER_CONVERSATION_ID = "0b7e4d2c-1a3f-4e5d-9c8b-7a6f5e4d3c2b"
+
+pytestmark = pytest.mark.skipif(fcntl is None, reason="advisory file locks are not available")
+
+def test_lock_serializes_threads(tmp_path):
+    lock = ConversationLock(str(tmp_path))
+    counter = {"value": 0}
+
+    def increment():
+        for _ in range(20):
+            with lock.hold(CONVERSATION_ID):
+                value = counter["value"]
+                time.sleep(0.001)
+                counter["value"] = value + 1
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+
+    for thread in threads:
+        thread.start()
+
+    for thread in threads:
+        thread.join()
+
+    assert counter["value"] == 80
+
+def hold_in_child(lock_path, held, release):
+    with ConversationLock(lock_path).hold(CONVERSATION_ID):
+        held.set()
+        release.wait(10)
+
+def test_lock_excludes_other_processes(tmp_path):
+    context = multiprocessing.get_context("fork")
+    held, release = context.Event(), context.Event()
+    child = context.Process(target=hold_in_child, args=(str(tmp_path), held, release))
+    child.start()
+
+    try:
+        assert held.wait(10)
+        acquired = threading.Event()
+
+        def acquire():
+            with ConversationLock(str(tmp_path)).hold(CONVERSATION_ID):
+                acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+
+        assert not acquired.wait(0.2)
+        release.set()
+        assert acquired.wait(10)
+        thread.join()
+    finally:
+        release.set()
+        child.join(10)
+
+def test_other_conversations_are_not_blocked(tmp_path):
+    lock = ConversationLock(str(tmp_path))
+
+    with lock.hold(CONVERSATION_ID):
+        with lock.hold(OTHER_CONVERSATION_ID):
+            pass
+
+def test_only_conversation_ids_are_locked(tmp_path):
+    lock = ConversationLock(str(tmp_path / "locks"))
+
+    for conversation_id in ("../../pwned", "conversation", ""):
+        with pytest.raises(ValueError):
+            with lock.hold(conversation_id):
+                pass
+
+    assert os.listdir(tmp_path) == ["locks"]
+    assert os.listdir(tmp_path / "locks") == []
+
+def test_unknown_conversations_leave_no_lock_file(client):
+    lock_path = Database.get_conversation_lock().lock_path
+    before = set(os.listdir(lock_path))
+
+    for conversation_id in ("../../pwned", OTHER_CONVERSATION_ID):
+        response = client.post("/conversation/input", json={"conversation_id": conversation_id, "message": "Hello"})
+        assert response.status_code == 404
+
+    assert set(os.listdir(lock_path)) == before
+    assert not os.path.exists(os.path.join(lock_path, "../../pwned.lock"))
+
+def test_waiter_relocks_after_file_is_removed(tmp_path):
+    lock = ConversationLock(str(tmp_path))
+    file_path = lock.get_file_path(CONVERSATION_ID)
+    acquired = threading.Event()
+    release = threading.Event()
+
+    def wait_then_hold():
+        with lock.hold(CONVERSATION_ID):
+            acquired.set()
+            release.wait(10)
+
+    with lock.hold(CONVERSATION_ID):
+        waiter = threading.Thread(target=wait_then_hold)
+        waiter.start()
+        time.sleep(0.05)
+        lock.remove(CONVERSATION_ID)
+        assert not os.path.exists(file_path)
+
+    # The waiter locked the removed file, noticed and took a new one, which still excludes others
+    assert acquired.wait(10)
+    assert os.path.exists(file_path)
+
+    blocked = threading.Event()
+
+    def try_hold():
+        with lock.hold(CONVERSATION_ID):
+            blocked.set()
+
+    other = threading.Thread(target=try_hold)
+    other.start()
+    assert not blocked.wait(0.2)
+
+    release.set()
+    waiter.join()
+    assert blocked.wait(10)
+    other.join()
+
+def test_archiving_removes_lock_file():
+    conversation = Conversation(documentText="Q1. What is an integral?")
+    Database.save_conversation(conversation)
+    conversation_id = str(conversation.Id)
+
+    with Database.lock(conversation_id):
+        Database.archive(conversation_id)
+
+    assert not os.path.exists(Database.get_conversation_lock().get_file_path(conversation_id))
+
+    # Opening it again restores it
+    assert Database.get_conversation(conversation_id).documentText == "Q1. What is an integral?"
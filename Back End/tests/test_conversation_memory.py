@@ -0,0 +1,87 @@
+import pytest
+from model.ConversationMemory import ConversationMemory
+from model.data_models.Conversation import Conversation
+from model.TokenCounter import estimate_tokens
+
+def turns(count, start=0):
+    return [entry for number in range(start, start + count) for entry in (f"User: explanation {number}", f"Alex: question {number}")]
+
+@pytest.fixture
+def summaries(monkeypatch):
+    # The entries of each summarize() call; the summary names the last entry folded so far
+    calls = []
+
+    def summarize(summary, entries):
+        calls.append(entries)
+        return f"Summary up to {entries[-1]}"
+
+    monkeypatch.setattr(ConversationMemory, "summarize", staticmethod(summarize))
+    return calls
+
+def test_turns_are_folded_once_a_batch_has_built_up(summaries):
+    conversation = Conversation(documentText="", conversation_history=turns(9))
+
+    # Three turns past the recent window are not a batch yet
+    assert not ConversationMemory.update(conversation, recent_turns=6)
+    assert summaries == []
+
+    conversation.append_turn(turns(1, start=9))
+    assert ConversationMemory.update(conversation, recent_turns=6)
+
+    assert summaries == [turns(4)]
+    assert conversation.summarized_entries == 8
+    assert conversation.summary == "Summary up to Alex: question 3"
+
+    prompt = ConversationMemory.build(conversation)
+    assert "Summary up to Alex: question 3" in prompt
+    assert "explanation 3" not in prompt and "explanation 4" in prompt
+
+def test_next_batch_rolls_into_the_summary(summaries):
+    conversation = Conversation(documentText="", conversation_history=turns(10))
+    ConversationMemory.update(conversation, recent_turns=6)
+
+    conversation.append_turn(turns(4, start=10))
+    assert ConversationMemory.update(conversation, recent_turns=6)
+
+    assert summaries[-1] == turns(4, start=4)
+    assert conversation.summarized_entries == 16
+    assert conversation.summary == "Summary up to Alex: question 7"
+
+def test_transcript_over_budget_is_folded_early(summaries):
+    conversation = Conversation(documentText="", conversation_history=[f"User: {'word ' * 200}{number}" for number in range(4)])
+
+    assert ConversationMemory.update(conversation, recent_turns=6, token_budget=600)
+    assert ConversationMemory.tokens(conversation) <= 600
+
+def test_oldest_entries_are_cut_when_summarizing_fails(monkeypatch):
+    def fail(summary, entries):
+        raise RuntimeError("summary model unavailable")
+
+    monkeypatch.setattr(ConversationMemory, "summarize", staticmethod(fail))
+    history = [f"User: {'word ' * 100}{number}" for number in range(10)]
+    conversation = Conversation(documentText="", conversation_history=list(history))
+
+    assert not ConversationMemory.update(conversation, token_budget=500)
+    assert conversation.summarized_entries == 0
+
+    prompt = ConversationMemory.build(conversation, token_budget=500)
+    kept = [entry for entry in history if entry in prompt]
+
+    # The most recent entries that fit the budget, and nothing older
+    assert kept == history[-len(kept):] and len(kept) < len(history)
+    assert sum(estimate_tokens(entry) for entry in kept) <= 500
+
+def test_summarized_size_is_a_running_total(summaries, monkeypatch):
+    conversation = Conversation(documentText="", conversation_history=turns(14))
+    ConversationMemory.update(conversation, recent_turns=6)
+    assert ConversationMemory.summarized_tokens(conversation) == sum(estimate_tokens(entry) for entry in turns(8))
+
+    # Later calls only count the newly folded entries
+    counted = []
+    monkeypatch.setattr("model.ConversationMemory.estimate_tokens", lambda text: counted.append(text) or estimate_tokens(text))
+    conversation.append_turn(turns(4, start=14))
+    ConversationMemory.update(conversation, recent_turns=6)
+    counted.clear()
+
+    assert ConversationMemory.summarized_tokens(conversation) == sum(estimate_tokens(entry) for entry in turns(12))
+    assert counted == turns(4, start=8)
@@ -0,0 +1,34 @@
+import io
+from benchmarks.synthetic_pdf import build_pdf
+from model.DocumentProcessor import DocumentProcessor
+from EnvironmentVars import PDF_PAGES_PER_TASK
+
+PAGES = PDF_PAGES_PER_TASK * 5
+
+def test_pages_are_extracted_in_order():
+    # More pages than one task, so they go through the process pool
+    result = DocumentProcessor.extract(io.BytesIO(build_pdf(PAGES, seed=100)), max_chars=None)
+
+    assert result.page_count == PAGES and not result.exceeded
+    assert result.page_offsets[0] == 0 and result.page_offsets == sorted(result.page_offsets)
+    assert [f"Q{number}." in result.text for number in range(1, 4 * PAGES + 1)] == [True] * 4 * PAGES
+    assert result.text.index("Q5.") < result.text.index(f"Q{4 * PAGES}.")
+
+def test_extraction_stops_once_the_budget_is_exceeded():
+    pdf = build_pdf(PAGES, seed=101)
+    first_page = DocumentProcessor.extract(io.BytesIO(build_pdf(1, seed=101)), max_chars=None).text
+
+    result = DocumentProcessor.extract(io.BytesIO(pdf), max_chars=len(first_page) + 1)
+
+    assert result.exceeded
+    assert result.page_count == 2
+    assert result.text.startswith(first_page)
+
+def test_partial_extraction_is_not_cached():
+    pdf = build_pdf(PAGES, seed=102)
+
+    assert DocumentProcessor.extract(io.BytesIO(pdf), max_chars=10).exceeded
+
+    # The same PDF with a larger budget is extracted in full, not served from the partial result
+    result = DocumentProcessor.extract(io.BytesIO(pdf), max_chars=None)
+    assert result.page_count == PAGES and not result.exceeded
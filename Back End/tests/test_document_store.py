@@ -0,0 +1,49 @@
+import pytest
+from model.data_models.Conversation import Conversation
+from model.storage.DocumentStore import DocumentStore, document_hash
+from model.storage.SqliteStorage import SqliteStorage
+
+EXAM = "Q1. What is a derivative?\nQ2. What is an integral?\n"
+
+@pytest.fixture
+def store(tmp_path):
+    return DocumentStore(str(tmp_path / "documents"))
+
+@pytest.fixture
+def engine(tmp_path, store):
+    engine = SqliteStorage(str(tmp_path / "conversations.db"), document_store=store)
+    yield engine
+    engine.close()
+
+def test_conversations_share_one_stored_document(engine, store):
+    first, second = Conversation(documentText=EXAM), Conversation(documentText=EXAM)
+    engine.save_conversation(first)
+    engine.save_conversation(second)
+
+    assert first.documentHash == second.documentHash == document_hash(EXAM)
+    assert store.stats["deduplicated"] == 1
+    assert engine.get_conversation(second.Id).documentText == EXAM
+
+def test_unchanged_document_is_not_stored_again(engine, store, monkeypatch):
+    conversation = Conversation(documentText=EXAM, documentHash=document_hash(EXAM))
+    engine.save_conversation(conversation)
+    puts, bytes_written = store.stats["puts"], store.stats["bytes_written"]
+
+    # Neither hashed nor written on later saves, loaded document or not
+    monkeypatch.setattr("model.storage.DocumentStore.document_hash", lambda text: pytest.fail("document was hashed again"))
+    conversation.append_turn(["User: hi"])
+    engine.save_conversation(conversation)
+    engine.save_conversation(engine.get_conversation(conversation.Id))
+
+    assert (store.stats["puts"], store.stats["bytes_written"]) == (puts, bytes_written)
+
+def test_replaced_text_is_stored_under_its_own_hash(engine, store):
+    conversation = Conversation(documentText=EXAM)
+    engine.save_conversation(conversation)
+
+    conversation.documentText = EXAM + "Q3. What is a limit?\n"
+    conversation.chunks = []
+    engine.save_conversation(conversation)
+
+    assert conversation.documentHash == document_hash(EXAM + "Q3. What is a limit?\n")
+    assert engine.get_conversation(conversation.Id).documentText.endswith("Q3. What is a limit?\n")
@@ -0,0 +1,175 @@
+import io
+import struct
+import zipfile
+import pytest
+from benchmarks.synthetic_pdf import build_pdf
+from helpers import lock_is_free, sse_events, wait_for
+from controller.extraction_controller import open_batch_document
+from model.Database import Database
+from model.agents.ConversationAgent import ConversationAgent
+from model.providers.FakeProvider import FakeProvider
+from model.providers.OpenAI import Model
+
+FAKE_CONCEPTS = ["Concept 1", "Concept 2", "Concept 3"]
+
+def test_upload_creates_conversation(upload):
+    conversation = Database.get_conversation(upload(pages=3))
+
+    assert "Q1." in conversation.documentText
+    assert conversation.chunks
+    assert conversation.documentHash
+    assert conversation.concepts == []
+
+def test_upload_rejects_other_files(client):
+    response = client.post("/extract/text", data={"file": (io.BytesIO(b"not a pdf"), "notes.txt")}, content_type="multipart/form-data")
+
+    assert response.status_code == 400
+
+def test_extract_concepts(client, upload):
+    conversation_id = upload()
+    response = client.post("/extract/concepts", data={"id": conversation_id})
+
+    assert response.status_code == 200
+    result = response.get_json()
+    assert [concept["name"] for concept in result["concepts"]] == FAKE_CONCEPTS
+    assert result["initial_message"] == FakeProvider.default_response
+
+    conversation = Database.get_conversation(conversation_id)
+    assert [concept.questions for concept in conversation.concepts] == [["Q1", "Q2"], ["Q3", "Q4"], ["Q5"]]
+    assert conversation.conversation_history == ["Alex: " + FakeProvider.default_response]
+
+def test_extract_concepts_unknown_conversation(client):
+    assert client.post("/extract/concepts", data={"id": "missing"}).status_code == 404
+
+def test_extract_concepts_stream(client, upload):
+    conversation_id = upload(seed=1)
+    events = sse_events(client.post("/extract/concepts/stream", data={"id": conversation_id}))
+    names = [name for name, _ in events]
+
+    assert names[-1] == "done"
+    assert "concepts" in names and "token" in names
+    assert [concept["name"] for concept in events[-1][1]["concepts"]] == FAKE_CONCEPTS
+
+    # The streamed tokens add up to the message that was saved
+    message = "".join(data["text"] for name, data in events if name == "token" and data["stage"] == "initial_message")
+    assert message == events[-1][1]["initial_message"]
+    assert Database.get_conversation(conversation_id).conversation_history == ["Alex: " + message]
+
+def test_retried_extraction_starts_one_early_message(client, upload, monkeypatch):
+    # The first reply names its first concept and then breaks off, so the extraction is asked for again
+    replies = ['{"Concept 1": ["Q1", "Q2"], "Concept 2": [', FakeProvider.responses[Model.O3_MINI]]
+    astream = FakeProvider.astream
+
+    async def extraction_replies(self, prompt, temperature=None, system=None, cache=False, inputs=None):
+        if self.model != Model.O3_MINI:
+            async for token in astream(self, prompt, temperature, system, cache, inputs):
+                yield token
+        else:
+            yield replies.pop(0)
+
+    monkeypatch.setattr(FakeProvider, "astream", extraction_replies)
+
+    started = []
+    start_conversation = ConversationAgent.start_conversation
+    monkeypatch.setattr(ConversationAgent, "start_conversation", lambda self, *args: started.append(args) or start_conversation(self, *args))
+
+    result = client.post("/extract/concepts", data={"id": upload(seed=5)}).get_json()
+
+    assert [concept["name"] for concept in result["concepts"]] == FAKE_CONCEPTS
+    assert len(started) == 1
+
+def test_extract_concepts_stream_does_not_hold_the_lock_while_the_client_reads(client, upload):
+    conversation_id = upload(seed=6)
+    response = client.post("/extract/concepts/stream", data={"id": conversation_id}, buffered=False)
+
+    try:
+        chunks = iter(response.response)
+        assert any(b'"stage": "initial_message"' in chunk for chunk in chunks)
+        assert lock_is_free(conversation_id)
+    finally:
+        response.close()
+
+def finished_job(client, job_id):
+    job = client.get(f"/extract/jobs/{job_id}").get_json()
+    return job if job["status"] in ("succeeded", "failed") else None
+
+def test_extraction_job(client, upload):
+    conversation_id = upload(seed=2)
+    response = client.post("/extract/jobs", data={"id": conversation_id})
+
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+
+    job = wait_for(lambda: finished_job(client, job_id))
+
+    assert job["status"] == "succeeded"
+    assert [concept["name"] for concept in job["result"]["concepts"]] == FAKE_CONCEPTS
+
+def test_extract_concepts_stream_accepts_fenced_reply(client, upload, monkeypatch):
+    monkeypatch.setitem(FakeProvider.responses, Model.O3_MINI, '```json\n{"Fenced Concept": ["Q1"]}\n```')
+    events = sse_events(client.post("/extract/concepts/stream", data={"id": upload(seed=3)}))
+
+    assert events[-1][0] == "done"
+    assert [concept["name"] for concept in events[-1][1]["concepts"]] == ["Fenced Concept"]
+
+def test_extract_concepts_stream_reports_invalid_reply(client, upload, monkeypatch):
+    monkeypatch.setitem(FakeProvider.responses, Model.O3_MINI, "These are the concepts: Q1 and Q2")
+    conversation_id = upload(seed=4)
+    events = sse_events(client.post("/extract/concepts/stream", data={"id": conversation_id}))
+
+    assert events[-1][0] == "error"
+    assert Database.get_conversation(conversation_id).concepts == []
+
+def test_batch_upload(client):
+    response = client.post("/extract/batch", data={
+        "files": [(io.BytesIO(build_pdf(1, seed=seed)), f"exam-{seed}.pdf") for seed in (10, 11)]
+    }, content_type="multipart/form-data")
+
+    assert response.status_code == 202
+    job_id = response.get_json()["job_id"]
+
+    job = wait_for(lambda: finished_job(client, job_id), timeout=30)
+
+    assert job["status"] == "succeeded"
+    assert job["result"]["done"] == 2 and job["result"]["failed"] == 0
+    assert all(document["concepts"] == FAKE_CONCEPTS for document in job["result"]["documents"])
+
+def test_upload_over_the_size_limit_is_refused(app, client, monkeypatch):
+    monkeypatch.setitem(app.config, "MAX_CONTENT_LENGTH", 1024)
+    response = client.post("/extract/batch", data={"files": [(io.BytesIO(build_pdf(1, seed=12)), "exam.pdf")]}, content_type="multipart/form-data")
+
+    assert response.status_code == 413
+
+def batch_archive(path, members):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+
+    return str(path)
+
+def understate_size(path, size):
+    # Rewrites the uncompressed size claimed for the archive's only member, in its local
+    # header (offset 22) and central directory entry (offset 24)
+    data = bytearray(open(path, "rb").read())
+    struct.pack_into("<I", data, data.find(b"PK\x03\x04") + 22, size)
+    struct.pack_into("<I", data, data.find(b"PK\x01\x02") + 24, size)
+    open(path, "wb").write(bytes(data))
+
+def test_batch_documents_are_limited_by_decompressed_size(tmp_path, monkeypatch):
+    monkeypatch.setattr("controller.extraction_controller.BATCH_MAX_FILE_BYTES", 64 * 1024)
+    pdf = build_pdf(1, seed=13)
+    # The zeros compress to almost nothing
+    path = batch_archive(tmp_path / "batch.zip", {"exam.pdf": pdf, "bomb.pdf": b"\0" * (4 * 1024 * 1024)})
+
+    with open_batch_document(path, "exam.pdf") as document:
+        assert document.read() == pdf
+
+    with pytest.raises(Exception, match="larger than"):
+        open_batch_document(path, "bomb.pdf")
+
+    # An archive claiming a size under the limit is not read past it either
+    lying = batch_archive(tmp_path / "lying.zip", {"bomb.pdf": b"\0" * (4 * 1024 * 1024)})
+    understate_size(lying, 100)
+
+    with pytest.raises(Exception):
+        open_batch_document(lying, "bomb.pdf")
@@ -0,0 +1,66 @@
+import threading
+import time
+from helpers import wait_for
+from model.JobQueue import JobQueue
+
+def test_jobs_run_and_finished_ones_are_pruned(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), workers=1)
+    queue.register("double", lambda payload, report: payload["value"] * 2)
+    queue.register("fail", lambda payload, report: 1 / 0)
+
+    succeeded = queue.submit("double", {"value": 21})
+    failed = queue.submit("fail", {})
+
+    assert wait_for(lambda: queue.get(succeeded)["status"] == "succeeded")
+    assert queue.get(succeeded)["result"] == 42
+    assert wait_for(lambda: queue.get(failed)["status"] == "failed")
+
+    # Still within the retention period
+    assert queue.prune(retention_seconds=60) == 0
+
+    time.sleep(0.01)
+    assert queue.prune(retention_seconds=0) == 2
+    assert queue.get(succeeded) is None and queue.get(failed) is None
+
+def test_worker_survives_a_job_that_cannot_be_finished(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), workers=1)
+    # The handler returns, but its result cannot be stored
+    queue.register("unserializable", lambda payload, report: object())
+    queue.register("double", lambda payload, report: payload["value"] * 2)
+
+    broken = queue.submit("unserializable", {})
+    assert wait_for(lambda: queue.get(broken)["status"] == "failed")
+
+    # The same worker goes on to the next job
+    succeeded = queue.submit("double", {"value": 21})
+    assert wait_for(lambda: queue.get(succeeded)["status"] == "succeeded")
+
+def test_prune_keeps_unfinished_jobs(tmp_path):
+    # Without workers the job stays queued
+    queue = JobQueue(str(tmp_path / "jobs.db"), workers=0)
+    job_id = queue.submit("anything", {})
+
+    time.sleep(0.01)
+    assert queue.prune(retention_seconds=0) == 0
+    assert queue.get(job_id)["status"] == "queued"
+
+def test_queues_sharing_a_file_run_only_their_own_kinds(tmp_path):
+    jobs_file = str(tmp_path / "jobs.db")
+    release = threading.Event()
+    shared, batches = JobQueue(jobs_file, workers=2), JobQueue(jobs_file, workers=1)
+    shared.register("quick", lambda payload, report: "done")
+    batches.register("slow", lambda payload, report: release.wait(10))
+
+    first, second = batches.submit("slow", {}), batches.submit("slow", {})
+
+    try:
+        assert wait_for(lambda: batches.get(first)["status"] == "running")
+
+        # The batch queue is full, but jobs of the shared queue still run right away
+        quick = shared.submit("quick", {})
+        assert wait_for(lambda: shared.get(quick)["status"] == "succeeded")
+        assert batches.get(second)["status"] == "queued"
+    finally:
+        release.set()
+
+    assert wait_for(lambda: batches.get(second)["status"] == "succeeded")
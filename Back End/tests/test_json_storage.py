@@ -0,0 +1,62 @@
+import os
+import pytest
+from model.data_models.Concept import Concept
+from model.data_models.Conversation import Conversation
+from model.storage.JsonStorage import JsonStorage
+
+@pytest.fixture(params=["json", "binary"])
+def engine(tmp_path, request):
+    return JsonStorage(str(tmp_path), compaction_threshold=3, snapshot_format=request.param)
+
+def append(engine, conversation, entries):
+    position = conversation.append_turn(entries)
+    conversation.concepts[0].progress += 10
+    engine.append_turn(conversation, position, entries)
+
+def stored_conversation(engine):
+    conversation = Conversation(documentText="Q1. What is a derivative?", concepts=[Concept(name="Derivatives")])
+    engine.save_conversation(conversation)
+    return conversation
+
+def test_turns_are_appended_to_the_segment(engine):
+    conversation = stored_conversation(engine)
+    snapshot = open(engine.get_file_path(conversation.Id), "rb").read()
+
+    append(engine, conversation, ["User: one", "Alex: two"])
+
+    # Only the segment was written
+    assert open(engine.get_file_path(conversation.Id), "rb").read() == snapshot
+    loaded = engine.get_conversation(conversation.Id)
+    assert loaded.conversation_history == ["User: one", "Alex: two"]
+    assert loaded.concepts[0].progress == 10
+
+def test_segment_is_compacted_into_the_snapshot(engine):
+    conversation = stored_conversation(engine)
+
+    for turn in range(3):
+        append(engine, conversation, [f"User: {turn}"])
+
+    assert not os.path.exists(engine.get_segment_path(conversation.Id))
+    assert engine.get_conversation(conversation.Id).conversation_history == ["User: 0", "User: 1", "User: 2"]
+
+def test_torn_segment_line_is_ignored(engine):
+    conversation = stored_conversation(engine)
+    append(engine, conversation, ["User: kept"])
+
+    with open(engine.get_segment_path(conversation.Id), "a") as segment:
+        segment.write('{"position": 1, "entr')
+
+    assert engine.get_conversation(conversation.Id).conversation_history == ["User: kept"]
+
+def test_replaying_an_already_compacted_segment_is_harmless(engine):
+    conversation = stored_conversation(engine)
+    append(engine, conversation, ["User: one"])
+    segment = open(engine.get_segment_path(conversation.Id)).read()
+
+    # A crash between writing the snapshot and removing the segment
+    engine.save_conversation(conversation)
+
+    with open(engine.get_segment_path(conversation.Id), "w") as file:
+        file.write(segment)
+
+    assert engine.get_conversation(conversation.Id).conversation_history == ["User: one"]
@@ -0,0 +1,155 @@
+import asyncio
+import time
+from types import SimpleNamespace
+import openai
+import pytest
+from model.providers.OpenAI import OpenAI, Model, ResponseCache
+from model.providers.RateLimiter import TokenBucket
+
+# The errors only read the request, status and headers of the response they wrap
+REQUEST = SimpleNamespace(method="POST", url="http://localhost/v1/chat/completions")
+
+def response(status_code, headers=None):
+    return SimpleNamespace(request=REQUEST, status_code=status_code, headers=headers or {})
+
+def rate_limited(retry_after=None):
+    headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+    return openai.RateLimitError("Rate limit reached", response=response(429, headers), body=None)
+
+def completion(content):
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))], usage=SimpleNamespace(prompt_tokens=3, completion_tokens=2))
+
+async def chunks(items):
+    # A streamed reply; an exception in items is raised at that point of the stream
+    for item in items:
+        if isinstance(item, Exception):
+            raise item
+
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=item))])
+
+class FakeCompletions:
+    # Plays back one outcome per call: an exception to raise, a reply, or a list of streamed tokens
+    def __init__(self, outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = []
+
+    async def create(self, stream=False, **params):
+        self.calls.append(params)
+        outcome = self.outcomes.pop(0)
+
+        if isinstance(outcome, Exception):
+            raise outcome
+
+        return chunks(outcome) if stream else completion(outcome)
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr("model.providers.OpenAI.LLM_MAX_RETRIES", 2)
+    monkeypatch.setattr("model.providers.OpenAI.LLM_RETRY_BASE_DELAY", 0.001)
+    monkeypatch.setattr(OpenAI, "response_cache", ResponseCache(16, 60))
+
+    def client(*outcomes):
+        completions = FakeCompletions(outcomes)
+        monkeypatch.setattr(OpenAI, "_client", SimpleNamespace(chat=SimpleNamespace(completions=completions)))
+        return completions
+
+    return client
+
+def test_retryable_errors_are_retried(client):
+    completions = client(rate_limited(), openai.APIConnectionError(request=REQUEST), "Hello")
+    provider = OpenAI(Model.GPT_4O_MINI)
+
+    assert provider.query("Hi", system="You are Alex") == "Hello"
+    assert len(completions.calls) == 3
+    assert provider.stats["retries"] == 2 and provider.stats["failures"] == 0
+
+def test_gives_up_after_the_retry_limit(client):
+    completions = client(rate_limited(), rate_limited(), rate_limited(), "never reached")
+    provider = OpenAI(Model.GPT_4O_MINI)
+
+    with pytest.raises(openai.RateLimitError):
+        provider.query("Hi")
+
+    assert len(completions.calls) == 3
+    assert provider.stats["failures"] == 1
+
+def test_other_errors_are_not_retried(client):
+    completions = client(openai.BadRequestError("Bad request", response=response(400), body=None))
+
+    with pytest.raises(openai.BadRequestError):
+        OpenAI(Model.GPT_4O_MINI).query("Hi")
+
+    assert len(completions.calls) == 1
+
+def test_backoff_waits_for_retry_after(client):
+    client(rate_limited(retry_after=0.2), "Hello")
+    started = time.monotonic()
+
+    assert OpenAI(Model.GPT_4O_MINI).query("Hi") == "Hello"
+    assert time.monotonic() - started >= 0.2
+
+def test_stream_is_retried_before_the_first_token(client):
+    completions = client(rate_limited(), ["Hel", "lo"])
+
+    assert "".join(OpenAI(Model.GPT_4O_MINI).stream("Hi")) == "Hello"
+    assert len(completions.calls) == 2
+
+def test_stream_is_not_retried_after_a_token(client):
+    completions = client(["Hel", openai.APIConnectionError(request=REQUEST)], ["never", "sent"])
+    tokens = []
+
+    with pytest.raises(openai.APIConnectionError):
+        for token in OpenAI(Model.GPT_4O_MINI).stream("Hi"):
+            tokens.append(token)
+
+    assert tokens == ["Hel"]
+    assert len(completions.calls) == 1
+
+def test_cached_calls_reuse_the_response(client):
+    completions = client("First", "Second", "Third")
+    provider = OpenAI(Model.GPT_4O_MINI)
+
+    assert provider.query("Hi", temperature=0.5, system="Exam", cache=True) == "First"
+    assert provider.query("Hi", temperature=0.5, system="Exam", cache=True) == "First"
+    # Another temperature, or a call that does not opt in, goes to the API
+    assert provider.query("Hi", temperature=0.9, system="Exam", cache=True) == "Second"
+    assert provider.query("Hi", temperature=0.5, system="Exam") == "Third"
+    assert len(completions.calls) == 3
+
+def test_system_prompt_is_sent_first(client):
+    completions = client("Hello")
+    OpenAI(Model.GPT_4O_MINI).query("Question", system="Exam")
+
+    assert completions.calls[0]["messages"] == [{"role": "system", "content": "Exam"}, {"role": "user", "content": "Question"}]
+
+def test_response_cache_evicts_least_recently_used():
+    cache = ResponseCache(2, 60)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    cache.get("a")
+    cache.put("c", "C")
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == ("A", "C")
+    assert cache.stats()["evictions"] == 1
+
+def test_response_cache_entries_expire():
+    cache = ResponseCache(2, 0.01)
+    cache.put("a", "A")
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1 and cache.stats()["entries"] == 0
+
+def test_token_bucket_allows_bursts_then_paces():
+    async def acquire_all():
+        bucket = TokenBucket(rate=20, capacity=2)
+        return [await bucket.acquire() for _ in range(4)]
+
+    started = time.monotonic()
+    waits = asyncio.run(acquire_all())
+
+    assert waits[:2] == [0.0, 0.0]
+    assert all(wait > 0 for wait in waits[2:])
+    # Two requests beyond the burst at 20 per second
+    assert time.monotonic() - started >= 0.09
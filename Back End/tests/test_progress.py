@@ -0,0 +1,39 @@
+from helpers import wait_for
+from controller.conversation_controller import score_progress
+from model.Database import Database
+from model.ProgressScorer import ProgressScorer
+from model.agents.ProgressAgent import ProgressAgent
+from model.data_models.Concept import Concept
+from model.data_models.Conversation import Conversation
+from model.providers.FakeProvider import FakeProvider
+
+# Matches no concept terms and is long enough to be escalated as a possible paraphrase
+PARAPHRASE = " ".join(["Imagine slowly pouring water into a bucket and watching how quickly the level keeps rising over every single second"] * 2)
+
+def test_fake_provider_scores_every_concept():
+    concepts = [Concept(name="Derivatives", questions=["Q1"]), Concept(name="Limits (one-sided)")]
+
+    assert ProgressAgent().score(concepts, PARAPHRASE) == {"Derivatives": FakeProvider.progress_score, "Limits (one-sided)": FakeProvider.progress_score}
+
+def test_fake_scores_do_not_depend_on_the_prompt_wording(monkeypatch):
+    monkeypatch.setattr(ProgressAgent, "build_prompt", lambda self, concepts, message, question="": ("Grade it.", message))
+    concepts = [Concept(name="Derivatives"), Concept(name="Integrals")]
+
+    assert ProgressAgent().score(concepts, PARAPHRASE) == {"Derivatives": FakeProvider.progress_score, "Integrals": FakeProvider.progress_score}
+
+def test_escalated_turn_is_scored_in_background(client, conversation_id):
+    failures = ProgressScorer.stats["escalation_failures"]
+
+    response = client.post("/conversation/input", json={"conversation_id": conversation_id, "message": PARAPHRASE})
+    assert response.status_code == 200
+
+    progress = wait_for(lambda: [concept.progress for concept in Database.get_conversation(conversation_id).concepts if concept.progress])
+    assert progress == [FakeProvider.progress_score]
+    assert ProgressScorer.stats["escalation_failures"] == failures
+
+def test_scoring_failure_is_contained():
+    # Never saved, so the scoring thread cannot load it
+    future = score_progress(Conversation(documentText=""), PARAPHRASE)
+
+    # Logged instead of raised on the worker thread
+    assert future.result(timeout=10) == {}
@@ -0,0 +1,58 @@
+import pytest
+from model.data_models.Concept import Concept
+from model.data_models.Conversation import Conversation
+from model.storage.SqliteStorage import SqliteStorage
+from model.storage.StorageEngine import ConversationConflictError
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = SqliteStorage(str(tmp_path / "conversations.db"))
+    yield engine
+    engine.close()
+
+def stored_conversation(engine):
+    conversation = Conversation(documentText="Q1. What is a derivative?", concepts=[Concept(name="Derivatives")])
+    engine.save_conversation(conversation)
+    return conversation.Id
+
+def test_round_trip(engine):
+    conversation_id = stored_conversation(engine)
+    conversation = engine.get_conversation(conversation_id)
+
+    assert conversation.documentText == "Q1. What is a derivative?"
+    assert [concept.name for concept in conversation.concepts] == ["Derivatives"]
+    assert engine.list_conversation_ids() == [str(conversation_id)]
+
+def test_concurrent_save_is_rejected(engine):
+    conversation_id = stored_conversation(engine)
+    first, second = engine.get_conversation(conversation_id), engine.get_conversation(conversation_id)
+
+    first.append_turn(["User: first"])
+    engine.save_conversation(first)
+
+    # Saving the second copy would silently drop the first turn
+    second.append_turn(["User: second"])
+
+    with pytest.raises(ConversationConflictError):
+        engine.save_conversation(second)
+
+    assert engine.get_conversation(conversation_id).conversation_history == ["User: first"]
+
+def test_concurrent_append_is_rejected(engine):
+    conversation_id = stored_conversation(engine)
+    first, second = engine.get_conversation(conversation_id), engine.get_conversation(conversation_id)
+
+    position = first.append_turn(["User: first", "Alex: one"])
+    engine.append_turn(first, position, ["User: first", "Alex: one"])
+
+    position = second.append_turn(["User: second", "Alex: two"])
+
+    with pytest.raises(ConversationConflictError):
+        engine.append_turn(second, position, ["User: second", "Alex: two"])
+
+    # A copy read after the first turn appends cleanly
+    third = engine.get_conversation(conversation_id)
+    position = third.append_turn(["User: third", "Alex: three"])
+    engine.append_turn(third, position, ["User: third", "Alex: three"])
+
+    assert engine.get_conversation(conversation_id).conversation_history == ["User: first", "Alex: one", "User: third", "Alex: three"]
@@ -0,0 +1,89 @@
+import re
+import time
+from model.Tracing import Tracing, NULL_SPAN, format_labels
+
+def samples(text, prefix):
+    # {line without value: value} for the metric lines that start with prefix
+    return {line.rsplit(" ", 1)[0]: float(line.rsplit(" ", 1)[1]) for line in text.splitlines() if line.startswith(prefix)}
+
+def test_span_durations_are_bucketed():
+    with Tracing.span("test_bucketed", stage="fast"):
+        pass
+
+    Tracing.observe("test_bucketed", 0.2, stage="fast")
+    lines = samples(Tracing.render(), 'teachalex_span_seconds')
+
+    # Buckets are cumulative: the fast span is in every one, the 0.2s one from 0.25 up
+    assert lines['teachalex_span_seconds_bucket{span="test_bucketed",stage="fast",le="0.001"}'] == 1
+    assert lines['teachalex_span_seconds_bucket{span="test_bucketed",stage="fast",le="0.25"}'] == 2
+    assert lines['teachalex_span_seconds_bucket{span="test_bucketed",stage="fast",le="+Inf"}'] == 2
+    assert lines['teachalex_span_seconds_count{span="test_bucketed",stage="fast"}'] == 2
+    assert lines['teachalex_span_seconds_sum{span="test_bucketed",stage="fast"}'] >= 0.2
+
+def test_counters_add_up_per_label_set():
+    Tracing.count("test_tokens", 3, kind="prompt")
+    Tracing.count("test_tokens", 4, kind="prompt")
+    Tracing.count("test_tokens", 5, kind="completion")
+    text = Tracing.render()
+
+    assert text.count("# TYPE teachalex_test_tokens_total counter") == 1
+    assert samples(text, "teachalex_test_tokens_total") == {
+        'teachalex_test_tokens_total{kind="completion"}': 5,
+        'teachalex_test_tokens_total{kind="prompt"}': 7
+    }
+
+def test_gauges_are_rendered_as_given():
+    text = Tracing.render([("test_entries", {"namespace": "concepts"}, 12)])
+
+    assert "# TYPE teachalex_test_entries gauge" in text
+    assert 'teachalex_test_entries{namespace="concepts"} 12' in text
+
+def test_label_values_are_escaped():
+    assert format_labels((("file", 'exam "final"\\2\n'),)) == '{file="exam \\"final\\"\\\\2\\n"}'
+    assert format_labels(()) == ""
+
+def test_disabled_tracing_records_nothing(monkeypatch):
+    monkeypatch.setattr(Tracing, "enabled", False)
+
+    assert Tracing.span("test_disabled") is NULL_SPAN
+    Tracing.count("test_disabled_count")
+    assert Tracing.start_request() is None
+
+    monkeypatch.setattr(Tracing, "enabled", True)
+    assert "test_disabled" not in Tracing.render()
+
+def test_request_trace_sums_spans_of_the_request():
+    trace = Tracing.start_request()
+
+    for _ in range(3):
+        with Tracing.span("test_request_span"):
+            time.sleep(0.001)
+
+    assert Tracing.finish_request() is trace
+    seconds, count = trace.spans["test_request_span"]
+    assert count == 3 and seconds >= 0.003
+
+    # Spans after the request are not added to it
+    with Tracing.span("test_request_span"):
+        pass
+
+    assert trace.spans["test_request_span"][1] == 3
+
+def test_metrics_endpoint(client, conversation_id):
+    # The concept extraction behind conversation_id called the fake o3-mini model
+    response = client.get("/metrics")
+    text = response.get_data(as_text=True)
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert samples(text, 'teachalex_span_seconds_count{span="llm_call",model="o3-mini"}')
+    assert samples(text, 'teachalex_llm_tokens_total{kind="prompt",model="o3-mini"}')
+    assert re.search(r"^teachalex_context_prompts \d", text, re.MULTILINE)
+    assert re.search(r"^teachalex_content_cache_hits \d", text, re.MULTILINE)
+
+def test_server_timing_header(client, conversation_id):
+    response = client.post("/conversation/input", json={"conversation_id": conversation_id, "message": "Hello"})
+    timings = dict(entry.split(";dur=") for entry in response.headers["Server-Timing"].split(", "))
+
+    assert "json_encode" in timings and "total" in timings
+    assert float(timings["total"]) >= float(timings["json_encode"])